@@ -0,0 +1,271 @@
+"""
+Accuracy and speed harness for the extractors, on the labelled corpus from
+benchmarks.corpus.
+
+Extractors:
+  - regex : regex_fallback.get_broker_info (email and address only)
+  - rules : regex_fallback.extract_broker_fields (the fast path, all four fields)
+  - agent : EmailParserAgent.parse with the chat model replaced by either
+            the fake from bench_load (answers from the prompt input it was
+            given, so it measures input preparation plus agent overhead) or a
+            recording (--replay) made once against Groq (--record, needs
+            GROQ_API_KEY and network)
+Reported: per-field exact-match accuracy (case/whitespace-insensitive), the
+share of items with every scored field right, per-item latency, and the
+same broken down by corpus kind. A size sweep then times one growing
+reply chain from ~1K up to 1M characters. --calibrate measures the
+precision of each regex_fallback.RULE_CONFIDENCE row (the evidence behind
+a rules confidence) and suggests values: the lower bound of the 95% Wilson
+interval, so small samples don't earn a high confidence.
+
+Run from Backend/:
+    python -m benchmarks.bench_accuracy
+    python -m benchmarks.bench_accuracy --count 500 --sizes 1000 100000 1000000 --out acc.json
+    python -m benchmarks.bench_accuracy --extractors agent --record replies.jsonl   # live, once
+    python -m benchmarks.bench_accuracy --extractors agent --replay replies.jsonl   # offline
+    python -m benchmarks.bench_accuracy --extractors rules --count 1000 --sizes --calibrate
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import io
+import json
+import math
+import os
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from benchmarks.corpus import FIELDS, KINDS, generate, make_sized, read_jsonl
+
+EXTRACTORS = ("regex", "rules", "agent")
+SCORED_FIELDS = {
+    "regex": ("broker_email", "complete_address"),
+    "rules": FIELDS,
+    "agent": FIELDS,
+}
+
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").lower().split()).strip(" .,")
+
+
+class RecordedChatModel:
+    """
+    Replays chat model replies saved in a JSONL file, keyed by tier and prompt
+    inputs. With `live` (the real chain) it records instead: calls through and
+    appends each reply to the file.
+    """
+
+    def __init__(self, path: str, tier: str, live=None):
+        self.path = path
+        self.tier = tier
+        self.live = live
+        self.replies = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.replies[entry["key"]] = entry
+
+    def _key(self, inputs) -> str:
+        return hashlib.sha256(f"{self.tier}\x00{json.dumps(inputs, sort_keys=True)}".encode()).hexdigest()
+
+    async def ainvoke(self, inputs):
+        key = self._key(inputs)
+        if self.live is None:
+            entry = self.replies.get(key)
+            if entry is None:
+                raise KeyError(f"no recorded {self.tier} reply for this input")
+            return SimpleNamespace(content=entry["content"], response_metadata=entry["response_metadata"])
+        result = await self.live.ainvoke(inputs)
+        entry = {"key": key, "content": result.content,
+                 "response_metadata": {"token_usage": (result.response_metadata or {}).get("token_usage", {})}}
+        self.replies[key] = entry
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return result
+
+
+def build_extractors(names, args) -> dict:
+    """name -> callable(text) returning a fields dict."""
+    from regex_fallback import extract_broker_fields, get_broker_info
+    extractors = {}
+    if "regex" in names:
+        extractors["regex"] = get_broker_info
+    if "rules" in names:
+        extractors["rules"] = extract_broker_fields
+    if "agent" in names:
+        import settings
+        overrides = {"agent_warmup": False, "llm_breaker_failures": 10 ** 9}  # a replay miss isn't an outage
+        if not args.record:
+            overrides["groq_api_key"] = settings.get_settings().groq_api_key or "benchmark-dummy-key"
+        settings._settings = dataclasses.replace(settings.get_settings(), **overrides)
+        from email_parser_agent import EmailAgentRequest, get_agent
+        agent = get_agent()
+        if not (args.record or args.replay):
+            from benchmarks.bench_load import FakeChatModel, parse_latency
+            fake = FakeChatModel(parse_latency(args.llm_latency), seed=args.seed)
+        for name, tier in agent.tiers.items():
+            if args.record:
+                tier.chain = RecordedChatModel(args.record, name, live=tier.chain)
+                tier.repair_chain = RecordedChatModel(args.record, name, live=tier.repair_chain)
+            elif args.replay:
+                tier.chain = tier.repair_chain = RecordedChatModel(args.replay, name)
+            else:
+                tier.chain = tier.repair_chain = fake
+        loop = asyncio.new_event_loop()
+
+        def run_agent(text):
+            # The agent prints per-call token usage; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    return loop.run_until_complete(agent.parse(EmailAgentRequest(email_blurb=text))).model_dump()
+                except Exception:
+                    return {}
+
+        extractors["agent"] = run_agent
+    return extractors
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))]
+
+
+def score(extract, items, fields) -> dict:
+    """Per-field accuracy, all-fields accuracy and latency for one extractor, overall and per kind."""
+    groups = defaultdict(lambda: {"n": 0, "all": 0, "ms": [], **{f: 0 for f in fields}})
+    for item in items:
+        start = time.perf_counter()
+        got = extract(item.text)
+        ms = (time.perf_counter() - start) * 1000.0
+        correct = {f: _norm(got.get(f)) == _norm(item.labels[f]) for f in fields}
+        for group in ("all", item.kinds[0]):
+            g = groups[group]
+            g["n"] += 1
+            g["all"] += all(correct.values())
+            g["ms"].append(ms)
+            for f in fields:
+                g[f] += correct[f]
+    report = {}
+    for group, g in groups.items():
+        ms = sorted(g["ms"])
+        report[group] = {
+            "items": g["n"],
+            "accuracy": {f: g[f] / g["n"] for f in fields},
+            "all_fields": g["all"] / g["n"],
+            "latency_ms": {"p50": percentile(ms, 50), "p95": percentile(ms, 95), "max": ms[-1]},
+        }
+    return report
+
+
+def wilson_lower(correct: int, n: int, z: float = 1.96) -> float:
+    """Lower bound of the Wilson score interval for a proportion."""
+    if not n:
+        return 0.0
+    p = correct / n
+    centre = p + z * z / (2 * n)
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n))
+    return max(0.0, (centre - margin) / (1 + z * z / n))
+
+
+def calibrate(items) -> dict:
+    """Per RULE_CONFIDENCE row: how often a field backed by that evidence was right, and a suggested value."""
+    from regex_fallback import RULE_CONFIDENCE, explain_broker_fields
+    counts = defaultdict(lambda: [0, 0])
+    for item in items:
+        fields, evidence = explain_broker_fields(item.text)
+        for f, row in evidence.items():
+            counts[row][0] += 1
+            counts[row][1] += _norm(fields[f]) == _norm(item.labels[f])
+    report = {}
+    for row, current in RULE_CONFIDENCE.items():
+        n, correct = counts.get(row, (0, 0))
+        report[row] = {
+            "n": n,
+            "precision": correct / n if n else None,
+            "current": current,
+            "suggested": math.floor(wilson_lower(correct, n) * 100) / 100 if n else current,
+        }
+    return report
+
+
+def size_sweep(extractors, sizes, seed) -> dict:
+    """Per-item time and correctness on one reply chain per target size."""
+    report = {}
+    for size in sizes:
+        item = make_sized(size, seed)
+        row = {"chars": len(item.text)}
+        for name, extract in extractors.items():
+            start = time.perf_counter()
+            got = extract(item.text)
+            row[name] = {
+                "ms": (time.perf_counter() - start) * 1000.0,
+                "correct": all(_norm(got.get(f)) == _norm(item.labels[f]) for f in SCORED_FIELDS[name]),
+            }
+        report[str(size)] = row
+    return report
+
+
+def print_report(report: dict) -> None:
+    short = {"broker_name": "name", "broker_email": "email", "brokerage": "brokerage", "complete_address": "address"}
+    print(f"{'extractor':<10}{'group':<12}{'items':>6}" + "".join(f"{short[f]:>11}" for f in FIELDS)
+          + f"{'all':>7}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    for name, groups in report["accuracy"].items():
+        for group in ("all",) + KINDS:
+            g = groups.get(group)
+            if g is None:
+                continue
+            acc = "".join(f"{g['accuracy'][f]:>11.2f}" if f in g["accuracy"] else f"{'-':>11}" for f in FIELDS)
+            lat = g["latency_ms"]
+            print(f"{name:<10}{group:<12}{g['items']:>6}{acc}{g['all_fields']:>7.2f}"
+                  f"{lat['p50']:>9.2f}{lat['p95']:>9.2f}{lat['max']:>9.2f}")
+    if report["sizes"]:
+        names = list(report["accuracy"])
+        print(f"\n{'target':>10}{'chars':>10}" + "".join(f"{n + ' ms':>14}" for n in names))
+        for size, row in report["sizes"].items():
+            cells = "".join(f"{row[n]['ms']:>12.1f}{'ok' if row[n]['correct'] else ' x':>2}" for n in names)
+            print(f"{size:>10}{row['chars']:>10}{cells}")
+    if report.get("calibration"):
+        print(f"\n{'evidence':<26}{'n':>6}{'precision':>11}{'current':>9}{'suggested':>11}")
+        for row, c in report["calibration"].items():
+            precision = f"{c['precision']:.3f}" if c["precision"] is not None else "-"
+            print(f"{row:<26}{c['n']:>6}{precision:>11}{c['current']:>9.2f}{c['suggested']:>11.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extractor accuracy and per-item latency on a labelled corpus.")
+    parser.add_argument("--extractors", nargs="+", choices=EXTRACTORS, default=list(EXTRACTORS))
+    parser.add_argument("--count", type=int, default=100, help="generated items (ignored with --corpus)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--corpus", type=str, default="", help="JSONL written by benchmarks.corpus")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000, 10_000, 100_000, 1_000_000],
+                        help="reply-chain sizes (chars) for the latency sweep")
+    parser.add_argument("--llm-latency", type=str, default="fixed:0", help="fake model latency spec (ms)")
+    parser.add_argument("--record", type=str, default="", help="call Groq and save replies to this JSONL")
+    parser.add_argument("--replay", type=str, default="", help="answer from replies saved with --record")
+    parser.add_argument("--calibrate", action="store_true", help="measure each RULE_CONFIDENCE row")
+    parser.add_argument("--out", type=str, default="", help="write the report as JSON")
+    args = parser.parse_args()
+
+    items = list(read_jsonl(args.corpus)) if args.corpus else generate(args.count, args.seed)
+    extractors = build_extractors(args.extractors, args)
+    report = {
+        "config": {**vars(args), "items": len(items)},
+        "accuracy": {name: score(extract, items, SCORED_FIELDS[name]) for name, extract in extractors.items()},
+        "sizes": size_sweep(extractors, args.sizes, args.seed),
+        "calibration": calibrate(items) if args.calibrate else {},
+    }
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
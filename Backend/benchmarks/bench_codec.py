@@ -0,0 +1,81 @@
+"""
+Micro-benchmark: BlurbCodec vs the original per-character XOR loop.
+
+Run from Backend/:
+    python -m benchmarks.bench_codec
+"""
+import base64
+import random
+import string
+import time
+from email_blurb_hashing import BlurbCodec
+
+KEY = "benchmark-secret-key-0123456789"
+
+
+def legacy_hash(text_blurb, key=KEY):
+    result = []
+    key_len = len(key)
+    for i, char in enumerate(text_blurb):
+        result.append(chr(ord(char) ^ ord(key[i % key_len])))
+    return base64.b64encode(''.join(result).encode('utf-8')).decode('utf-8')
+
+
+def legacy_unhash(encrypted_text_blurb, key=KEY):
+    encrypted = base64.b64decode(encrypted_text_blurb.encode('utf-8')).decode('utf-8')
+    result = []
+    key_len = len(key)
+    for i, char in enumerate(encrypted):
+        result.append(chr(ord(char) ^ ord(key[i % key_len])))
+    return ''.join(result)
+
+
+def _throughput(fn, payload, size_bytes, min_seconds=0.3):
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn(payload)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return runs * size_bytes / elapsed / 1e6
+
+
+def main():
+    rng = random.Random(7)
+    codec = BlurbCodec(KEY)
+    alphabet = string.ascii_letters + string.digits + " .,@\n"
+    print(f"{'payload':<22}{'legacy enc':>12}{'codec enc':>12}{'legacy dec':>12}{'codec dec':>12}   (MB/s)")
+    for label, size, extra in (
+        ("ascii 1 KB", 1_000, ""),
+        ("ascii 32 KB", 32_000, ""),
+        ("ascii 256 KB", 256_000, ""),
+        ("unicode 32 KB", 32_000, "éüñ—’“”"),
+    ):
+        chars = alphabet + extra
+        text = "".join(rng.choice(chars) for _ in range(size))
+        encoded = codec.encode(text)
+        assert encoded == legacy_hash(text), "codec output differs from legacy"
+        assert codec.decode(encoded) == text
+        size_bytes = len(text.encode("utf-8"))
+        print(
+            f"{label:<22}"
+            f"{_throughput(legacy_hash, text, size_bytes):>12.1f}"
+            f"{_throughput(codec.encode, text, size_bytes):>12.1f}"
+            f"{_throughput(legacy_unhash, encoded, size_bytes):>12.1f}"
+            f"{_throughput(codec.decode, encoded, size_bytes):>12.1f}"
+        )
+
+    doc = {"email_blurb": text, "broker_name": "Harry Smith", "broker_email": "harry@abc.com",
+           "brokerage": "ABC Insurance", "complete_address": "123 Main St, Chicago, IL 60601"}
+    fields = list(doc)
+    runs = 2000
+    start = time.perf_counter()
+    for _ in range(runs):
+        codec.decode_fields(codec.encode_fields(doc, fields), fields)
+    per_doc_us = (time.perf_counter() - start) / runs * 1e6
+    print(f"\nencode+decode of a 5-field cache document (32 KB blurb): {per_doc_us:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""
+Load benchmark: the FastAPI app (main.app) end to end, offline.
+
+The Groq chat model is replaced by a fake with a configurable latency
+distribution, and Mongo by benchmarks.inmemory_mongo (optionally with a
+per-operation delay). A closed-loop generator keeps --concurrency requests
+in flight against POST /extract for each scenario:
+  - cache-hit  : every blurb was extracted once before measuring
+  - cache-miss : every blurb is new (fast path off, so the agent runs)
+  - fallback   : every blurb is new and the model fails (circuit breaker
+                 opens, regex-only degraded results)
+Reported per scenario: requests/s, p50/p95/p99 latency, Mongo operations per
+request (including the batched log/metrics writes flushed at shutdown) and
+the response sources. Each scenario runs in a fresh interpreter so
+module-level state (caches, breaker, counters) doesn't leak between them.
+
+Latency specs (milliseconds): fixed:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA,
+bimodal:FAST:SLOW:P_SLOW.
+
+Run from Backend/ (no network, Mongo or API key needed):
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --requests 1000 --concurrency 32 --llm-latency lognormal:400:0.5
+    python -m benchmarks.bench_load --compare benchmarks/results/load-<old>.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+SCENARIOS = ("cache-hit", "cache-miss", "fallback")
+
+
+# ---- Fake chat model ----
+def parse_latency(spec: str):
+    """Latency spec -> sampler(rng) returning seconds."""
+    kind, *args = spec.split(":")
+    try:
+        values = [float(a) for a in args]
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0] / 1000.0
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1]) / 1000.0
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) / 1000.0
+        if kind == "bimodal" and len(values) == 3:
+            return lambda rng: (values[1] if rng.random() < values[2] else values[0]) / 1000.0
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(f"bad latency spec {spec!r}")
+
+
+class FakeChatModel:
+    """
+    Stands in for `prompt | llm`: ainvoke() sleeps for a sampled latency, then
+    answers in the compact JSON schema using the rule-based extractor (with
+    high confidences, so the cascade doesn't escalate), or raises when `fail`.
+    """
+
+    def __init__(self, latency, fail: bool = False, seed: int = 0):
+        from regex_fallback import extract_broker_fields
+        from prompt_compression import estimate_tokens
+        self._extract = extract_broker_fields
+        self._estimate = estimate_tokens
+        self.latency = latency
+        self.fail = fail
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.latency(self.rng))
+        if self.fail:
+            raise RuntimeError("simulated provider outage")
+        fields = self._extract(inputs["email_blurb"])
+        content = json.dumps({
+            "name": fields["broker_name"],
+            "email": fields["broker_email"],
+            "brokerage": fields["brokerage"],
+            "address": fields["complete_address"],
+            "conf": [0.95, 0.95, 0.95, 0.95],
+        }, separators=(",", ":"))
+        prompt_tokens = 400 + self._estimate(inputs["email_blurb"])
+        output_tokens = self._estimate(content)
+        return SimpleNamespace(content=content, response_metadata={"token_usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": prompt_tokens + output_tokens,
+        }})
+
+
+# ---- Worker (one scenario, fresh interpreter) ----
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+async def drive(client, blurbs, concurrency):
+    """Closed loop: `concurrency` workers post the blurbs in order; returns per-request records."""
+    records = []
+    it = iter(blurbs)
+
+    async def worker():
+        for text in it:
+            start = time.perf_counter()
+            try:
+                resp = await client.post("/extract", json={"text": text})
+                body = resp.json() if resp.status_code == 200 else {}
+                ok = resp.status_code == 200
+            except Exception:
+                body, ok = {}, False
+            records.append({
+                "ms": (time.perf_counter() - start) * 1000.0,
+                "ok": ok,
+                "degraded": bool(body.get("degraded")),
+                "cache_match": body.get("cache_match", ""),
+            })
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return records
+
+
+def run_scenario(config: dict) -> dict:
+    import settings
+    overrides = {"groq_api_key": "benchmark-dummy-key", "agent_warmup": False}
+    if config["scenario"] != "cache-hit":
+        # Generated blurbs have clean signatures; keep them on the LLM path
+        overrides["fast_path_enabled"] = False
+    if config["scenario"] == "fallback":
+        overrides["llm_breaker_cooldown_seconds"] = 3600.0
+    # Before importing main: module-level objects (breaker, limiters) read settings at import
+    settings._settings = dataclasses.replace(settings.get_settings(), **overrides)
+
+    import httpx
+    import mongo_client
+    from benchmarks.bench_regex import make_message
+    from benchmarks.inmemory_mongo import InMemoryMongoClient
+    fake_mongo = InMemoryMongoClient(latency_ms=config["mongo_latency_ms"])
+    mongo_client._client = fake_mongo  # init_client() keeps an existing client
+
+    import main
+    agent = main.get_agent()
+    model = FakeChatModel(parse_latency(config["llm_latency"]), fail=config["scenario"] == "fallback",
+                          seed=config["seed"])
+    for tier in agent.tiers.values():
+        tier.chain = tier.repair_chain = model
+
+    rng = random.Random(config["seed"])
+    n, warmup = config["requests"], config["warmup"]
+    if config["scenario"] == "cache-hit":
+        pool = [make_message(rng, i)[0] for i in range(config["unique"])]
+        warm_blurbs = pool
+        blurbs = [pool[i % len(pool)] for i in range(n)]
+    else:
+        fresh = [make_message(rng, i)[0] for i in range(warmup + n)]
+        warm_blurbs, blurbs = fresh[:warmup], fresh[warmup:]
+    flush_wait = max(settings.get_settings().log_writer.flush_interval,
+                     settings.get_settings().metrics_writer.flush_interval) + 0.25
+
+    async def go():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await drive(client, warm_blurbs, config["concurrency"])
+                await asyncio.sleep(flush_wait)  # warm-up writes land before counting
+                llm_calls = model.calls
+                ops_before = fake_mongo.snapshot()
+                start = time.perf_counter()
+                records = await drive(client, blurbs, config["concurrency"])
+                elapsed = time.perf_counter() - start
+                app_stats = (await client.get("/stats")).json()
+        # Shutdown flushed the log/metrics writers; their batched inserts count too
+        return records, elapsed, fake_mongo.snapshot() - ops_before, model.calls - llm_calls, app_stats
+
+    records, elapsed, ops, llm_calls, app_stats = asyncio.run(go())
+    latencies = sorted(r["ms"] for r in records)
+    by_collection = Counter()
+    for (collection, _), count in ops.items():
+        by_collection[collection] += count
+    sources = Counter(r["cache_match"] or ("degraded" if r["degraded"] else "extracted") for r in records)
+    return {
+        "requests": len(records),
+        "errors": sum(not r["ok"] for r in records),
+        "elapsed_s": elapsed,
+        "rps": len(records) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "max": latencies[-1] if latencies else 0.0,
+        },
+        "mongo_ops_per_request": sum(ops.values()) / len(records) if records else 0.0,
+        "mongo_ops_by_collection": {c: v / len(records) for c, v in sorted(by_collection.items())},
+        "mongo_ops_by_type": {f"{c}.{op}": v for (c, op), v in sorted(ops.items())},
+        "llm_calls_per_request": llm_calls / len(records) if records else 0.0,
+        "sources": dict(sources),
+        "llm_breaker": app_stats.get("llm_breaker", {}),
+    }
+
+
+# ---- Driver ----
+def run_worker(config: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_load", "--worker", json.dumps(config)],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"{config['scenario']} worker failed:\n{out.stderr[-4000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def print_table(report: dict) -> None:
+    print(f"{'scenario':<12}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mongo ops/req':>15}{'errors':>8}")
+    for name, r in report["scenarios"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<12}{r['rps']:>9.1f}{lat['p50']:>10.1f}{lat['p95']:>10.1f}{lat['p99']:>10.1f}"
+              f"{r['mongo_ops_per_request']:>15.2f}{r['errors']:>8}")
+
+
+def print_comparison(old: dict, new: dict) -> None:
+    print(f"\nvs {old.get('commit', '?')} ({old.get('timestamp', '?')}):")
+    print(f"{'scenario':<12}{'metric':<16}{'old':>10}{'new':>10}{'change':>9}")
+    for name, r in new["scenarios"].items():
+        prev = old.get("scenarios", {}).get(name)
+        if not prev:
+            continue
+        rows = [("rps", prev["rps"], r["rps"])]
+        rows += [(f"{q} ms", prev["latency_ms"][q], r["latency_ms"][q]) for q in ("p50", "p95", "p99")]
+        rows.append(("mongo ops/req", prev["mongo_ops_per_request"], r["mongo_ops_per_request"]))
+        for metric, a, b in rows:
+            change = f"{(b - a) / a * 100.0:+.1f}%" if a else "n/a"
+            print(f"{name:<12}{metric:<16}{a:>10.2f}{b:>10.2f}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of POST /extract.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--unique", type=int, default=50, help="distinct blurbs in the cache-hit scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests before cache-miss/fallback")
+    parser.add_argument("--llm-latency", type=str, default="lognormal:300:0.4", help="fake model latency spec (ms)")
+    parser.add_argument("--mongo-latency-ms", type=float, default=0.0, help="delay per Mongo operation")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", type=str, default="", help="result JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", type=str, default="", help="earlier result JSON to diff against")
+    parser.add_argument("--worker", type=str, default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(json.loads(args.worker))))
+        return
+
+    parse_latency(args.llm_latency)  # fail on a bad spec before starting workers
+    config = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "unique": args.unique,
+        "warmup": args.warmup,
+        "llm_latency": args.llm_latency,
+        "mongo_latency_ms": args.mongo_latency_ms,
+        "seed": args.seed,
+    }
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "config": config,
+        "scenarios": {},
+    }
+    for scenario in args.scenarios:
+        print(f"Running {scenario} ({args.requests} requests, concurrency {args.concurrency})...")
+        report["scenarios"][scenario] = run_worker({**config, "scenario": scenario})
+
+    print()
+    print_table(report)
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"load-{report['commit']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: single-pass regex_fallback scanner vs the original chunk/findall
+functions, on generated reply chains and on pathological inputs.
+
+Run from Backend/:
+    python -m benchmarks.bench_regex
+    python -m benchmarks.bench_regex --depths 10 100 500 --repeat 5
+"""
+import argparse
+import random
+import re
+import time
+import regex_fallback
+
+STATES = [("Los Angeles", "CA"), ("Seattle", "WA"), ("Chicago", "IL"), ("Austin", "TX"),
+          ("Boston", "MA"), ("Denver", "CO"), ("Miami", "FL"), ("Albany", "New York")]
+
+
+# ---- Original implementation (copied for comparison) ----
+def legacy_get_signature(email_blurb):
+    cleaned_blurb = email_blurb.replace('\n', ' ')
+    chunk_size = 1500
+    selected_signature = ""
+    for i in range(0, len(cleaned_blurb), chunk_size):
+        chunk = cleaned_blurb[i:i+chunk_size]
+        if (("license" in chunk) or ("License" in chunk)) and (".com" in chunk):
+            selected_signature = chunk.strip()
+            break
+    return selected_signature
+
+
+def legacy_get_email(signature):
+    email_pattern = r'\b([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b'
+    emails = re.findall(email_pattern, signature, re.IGNORECASE)
+    return emails[0] if emails else ""
+
+
+def legacy_get_address(signature):
+    address_pattern = r'(\d+[^0-9\n]*(?:CA|WA)\s+\d{5}(?:\-\d{4})?)'
+    addresses = re.findall(address_pattern, signature, re.IGNORECASE)
+    return addresses[0].strip() if addresses else ""
+
+
+def legacy_get_broker_info(email_blurb):
+    signature = legacy_get_signature(email_blurb)
+    return {"broker_email": legacy_get_email(signature), "complete_address": legacy_get_address(signature)}
+
+
+# ---- Inputs ----
+def make_message(rng, i):
+    city, state = rng.choice(STATES)
+    name = f"Broker{i} Person"
+    email = f"broker{i}@agency{i % 7}.com"
+    address = f"{100 + i} Main St, {city}, {state} {rng.randint(10000, 99999)}"
+    body = " ".join(rng.choice(["please", "see", "attached", "quote", "for", "the", "renewal", "thanks"])
+                    for _ in range(rng.randint(20, 60)))
+    text = (f"Hi team,\n\n{body}.\n\nBest regards,\n{name}, AINS\nLicense 0G{10000 + i}\n"
+            f"Agency {i} Insurance\n{address}\nDirect: (312) 555-{i % 10000:04d}\n{email}\n")
+    return text, email, address
+
+
+def make_chain(depth, seed=7):
+    """Newest message first, older ones quoted below with From/Sent headers."""
+    rng = random.Random(seed)
+    parts = []
+    expected = None
+    for i in range(depth):
+        text, email, address = make_message(rng, i)
+        if expected is None:
+            expected = (email, address)
+        else:
+            parts.append(f"\n-----Original Message-----\nFrom: Broker{i} <{email}>\nSent: Monday\nSubject: RE: quote\n")
+        parts.append(text)
+    return "".join(parts), expected
+
+
+def pathological(size):
+    # Gate keywords first so the original code actually runs its regexes on the chunk
+    return {
+        "long token": "License x.com " + "a" * size,
+        "numbers+spaces": "License x.com " + "1 " * (size // 2),
+        "street without zip": "License x.com " + "12 Main St, CA " * (size // 15),
+        "dotted local part": "License x.com " + "a." * (size // 2) + "@",
+    }
+
+
+def timed(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="regex_fallback scanner benchmark")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--patho-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    print("Reply chains (best of repeat; 'ok' = newest sender's email/address found)")
+    print(f"{'depth':>6}{'chars':>10}{'legacy ms':>12}{'scanner ms':>12}   legacy ok   scanner ok")
+    for depth in args.depths:
+        text, (email, address) = make_chain(depth)
+        legacy_ms, legacy = timed(legacy_get_broker_info, text, args.repeat)
+        new_ms, new = timed(regex_fallback.get_broker_info, text, args.repeat)
+        legacy_ok = f"{legacy['broker_email'] == email!s:>5}/{legacy['complete_address'] == address!s:<5}"
+        new_ok = f"{new['broker_email'] == email!s:>5}/{new['complete_address'] == address!s:<5}"
+        print(f"{depth:>6}{len(text):>10}{legacy_ms:>12.2f}{new_ms:>12.2f}   {legacy_ok}  {new_ok}")
+
+    print(f"\nPathological inputs (~{args.patho_size} chars)")
+    print(f"{'input':<22}{'legacy ms':>12}{'scanner ms':>12}")
+    for name, text in pathological(args.patho_size).items():
+        legacy_ms, _ = timed(legacy_get_broker_info, text, 1)
+        new_ms, _ = timed(regex_fallback.get_broker_info, text, 1)
+        print(f"{name:<22}{legacy_ms:>12.2f}{new_ms:>12.2f}")
+
+    # Scanner worst case over the full scan limit (legacy omitted: it only reads one 1500-char chunk)
+    limit = regex_fallback.MAX_SCAN_CHARS
+    worst = max(timed(regex_fallback.get_broker_info, t, 1)[0] for t in pathological(limit).values())
+    print(f"\nScanner worst case at MAX_SCAN_CHARS={limit}: {worst:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
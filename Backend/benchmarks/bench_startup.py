@@ -0,0 +1,129 @@
+"""
+Startup benchmark: cold import and first-request latency of the API.
+
+Every sample runs in fresh interpreters so module caches don't hide
+import cost. The headline is the time from `import main` to the answer of
+the first /extract that goes through the agent: app startup (lifespan,
+with benchmarks.inmemory_mongo standing in for Mongo), then one request
+with the fast path off and the LLM replaced by bench_load's FakeChatModel,
+so the agent build and the whole cache-miss flow are paid but no network
+call is. Reported (median of --runs):
+  - import main           : what uvicorn pays before it can bind
+  - startup               : lifespan (Mongo client, writers, agent warm-up kick-off)
+  - first /extract        : first agent request, stubbed LLM (waits for the agent
+                            build unless warm-up already finished it)
+  - first /health         : first request of a separate process (no lifespan, no Mongo)
+  - build agent           : LangChain import + client setup, in that /health process
+  - import studio_graph   : LangGraph + graph compile, only paid by Studio
+
+Run from Backend/ (no network or Mongo needed; a dummy GROQ_API_KEY is used):
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --runs 5 --no-warmup   # agent built inside the first /extract
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EXTRACT_PROBE = r"""
+import dataclasses, json, random, sys, time
+t0 = time.perf_counter()
+import settings
+settings._settings = dataclasses.replace(
+    settings.get_settings(), groq_api_key="benchmark-dummy-key", fast_path_enabled=False,
+    agent_warmup=sys.argv[1] == "1",
+)
+import main
+t1 = time.perf_counter()
+# Stubs (not timed): in-memory Mongo and the fake model, installed before startup
+import email_parser_agent, mongo_client
+from benchmarks.bench_load import FakeChatModel, parse_latency
+from benchmarks.bench_regex import make_message
+from benchmarks.inmemory_mongo import InMemoryMongoClient
+mongo_client._client = InMemoryMongoClient()  # init_client() keeps an existing client
+model = FakeChatModel(parse_latency("fixed:0"))
+_build = email_parser_agent.EmailParserAgent.__init__
+def _stubbed(self):
+    _build(self)  # the real build (LangChain import, client setup) is still timed
+    for tier in self.tiers.values():
+        tier.chain = tier.repair_chain = model
+email_parser_agent.EmailParserAgent.__init__ = _stubbed
+text, email, _ = make_message(random.Random(0), 0)
+from fastapi.testclient import TestClient
+t2 = time.perf_counter()
+with TestClient(main.app) as client:
+    t3 = time.perf_counter()
+    resp = client.post("/extract", json={"text": text})
+    t4 = time.perf_counter()
+assert resp.status_code == 200 and resp.json()["broker_email"] == email, resp.text
+assert model.calls >= 1, "the first /extract did not reach the agent"
+print(json.dumps({
+    "import main": t1 - t0,
+    "startup": t3 - t2,
+    "first /extract": t4 - t3,
+}))
+"""
+
+HEALTH_PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(main.app)  # no `with`: lifespan (Mongo) is skipped
+t2 = time.perf_counter()
+assert client.get("/health").status_code == 200
+t3 = time.perf_counter()
+main.get_agent()
+t4 = time.perf_counter()
+import studio_graph
+t5 = time.perf_counter()
+print(json.dumps({
+    "first /health": t3 - t2,
+    "build agent": t4 - t3,
+    "import studio_graph": t5 - t4,
+}))
+"""
+
+
+def _run(probe: str, *args) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "benchmark-dummy-key")
+    out = subprocess.run(
+        [sys.executable, "-c", probe, *args],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def sample(warmup: bool) -> dict:
+    return {**_run(EXTRACT_PROBE, "1" if warmup else "0"), **_run(HEALTH_PROBE)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start and first-request latency.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="disable AGENT_WARMUP so the first /extract builds the agent itself")
+    args = parser.parse_args()
+
+    samples = [sample(not args.no_warmup) for _ in range(max(1, args.runs))]
+    print(f"{'stage':<22}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for stage in samples[0]:
+        values = [s[stage] * 1000.0 for s in samples]
+        print(f"{stage:<22}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    first_extract = statistics.median(
+        s["import main"] + s["startup"] + s["first /extract"] for s in samples
+    ) * 1000.0
+    first_health = statistics.median(s["import main"] + s["first /health"] for s in samples) * 1000.0
+    print(f"\nImport to first /extract (agent, stubbed LLM): {first_extract:.1f} ms "
+          f"(runs={len(samples)}, warmup={'off' if args.no_warmup else 'on'})")
+    print(f"Import to first /health: {first_health:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Seeded generator of labelled broker emails for accuracy and speed benchmarks.
+
+Every item carries the expected broker fields (the retail insurance broker,
+as the agent prompt asks for) and the kinds of difficulty it contains:
+  - simple      : one message with the broker's signature
+  - multi-sig   : other licensed signatures in the thread (underwriter reply,
+                  assistant writing on the broker's behalf)
+  - wholesaler  : a wholesaler's licensed signature on top, the retail broker
+                  only in the quoted submission below (decoy)
+  - long-chain  : many quoted replies, "> " quoting or Outlook headers
+  - disclaimer  : confidentiality footer with a compliance email and an HQ address
+Addresses cycle through all 50 states plus DC, abbreviated or spelled out,
+on one line or as a street line above "City, ST 12345".
+
+Same seed, same corpus. Write one to JSONL (and read it back) with:
+    python -m benchmarks.corpus --count 200 --out corpus.jsonl
+"""
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List
+
+KINDS = ("simple", "multi-sig", "wholesaler", "long-chain", "disclaimer")
+FIELDS = ("broker_name", "broker_email", "brokerage", "complete_address")
+
+STATES = [
+    ("AL", "Alabama", "Birmingham"), ("AK", "Alaska", "Anchorage"), ("AZ", "Arizona", "Phoenix"),
+    ("AR", "Arkansas", "Little Rock"), ("CA", "California", "Los Angeles"), ("CO", "Colorado", "Denver"),
+    ("CT", "Connecticut", "Hartford"), ("DE", "Delaware", "Wilmington"), ("FL", "Florida", "Miami"),
+    ("GA", "Georgia", "Atlanta"), ("HI", "Hawaii", "Honolulu"), ("ID", "Idaho", "Boise"),
+    ("IL", "Illinois", "Chicago"), ("IN", "Indiana", "Indianapolis"), ("IA", "Iowa", "Des Moines"),
+    ("KS", "Kansas", "Wichita"), ("KY", "Kentucky", "Louisville"), ("LA", "Louisiana", "New Orleans"),
+    ("ME", "Maine", "Portland"), ("MD", "Maryland", "Baltimore"), ("MA", "Massachusetts", "Boston"),
+    ("MI", "Michigan", "Detroit"), ("MN", "Minnesota", "Minneapolis"), ("MS", "Mississippi", "Jackson"),
+    ("MO", "Missouri", "Kansas City"), ("MT", "Montana", "Billings"), ("NE", "Nebraska", "Omaha"),
+    ("NV", "Nevada", "Las Vegas"), ("NH", "New Hampshire", "Manchester"), ("NJ", "New Jersey", "Newark"),
+    ("NM", "New Mexico", "Albuquerque"), ("NY", "New York", "New York"), ("NC", "North Carolina", "Charlotte"),
+    ("ND", "North Dakota", "Fargo"), ("OH", "Ohio", "Columbus"), ("OK", "Oklahoma", "Tulsa"),
+    ("OR", "Oregon", "Portland"), ("PA", "Pennsylvania", "Philadelphia"), ("RI", "Rhode Island", "Providence"),
+    ("SC", "South Carolina", "Charleston"), ("SD", "South Dakota", "Sioux Falls"), ("TN", "Tennessee", "Nashville"),
+    ("TX", "Texas", "Austin"), ("UT", "Utah", "Salt Lake City"), ("VT", "Vermont", "Burlington"),
+    ("VA", "Virginia", "Richmond"), ("WA", "Washington", "Seattle"), ("WV", "West Virginia", "Charleston"),
+    ("WI", "Wisconsin", "Milwaukee"), ("WY", "Wyoming", "Cheyenne"), ("DC", "District of Columbia", "Washington"),
+]
+FIRST_NAMES = ["Harry", "Susan", "Maria", "James", "Linda", "Robert", "Priya", "Kevin", "Angela", "Tom",
+               "Rachel", "Diego", "Karen", "Samuel", "Olivia", "Marcus", "Grace", "Victor", "Nina", "Paul"]
+LAST_NAMES = ["Smith", "Miller", "Garcia", "Johnson", "Nguyen", "Brown", "Patel", "Davis", "Lopez", "Wilson",
+              "Anderson", "Thomas", "Moore", "Martin", "Clark", "Lewis", "Walker", "Young", "Hall", "Reed"]
+FIRM_WORDS = ["Summit", "Harbor", "Keystone", "Pioneer", "Granite", "Liberty", "Cedar", "Beacon", "Frontier",
+              "Crescent", "Northstar", "Redwood", "Heritage", "Sterling", "Bluewater", "Ironwood"]
+FIRM_SUFFIXES = ["Insurance Agency", "Insurance Services", "Insurance Group", "Risk Partners LLC",
+                 "Insurance Brokers", "Agency Inc."]
+STREETS = ["Main St", "Market St", "Oak Avenue", "Commerce Drive", "Elm Street", "Park Blvd", "Lakeview Road",
+           "Washington Ave", "Industrial Pkwy", "Harbor Way", "Cedar Lane", "Broadway"]
+TITLES = ["Account Executive", "Commercial Lines Producer", "Senior Broker", "Agency Principal",
+          "Client Service Manager", "Personal Lines Agent"]
+DESIGNATIONS = ["", ", CIC", ", AINS", ", CPCU", ", ARM", ", CRM"]
+INSUREDS = ["Blue Ridge Bakery", "Apex Roofing", "Sunset Dental Group", "Metro Auto Body", "Lakeside Marina",
+            "Golden Crust Pizza", "Coastal Landscaping", "Northside Daycare"]
+LINES_OF_BUSINESS = ["general liability", "property", "workers comp", "commercial auto", "umbrella", "BOP"]
+SENTENCES = [
+    "Please see the attached submission for {insured}.",
+    "The insured is looking for {line} coverage effective the first of next month.",
+    "Loss runs for the last five years are attached.",
+    "Can you let me know if you need anything else to quote this?",
+    "Expiring premium was about ${premium:,} with the incumbent carrier.",
+    "They would like to bind by Friday if the terms work.",
+    "Following up on the quote below, any update?",
+    "The client signed the application and the supplemental forms.",
+    "Please confirm the payroll figures before we finalize.",
+    "We are still waiting on the inspection report.",
+]
+# Firm name suffix and email domain suffix per role
+ROLES = {
+    "broker": (None, "ins.com"),
+    "wholesaler": ("Specialty Wholesale", "wholesale.com"),
+    "underwriter": ("Underwriting Managers", "uw.com"),
+}
+DISCLAIMER = (
+    "CONFIDENTIALITY NOTICE: This e-mail and any attachments are intended only for the named recipient "
+    "and may contain privileged information. If you received this message in error, notify "
+    "compliance@{domain} and delete it. Coverage cannot be bound or altered by e-mail.\n"
+    "{firm} corporate office: {hq}"
+)
+
+
+@dataclass
+class LabeledEmail:
+    """One generated email: the text, the expected broker fields and its difficulty kinds."""
+    id: str
+    text: str
+    labels: Dict[str, str]
+    kinds: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Person:
+    name: str
+    email: str
+    firm: str
+    address_lines: List[str]  # as written in the signature (one or two lines)
+    address: str              # expected extraction
+    phone: str
+    license: str
+    title: str
+    designation: str = ""
+
+
+def _address(rng: random.Random, state_idx: int):
+    abbr, name, city = STATES[state_idx % len(STATES)]
+    state = name if rng.random() < 0.2 else abbr
+    street = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+    if rng.random() < 0.2:
+        street += f", Suite {rng.randint(100, 999)}"
+    zip_code = f"{rng.randint(10000, 99999)}"
+    if rng.random() < 0.1:
+        zip_code += f"-{rng.randint(1000, 9999)}"
+    tail = f"{city}, {state} {zip_code}"
+    lines = [f"{street}, {tail}"] if rng.random() < 0.7 else [street, tail]
+    return lines, f"{street}, {tail}"
+
+
+def _person(rng: random.Random, state_idx: int, firm: str = "", role: str = "broker") -> Person:
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    firm_suffix, domain_suffix = ROLES[role]
+    if not firm:
+        firm = f"{rng.choice(FIRM_WORDS)} {firm_suffix or rng.choice(FIRM_SUFFIXES)}"
+    domain = "".join(ch for ch in firm.split()[0].lower() if ch.isalpha()) + domain_suffix
+    local = rng.choice([f"{first}.{last}", f"{first[0]}{last}", first]).lower()
+    lines, address = _address(rng, state_idx)
+    return Person(
+        name=f"{first} {last}",
+        email=f"{local}@{domain}",
+        firm=firm,
+        address_lines=lines,
+        address=address,
+        phone=f"({rng.randint(201, 989)}) 555-{rng.randint(0, 9999):04d}",
+        license=f"{rng.choice('0ABCD')}{rng.choice('GHKL')}{rng.randint(10000, 99999)}",
+        title=rng.choice(TITLES),
+        designation=rng.choice(DESIGNATIONS),
+    )
+
+
+def _signature(rng: random.Random, p: Person, licensed: bool = True) -> str:
+    """One of a few common signature layouts."""
+    style = rng.randrange(3)
+    license_line = f"License #{p.license}" if licensed else ""
+    if style == 0:
+        lines = [rng.choice(["Thanks,", "Best regards,", "Regards,", "Thank you,"]), f"{p.name}{p.designation}",
+                 p.title, license_line, p.firm, *p.address_lines, f"Direct: {p.phone}", p.email]
+    elif style == 1:
+        lic = f" | Lic #{p.license}" if licensed else ""
+        lines = [f"{p.name} | {p.title}{lic}", f"{p.firm} | {p.address}",
+                 f"P: {p.phone} | {p.email}"]
+    else:
+        lines = ["Best,", p.name, p.firm, *p.address_lines, f"Office: {p.phone}", f"Email: {p.email}",
+                 f"CA License {p.license}" if licensed else ""]
+    return "\n".join(line for line in lines if line)
+
+
+def _body(rng: random.Random, sentences: int = 3) -> str:
+    picked = rng.sample(SENTENCES, k=min(sentences, len(SENTENCES)))
+    text = " ".join(s.format(insured=rng.choice(INSUREDS), line=rng.choice(LINES_OF_BUSINESS),
+                             premium=rng.randint(2, 90) * 1000) for s in picked)
+    return f"Hi {rng.choice(FIRST_NAMES)},\n\n{text}"
+
+
+def _quote(rng: random.Random, sender: Person, recipient: Person, message: str) -> str:
+    """Older message below a reply: Outlook header block or "On ... wrote:" with "> " quoting."""
+    if rng.random() < 0.5:
+        return (
+            f"\n\n-----Original Message-----\nFrom: {sender.name} <{sender.email}>\n"
+            f"Sent: {rng.choice(['Monday', 'Tuesday', 'Wednesday', 'Thursday'])}, May {rng.randint(1, 28)}, 2024 "
+            f"{rng.randint(8, 11)}:{rng.randint(10, 59)} AM\nTo: {recipient.name} <{recipient.email}>\n"
+            f"Subject: RE: {rng.choice(INSUREDS)} submission\n\n{message}"
+        )
+    quoted = "\n".join(f"> {line}" if line else ">" for line in message.split("\n"))
+    return f"\n\nOn Tue, May {rng.randint(1, 28)}, 2024 at 9:{rng.randint(10, 59)} AM {sender.name} <{sender.email}> wrote:\n{quoted}"
+
+
+def _labels(p: Person) -> Dict[str, str]:
+    return {"broker_name": p.name, "broker_email": p.email, "brokerage": p.firm, "complete_address": p.address}
+
+
+def make_item(kind: str, rng: random.Random, idx: int, depth: int = 0) -> LabeledEmail:
+    """One labelled email of the given kind; depth sets the number of quoted replies (long-chain)."""
+    broker = _person(rng, idx)
+    underwriter = _person(rng, idx + 17, role="underwriter")
+    kinds = [kind]
+    if kind == "simple":
+        text = f"{_body(rng)}\n\n{_signature(rng, broker)}"
+    elif kind == "multi-sig":
+        if rng.random() < 0.5:
+            older = f"{_body(rng, 2)}\n\n{_signature(rng, underwriter)}"
+            text = f"{_body(rng)}\n\n{_signature(rng, broker)}" + _quote(rng, underwriter, broker, older)
+        else:
+            assistant = _person(rng, idx, firm=broker.firm)
+            text = (f"{_body(rng)}\n\nSent on behalf of {broker.name}.\n\n{_signature(rng, assistant, licensed=False)}"
+                    f"\n\n{_signature(rng, broker)}")
+    elif kind == "wholesaler":
+        wholesaler = _person(rng, idx + 29, role="wholesaler")
+        top = (f"Hi {underwriter.name.split()[0]},\n\nPlease see the submission below from our retail broker.\n\n"
+               f"{wholesaler.name} | Associate Broker, Property | resident license: {wholesaler.license}\n"
+               f"Direct: {wholesaler.phone} | {wholesaler.email}\n"
+               f"{wholesaler.firm} | {wholesaler.address} | Top 10 Largest P&C Wholesaler | "
+               f"Five-Star Wholesale Broker")
+        submission = f"{_body(rng)}\n\n{_signature(rng, broker)}"
+        text = top + _quote(rng, broker, wholesaler, submission)
+    elif kind == "long-chain":
+        text = f"{_body(rng)}\n\n{_signature(rng, broker)}"
+        thread = ""
+        for i in range(depth or rng.randint(4, 12)):
+            sender = underwriter if i % 2 == 0 else broker
+            message = f"{_body(rng, 2)}\n\n{_signature(rng, sender)}" + thread
+            thread = _quote(rng, sender, broker if sender is underwriter else underwriter, message)
+        text += thread
+    elif kind == "disclaimer":
+        domain = broker.email.split("@", 1)[1]
+        _, hq = _address(rng, idx + 5)
+        text = (f"{_body(rng)}\n\n{_signature(rng, broker)}\n\n"
+                + DISCLAIMER.format(domain=domain, firm=broker.firm, hq=hq))
+    else:
+        raise ValueError(f"unknown kind {kind!r}")
+    if "\n> " in text or "Original Message" in text:
+        kinds.append("quoted")
+    return LabeledEmail(id=f"{kind}-{idx}", text=text, labels=_labels(broker), kinds=kinds)
+
+
+def generate(count: int, seed: int = 7, kinds=KINDS) -> List[LabeledEmail]:
+    """`count` items cycling through `kinds`; item i uses state i, so 51+ items cover every state."""
+    rng = random.Random(seed)
+    return [make_item(kinds[i % len(kinds)], rng, i) for i in range(count)]
+
+
+def make_sized(target_chars: int, seed: int = 7) -> LabeledEmail:
+    """The shortest reply chain (newest message from the broker) of at least `target_chars`."""
+    def build(depth):
+        return make_item("long-chain", random.Random(seed), 0, depth=depth)
+
+    # Double the depth until the target is passed, then bisect
+    lo, hi = 0, 1
+    while len(build(hi).text) < target_chars:
+        lo, hi = hi, hi * 2
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if len(build(mid).text) < target_chars:
+            lo = mid
+        else:
+            hi = mid
+    item = build(hi)
+    item.id = f"sized-{target_chars}"
+    return item
+
+
+def write_jsonl(items, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(asdict(item)) + "\n")
+
+
+def read_jsonl(path: str) -> Iterator[LabeledEmail]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield LabeledEmail(**json.loads(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a labelled broker-email corpus.")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--out", type=str, default="", help="JSONL path (prints a sample when omitted)")
+    args = parser.parse_args()
+
+    items = generate(args.count, args.seed, tuple(args.kinds))
+    if args.out:
+        write_jsonl(items, args.out)
+        print(f"Wrote {len(items)} items ({sum(len(i.text) for i in items)} chars) to {args.out}")
+        return
+    for item in items[:len(args.kinds)]:
+        print(f"=== {item.id} {item.kinds} ===\n{item.text}\n--- expected: {item.labels}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+In-process stand-in for the pymongo client, for offline benchmarks.
+
+Implements the subset of the collection API this app uses (find/find_one,
+insert_one/insert_many, update_one/find_one_and_update with upserts,
+bulk_write, delete_many, create_index) with the query operators it sends
+($in, $ne, $exists, $gt, $or, $and). Unique indexes are enforced and used for
+equality lookups. Every call counts as one operation (a round-trip), and
+an optional per-operation delay stands in for network latency.
+Not a general Mongo emulator: anything else raises NotImplementedError.
+"""
+import copy
+import itertools
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in":
+                    ok = doc.get(key) in arg
+                elif op == "$ne":
+                    ok = doc.get(key) != arg
+                elif op == "$exists":
+                    ok = (key in doc) == bool(arg)
+                elif op == "$gt":
+                    ok = key in doc and doc[key] > arg
+                else:
+                    raise NotImplementedError(f"query operator {op}")
+                if not ok:
+                    return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+def _project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    fields = [f for f, on in projection.items() if on]
+    out = {f: copy.deepcopy(doc[f]) for f in fields if f in doc}
+    if projection.get("_id", 1):
+        out["_id"] = doc["_id"]
+    return out
+
+
+class Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        present = [d for d in self._docs if d.get(key) is not None]
+        missing = [d for d in self._docs if d.get(key) is None]
+        present.sort(key=lambda d: d[key], reverse=direction < 0)
+        self._docs = present + missing if direction > 0 else missing + present
+        return self
+
+    def limit(self, n):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class Collection:
+    def __init__(self, client, name: str):
+        self._client = client
+        self.name = name
+        self._docs = {}  # _id -> doc
+        self._unique = {}  # field -> {value: _id}
+        self._lock = threading.RLock()
+
+    # ---- bookkeeping ----
+    def _op(self, kind: str) -> None:
+        self._client.count(self.name, kind)
+
+    def _index_add(self, doc: dict) -> None:
+        for field, index in self._unique.items():
+            if field in doc:
+                owner = index.get(doc[field])
+                if owner is not None and owner != doc["_id"]:
+                    raise DuplicateKeyError(f"E11000 duplicate key {field}: {doc[field]!r}")
+        for field, index in self._unique.items():
+            if field in doc:
+                index[doc[field]] = doc["_id"]
+
+    def _index_remove(self, doc: dict) -> None:
+        for field, index in self._unique.items():
+            if field in doc and index.get(doc[field]) == doc["_id"]:
+                del index[doc[field]]
+
+    def _candidates(self, query: dict):
+        # Equality on a unique field: index lookup instead of a scan
+        for field, index in self._unique.items():
+            value = query.get(field)
+            if value is not None and not isinstance(value, dict):
+                _id = index.get(value)
+                return [self._docs[_id]] if _id is not None else []
+        return list(self._docs.values())
+
+    def _find(self, query):
+        query = query or {}
+        return [d for d in self._candidates(query) if _matches(d, query)]
+
+    # ---- API ----
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        self._op("create_index")
+        field = keys[0][0] if isinstance(keys, list) else keys
+        with self._lock:
+            if unique and field not in self._unique:
+                self._unique[field] = {d[field]: _id for _id, d in self._docs.items() if field in d}
+        return name or f"{field}_1"
+
+    def find_one(self, query=None, projection=None):
+        self._op("find_one")
+        with self._lock:
+            found = self._find(query)
+            return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None, **kwargs):
+        self._op("find")
+        with self._lock:
+            return Cursor([_project(d, projection) for d in self._find(query)])
+
+    def insert_one(self, doc):
+        self._op("insert_one")
+        with self._lock:
+            doc = copy.deepcopy(doc)
+            doc.setdefault("_id", self._client.next_id())
+            self._index_add(doc)
+            self._docs[doc["_id"]] = doc
+            return SimpleNamespace(inserted_id=doc["_id"])
+
+    def insert_many(self, docs, ordered=True):
+        self._op("insert_many")
+        ids = []
+        with self._lock:
+            for doc in docs:
+                doc = copy.deepcopy(doc)
+                doc.setdefault("_id", self._client.next_id())
+                self._index_add(doc)
+                self._docs[doc["_id"]] = doc
+                ids.append(doc["_id"])
+        return SimpleNamespace(inserted_ids=ids)
+
+    def _update(self, query, update, upsert):
+        """Apply $set/$setOnInsert/$unset to the first match (or upsert). Returns (doc, upserted_id, modified)."""
+        found = self._find(query)
+        if found:
+            doc = found[0]
+            before = copy.deepcopy(doc)
+            self._index_remove(doc)
+            doc.update(copy.deepcopy(update.get("$set", {})))
+            for field in update.get("$unset", {}):
+                doc.pop(field, None)
+            try:
+                self._index_add(doc)
+            except DuplicateKeyError:
+                self._docs[doc["_id"]] = before
+                self._index_add(before)
+                raise
+            return doc, None, doc != before
+        if not upsert:
+            return None, None, False
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc.update(copy.deepcopy(update.get("$set", {})))
+        doc.update(copy.deepcopy(update.get("$setOnInsert", {})))
+        doc["_id"] = self._client.next_id()
+        self._index_add(doc)
+        self._docs[doc["_id"]] = doc
+        return doc, doc["_id"], False
+
+    def update_one(self, query, update, upsert=False):
+        self._op("update_one")
+        with self._lock:
+            doc, upserted_id, modified = self._update(query, update, upsert)
+        return SimpleNamespace(
+            matched_count=int(doc is not None and upserted_id is None),
+            modified_count=int(modified),
+            upserted_id=upserted_id,
+        )
+
+    def find_one_and_update(self, query, update, upsert=False, projection=None, return_document=None, **kwargs):
+        self._op("find_one_and_update")
+        with self._lock:
+            doc, _, _ = self._update(query, update, upsert)
+            return _project(doc, projection) if doc is not None else None
+
+    def bulk_write(self, requests, ordered=True):
+        self._op("bulk_write")
+        errors = []
+        modified = 0
+        with self._lock:
+            for i, req in enumerate(requests):
+                try:
+                    if isinstance(req, UpdateOne):
+                        _, _, changed = self._update(req._filter, req._doc, bool(req._upsert))
+                        modified += int(changed)
+                    elif isinstance(req, DeleteOne):
+                        found = self._find(req._filter)
+                        if found:
+                            self._index_remove(found[0])
+                            del self._docs[found[0]["_id"]]
+                    else:
+                        raise NotImplementedError(type(req).__name__)
+                except DuplicateKeyError as e:
+                    errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nModified": modified})
+        return SimpleNamespace(modified_count=modified)
+
+    def delete_many(self, query):
+        self._op("delete_many")
+        with self._lock:
+            found = self._find(query)
+            for doc in found:
+                self._index_remove(doc)
+                del self._docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(found))
+
+    def count_documents(self, query=None):
+        self._op("count_documents")
+        with self._lock:
+            return len(self._find(query))
+
+
+class Database:
+    def __init__(self, client, name: str):
+        self._client = client
+        self.name = name
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> Collection:
+        if name not in self._collections:
+            self._collections[name] = Collection(self._client, name)
+        return self._collections[name]
+
+
+class InMemoryMongoClient:
+    """Drop-in for mongo_client._client. `ops` counts calls per (collection, operation)."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.ops = Counter()
+        self._ops_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._dbs = {}
+        self.admin = SimpleNamespace(command=lambda *args, **kwargs: {"ok": 1})
+
+    def __getitem__(self, name: str) -> Database:
+        if name not in self._dbs:
+            self._dbs[name] = Database(self, name)
+        return self._dbs[name]
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def count(self, collection: str, kind: str) -> None:
+        with self._ops_lock:
+            self.ops[(collection, kind)] += 1
+        if self.latency_ms:
+            # Blocking, like a real round-trip (callers run on the storage executor)
+            time.sleep(self.latency_ms / 1000.0)
+
+    def snapshot(self) -> Counter:
+        with self._ops_lock:
+            return Counter(self.ops)
+
+    def close(self) -> None:
+        pass
@@ -1,45 +1,115 @@
 import base64
-import os
-from dotenv import load_dotenv
+import hashlib
+import hmac
+import threading
+from settings import get_settings, on_reload
 
-def hash(text_blurb):
-    # Load Backend/.env and get HASH_SECRET_KEY at call time
-    env_path = os.path.join(os.path.dirname(__file__), ".env")
-    load_dotenv(dotenv_path=env_path, override=True)
-    key = os.getenv("HASH_SECRET_KEY")
-    if not key:
-        raise SystemExit("HASH_SECRET_KEY missing in Backend/.env")
 
-    result = []
-    key_len = len(key)
+class BlurbCodec:
+    """
+    Reversible XOR + Base64 field codec, built once from the secret key.
 
-    for i, char in enumerate(text_blurb):
-        key_char = key[i % key_len]
-        encrypted_char = chr(ord(char) ^ ord(key_char))
-        result.append(encrypted_char)
+    Output is byte-for-byte identical to the original per-character
+    implementation: each character's code point is XORed with the key
+    character at the same position, the result is UTF-8 encoded and then
+    Base64 encoded. Instead of a Python loop, the XOR is done in one shot
+    on big integers (ASCII text as bytes, anything else as UTF-32 code
+    points), so cost is dominated by C-level conversions.
+    """
 
-    encrypted = base64.b64encode(''.join(result).encode('utf-8'))
-    return encrypted.decode('utf-8')
+    def __init__(self, key: str, index_key: str = ""):
+        if not key:
+            raise ValueError("key must be non-empty")
+        self.key = key
+        # Separate HMAC key for blind indexes; derived from the XOR key when not given
+        self._index_key = (
+            index_key.encode("utf-8") if index_key
+            else hmac.new(key.encode("utf-8"), b"mailmorph-blind-index", hashlib.sha256).digest()
+        )
+        self._key_ascii = key.isascii()
+        self._key_bytes = key.encode("ascii") if self._key_ascii else b""
+        self._key_utf32 = key.encode("utf-32-le")
+
+    @staticmethod
+    def _pad(unit: bytes, length: int) -> int:
+        """Repeating key stream of `length` bytes as an int."""
+        reps, rem = divmod(length, len(unit))
+        return int.from_bytes(unit * reps + unit[:rem], "little")
+
+    def _xor(self, text: str) -> str:
+        if not text:
+            return ""
+        if self._key_ascii and text.isascii():
+            # ASCII ^ ASCII stays ASCII: one byte per character
+            data = text.encode("ascii")
+            mixed = int.from_bytes(data, "little") ^ self._pad(self._key_bytes, len(data))
+            return mixed.to_bytes(len(data), "little").decode("ascii")
+        # General case: XOR whole code points (4 bytes each)
+        data = text.encode("utf-32-le")
+        mixed = int.from_bytes(data, "little") ^ self._pad(self._key_utf32, len(data))
+        return mixed.to_bytes(len(data), "little").decode("utf-32-le")
+
+    def encode(self, text: str) -> str:
+        return base64.b64encode(self._xor(text).encode("utf-8")).decode("ascii")
+
+    def decode(self, encoded: str) -> str:
+        return self._xor(base64.b64decode(encoded.encode("utf-8")).decode("utf-8"))
+
+    def blind_index(self, text: str) -> str:
+        """Keyed, fixed-length lookup token (HMAC-SHA256 hex) for an already-normalized value."""
+        return hmac.new(self._index_key, text.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def encode_fields(self, doc: dict, fields) -> dict:
+        """Copy of doc with the named string fields encoded in one call."""
+        out = dict(doc)
+        for field in fields:
+            if field in out and out[field] is not None:
+                out[field] = self.encode(str(out[field]))
+        return out
+
+    def decode_fields(self, doc: dict, fields) -> dict:
+        """Copy of doc with the named fields decoded in one call (missing/empty stay empty)."""
+        out = dict(doc)
+        for field in fields:
+            value = out.get(field)
+            out[field] = self.decode(value) if value else ""
+        return out
 
-def unhash(encrypted_text_blurb):
-    # Load Backend/.env and get HASH_SECRET_KEY at call time
-    env_path = os.path.join(os.path.dirname(__file__), ".env")
-    load_dotenv(dotenv_path=env_path, override=True)
-    key = os.getenv("HASH_SECRET_KEY")
-    if not key:
-        raise SystemExit("HASH_SECRET_KEY missing in Backend/.env")
 
-    encrypted = base64.b64decode(encrypted_text_blurb.encode('utf-8')).decode('utf-8')
+_codec = None
+_codec_lock = threading.Lock()
 
-    result = []
-    key_len = len(key)
 
-    for i, char in enumerate(encrypted):
-        key_char = key[i % key_len]
-        decrypted_char = chr(ord(char) ^ ord(key_char))
-        result.append(decrypted_char)
+def get_codec() -> BlurbCodec:
+    """Process-wide codec, built from the settings on first use."""
+    global _codec
+    if _codec is None:
+        with _codec_lock:
+            if _codec is None:
+                settings = get_settings()
+                if not settings.hash_secret_key:
+                    raise SystemExit("HASH_SECRET_KEY missing in Backend/.env")
+                _codec = BlurbCodec(settings.hash_secret_key, settings.blind_index_key)
+    return _codec
 
-    return ''.join(result)
+
+def reset_codec(settings=None) -> None:
+    """Drop the cached codec so the next call picks up HASH_SECRET_KEY/BLIND_INDEX_KEY (key rotation)."""
+    global _codec
+    with _codec_lock:
+        _codec = None
+
+
+# Settings reloads (SIGHUP) may rotate the keys
+on_reload(reset_codec)
+
+
+def hash(text_blurb):
+    return get_codec().encode(text_blurb)
+
+
+def unhash(encrypted_text_blurb):
+    return get_codec().decode(encrypted_text_blurb)
 
 # Example usage
 if __name__ == "__main__":
@@ -51,4 +121,4 @@ if __name__ == "__main__":
     decrypted = unhash(encrypted)
     print(f"Decrypted: {decrypted}")
     assert email_text == decrypted, "Encryption/Decryption failed!"
-    print("\n✓ Encryption and decryption working correctly!")
\ No newline at end of file
+    print("\n✓ Encryption and decryption working correctly!")
@@ -1,20 +1,24 @@
-import os
+import asyncio
 import json
+import threading
 import time
-from typing import Dict, TypedDict, Optional
-from dotenv import load_dotenv
-from pydantic import BaseModel
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
-from langgraph.graph import StateGraph, START, END
+from dataclasses import dataclass
+from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
 from types import SimpleNamespace
-
-# Load environment variables (expects GEMINI_API_KEY)
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
+from settings import get_settings
+from prompt_compression import compress_blurb, estimate_tokens
+from regex_fallback import scan_blurb
+from resilience import CircuitBreaker, CircuitOpenError, Hedger, LatencyWindow, LLMUnavailableError
+from rate_limiter import RateScheduler
+from settings import on_reload
+from thread_normalizer import normalize_thread
 
 
 class EmailAgentRequest(BaseModel):
     email_blurb: str
+    # Rate-limit lane: "interactive" (/extract) is served before "bulk" (batch, ingest)
+    priority: str = "interactive"
 
 
 class EmailAgentResponse(BaseModel):
@@ -27,36 +31,188 @@ class EmailAgentResponse(BaseModel):
     complete_address: str = ""
     complete_address_confidence: float = 0.0
     tokens_used: str = ""
+    # Estimated prompt size of the blurb before/after compression
+    input_tokens_before: int = 0
+    input_tokens_after: int = 0
+    output_tokens: int = 0
+    # False when no valid JSON came back even after repair; such results must not be cached
+    parse_ok: bool = True
+    retries: int = 0
+    # Cascade: tier that produced the answer ("small"/"large"), why it was escalated
+    # ("confidence", "parse", "complex" or ""), and per-tier cost
+    model_tier: str = ""
+    escalation: str = ""
+    small_tokens: int = 0
+    small_latency: float = 0.0
+    large_tokens: int = 0
+    large_latency: float = 0.0
+    # Time spent waiting for the provider rate-limit budget (ms, all calls)
+    queue_wait: float = 0.0
+
+
+# Per-call usage, not part of the extracted (cacheable) fields
+USAGE_FIELDS = {
+    "tokens_used", "input_tokens_before", "input_tokens_after", "output_tokens", "parse_ok", "retries",
+    "model_tier", "escalation", "small_tokens", "small_latency", "large_tokens", "large_latency", "queue_wait",
+}
+TIERS = ("small", "large")
+
+
+class CompactExtraction(BaseModel):
+    """Compact output schema the model is asked for (short keys, confidences as one list)."""
+    name: str
+    email: str
+    brokerage: str
+    address: str
+    # name, email, brokerage, address
+    conf: List[float] = Field(min_length=4, max_length=4)
+
+    @field_validator("name", "email", "brokerage", "address", mode="before")
+    @classmethod
+    def _none_to_empty(cls, value):
+        return "" if value is None else value
+
+
+class ParseStats:
+    """Structured-output counters: parse failures and repair retries per agent call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retried_calls = 0
+        self.retries = 0
+        self.parse_failures = 0
+
+    def record(self, retries: int, parse_ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.retried_calls += 1 if retries else 0
+            self.parse_failures += 0 if parse_ok else 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = self.calls
+            return {
+                "calls": calls,
+                "retries": self.retries,
+                "retry_rate": (self.retried_calls / calls) if calls else 0.0,
+                "parse_failures": self.parse_failures,
+                "parse_failure_rate": (self.parse_failures / calls) if calls else 0.0,
+            }
+
+
+parse_stats = ParseStats()
+
+
+class CascadeStats:
+    """Per-tier calls, tokens and latency, plus small->large escalations by reason."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tiers = {tier: {"calls": 0, "tokens": 0, "latency_ms": 0.0} for tier in TIERS}
+        self.escalations = {"confidence": 0, "parse": 0, "complex": 0, "small_unavailable": 0}
+
+    def record(self, runs, escalation: str) -> None:
+        with self._lock:
+            self.requests += 1
+            for run in runs:
+                tier = self.tiers[run.tier]
+                tier["calls"] += 1
+                tier["tokens"] += run.tokens or 0
+                tier["latency_ms"] += run.latency_ms
+            if escalation:
+                self.escalations[escalation] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            escalated = sum(self.escalations.values())
+            return {
+                "requests": self.requests,
+                "escalations": dict(self.escalations),
+                "escalation_rate": (escalated / self.requests) if self.requests else 0.0,
+                "tiers": {
+                    name: {
+                        "calls": t["calls"],
+                        "avg_tokens": (t["tokens"] / t["calls"]) if t["calls"] else 0.0,
+                        "avg_latency_ms": (t["latency_ms"] / t["calls"]) if t["calls"] else 0.0,
+                    }
+                    for name, t in self.tiers.items()
+                },
+            }
+
+
+cascade_stats = CascadeStats()
+
+# One breaker for the provider (an outage affects every tier); hedging counters shared too
+llm_breaker = CircuitBreaker(
+    failure_threshold=get_settings().llm_breaker_failures,
+    cooldown_seconds=get_settings().llm_breaker_cooldown_seconds,
+)
+llm_hedger = Hedger()
+
+
+# Provider RPM/TPM budgets are per model, so each tier has its own scheduler
+def _tier_limits(settings) -> dict:
+    return {
+        "small": (settings.llm_small_rpm, settings.llm_small_tpm),
+        "large": (settings.llm_rpm, settings.llm_tpm),
+    }
+
+
+rate_limiters = {tier: RateScheduler(*limits) for tier, limits in _tier_limits(get_settings()).items()}
+
+
+def _apply_settings(settings) -> None:
+    llm_breaker.failure_threshold = settings.llm_breaker_failures
+    llm_breaker.cooldown_seconds = settings.llm_breaker_cooldown_seconds
+    for tier, limits in _tier_limits(settings).items():
+        rate_limiters[tier].set_limits(*limits)
+
+
+on_reload(_apply_settings)
+
+
+@dataclass
+class TierRun:
+    """One model tier's attempt: the parsed extraction (None if unparseable) and its cost."""
+    tier: str
+    extraction: Optional[CompactExtraction] = None
+    error: str = ""
+    tokens: Optional[int] = None
+    output_tokens: int = 0
+    retries: int = 0
+    latency_ms: float = 0.0
+    queue_wait_ms: float = 0.0
+
+
+def check_config() -> None:
+    """Fail fast (e.g. at app startup) when the LLM credentials are missing."""
+    if not get_settings().groq_api_key:
+        raise SystemExit(
+            "GROQ_API_KEY not set. Add it to Backend/.env (GROQ_API_KEY=...) and restart."
+        )
 
 
 class EmailParserAgent:
     def __init__(self):
-        groq_key = os.getenv("GROQ_API_KEY")
-        if not groq_key:
-            raise SystemExit(
-                "GROQ_API_KEY not set. Add it to Backend/.env (GROQ_API_KEY=...) and restart."
-            )
+        check_config()
+        settings = get_settings()
+        groq_key = settings.groq_api_key
 
-        # Use a supported Groq model, overridable via env
-        model_id = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        self.llm = ChatGroq(
-            model=model_id,
-            groq_api_key=groq_key,
-            temperature=0.1,
-        )
+        # LangChain is imported here, not at module import, so the API starts fast
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain_groq import ChatGroq
 
-        # Strong system prompt to enforce strict JSON
+        # Strong system prompt to enforce strict JSON (compact keys keep output tokens low)
         self.system_prompt = """You are an Email Agent that extracts structured broker information from raw email text.
 
 Return ONLY a valid JSON object with these EXACT keys:
-- broker_name (string)
-- broker_name_confidence (number between 0 and 1)
-- broker_email (string)
-- broker_email_confidence (number between 0 and 1)
-- brokerage (string)
-- brokerage_confidence (number between 0 and 1)
-- complete_address (string)
-- complete_address_confidence (number between 0 and 1)
+{{"name": string, "email": string, "brokerage": string, "address": string, "conf": [n, e, b, a]}}
+- name: broker name; email: broker email; brokerage: company; address: complete mailing address
+- conf: confidences for name, email, brokerage, address (in that order), each between 0 and 1
+- Use "" for any value not found.
 
 Note this is for INSURANCE brokers, not real estate agents, not wholesalers.
 
@@ -78,7 +234,7 @@ Direct: 11111111111
 
 Rules:
 - Prefer explicit names/emails/addresses found in the text. Do NOT hallucinate.
-- broker_email must be a plausible email format if present; otherwise empty string.
+- email must be a plausible email format if present; otherwise empty string.
 - Confidence values must be decimals between 0 and 1 inclusive, reflecting how certain you are.
 - If multiple plausible candidates appear, choose the best one and set a lower confidence accordingly.
 - Return ONLY the JSON with these exact keys; no commentary, markdown, code fences, or extra keys.
@@ -91,55 +247,276 @@ Rules:
             ]
         )
 
-        # Chain: prompt -> llm
-        self.chain = self.prompt | self.llm
+        # Repair turn: show the model its invalid reply and the error, ask for the object again
+        self.repair_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("system", self.system_prompt),
+                ("human", "{email_blurb}"),
+                ("ai", "{previous}"),
+                ("human", "That reply was not valid for the required JSON schema ({error}). "
+                          "Return ONLY the corrected JSON object."),
+            ]
+        )
+
+        def build_tier(model_id: str):
+            llm = ChatGroq(
+                model=model_id,
+                groq_api_key=groq_key,
+                temperature=0.1,
+                max_tokens=settings.llm_max_output_tokens,
+            )
+            # Provider JSON mode: the response is always a single JSON object
+            if settings.llm_json_mode:
+                llm = llm.bind(response_format={"type": "json_object"})
+            # Chains: prompt -> llm, and the repair turn
+            return SimpleNamespace(model=model_id, llm=llm, chain=self.prompt | llm, repair_chain=self.repair_prompt | llm)
+
+        # Large tier: GROQ_MODEL (the only tier when the cascade is off); small tier answers first
+        self.tiers = {"large": build_tier(settings.groq_model)}
+        if settings.cascade_enabled and settings.groq_small_model:
+            self.tiers["small"] = build_tier(settings.groq_small_model)
+        self._system_tokens = estimate_tokens(self.system_prompt)
+        # Recent per-tier latencies: the hedge delay is their percentile
+        self.latency = {tier: LatencyWindow() for tier in TIERS}
 
     async def parse(self, request: EmailAgentRequest) -> EmailAgentResponse:
-        """Run the agent and produce the structured response."""
-        start_time = time.perf_counter()
-        result = await self.chain.ainvoke({"email_blurb": request.email_blurb})
+        """
+        Run the agent and produce the structured response. With the cascade on, the
+        small tier answers first and the large tier is only used when the blurb looks
+        complex, the small tier's reply is unparseable, a confidence is below threshold,
+        or the small tier is unavailable (LLMUnavailableError); only a large-tier failure
+        propagates (the caller then serves the degraded regex-only result).
+        """
+        email_blurb, tokens_before, tokens_after = self._prepare_input(request.email_blurb)
+        lane = request.priority
+        runs = []
+        escalation = ""
+        if "small" in self.tiers:
+            if self._looks_complex(email_blurb, tokens_after):
+                escalation = "complex"
+            else:
+                try:
+                    runs.append(await self._run_tier("small", email_blurb, lane))
+                    escalation = self._escalation_reason(runs[-1])
+                except LLMUnavailableError as small_err:
+                    print(f"Small tier unavailable, escalating: {small_err}")
+                    escalation = "small_unavailable"
+        if not runs or escalation:
+            runs.append(await self._run_tier("large", email_blurb, lane))
+        final = runs[-1]
+
+        totals = [run.tokens for run in runs if run.tokens is not None]
+        tokens_used = sum(totals) if totals else None
+        retries = sum(run.retries for run in runs)
+        extraction = final.extraction
+        parse_ok = extraction is not None
+        parse_stats.record(retries, parse_ok)
+        if "small" in self.tiers:
+            cascade_stats.record(runs, escalation)
+        print(f"Tokens Used: {tokens_used} (tier: {final.tier}{', escalated: ' + escalation if escalation else ''})")
+        if not parse_ok:
+            print(f"Agent output unparseable after {final.retries} repair attempt(s): {final.error}")
+
+        by_tier = {run.tier: run for run in runs}
+        tier_usage = {}
+        for tier in TIERS:
+            run = by_tier.get(tier)
+            tier_usage[f"{tier}_tokens"] = (run.tokens or 0) if run else 0
+            tier_usage[f"{tier}_latency"] = run.latency_ms if run else 0.0
+
+        # Normalize and ensure all keys exist (empty fields when parsing failed)
+        conf = [self._to_conf(c) for c in extraction.conf] if parse_ok else [0.0] * 4
+        return EmailAgentResponse(
+            broker_name=extraction.name if parse_ok else "",
+            broker_email=extraction.email if parse_ok else "",
+            brokerage=extraction.brokerage if parse_ok else "",
+            complete_address=extraction.address if parse_ok else "",
+            broker_name_confidence=conf[0],
+            broker_email_confidence=conf[1],
+            brokerage_confidence=conf[2],
+            complete_address_confidence=conf[3],
+            tokens_used=str(tokens_used) if tokens_used is not None else "",
+            input_tokens_before=tokens_before,
+            input_tokens_after=tokens_after,
+            output_tokens=sum(run.output_tokens for run in runs),
+            parse_ok=parse_ok,
+            retries=retries,
+            model_tier=final.tier,
+            escalation=escalation,
+            queue_wait=sum(run.queue_wait_ms for run in runs),
+            **tier_usage,
+        )
 
-        tokens_used = None
+    async def _run_tier(self, tier: str, email_blurb: str, lane: str = "interactive") -> TierRun:
+        """One tier's call plus bounded repair: re-ask with the invalid reply and the validation error."""
+        settings = get_settings()
+        chains = self.tiers[tier]
+        run = TierRun(tier=tier)
+        start = time.perf_counter()
+        result = await self._invoke(tier, chains.chain, {"email_blurb": email_blurb}, lane, run)
+        run.tokens, run.output_tokens = self._token_usage(result)
+        raw = result.content or ""
+        run.extraction, run.error = self._parse_output(raw)
+        while run.extraction is None and run.retries < settings.llm_repair_retries:
+            run.retries += 1
+            result = await self._invoke(
+                tier, chains.repair_chain, {"email_blurb": email_blurb, "previous": raw[:2000], "error": run.error},
+                lane, run,
+            )
+            total, output = self._token_usage(result)
+            if total is not None:
+                run.tokens = (run.tokens or 0) + total
+            run.output_tokens += output
+            raw = result.content or ""
+            run.extraction, run.error = self._parse_output(raw)
+        run.latency_ms = (time.perf_counter() - start) * 1000.0
+        return run
+
+    async def _invoke(self, tier: str, chain, inputs: dict, lane: str, run: TierRun):
+        """
+        Provider call behind the tier's RPM/TPM scheduler and the circuit breaker, with a
+        deadline (LLM_TIMEOUT_SECONDS) and, when enabled, a hedged duplicate after the
+        tier's recent p95 latency. The rate-limit wait is bounded separately per lane
+        (LLM_QUEUE_MAX_WAIT_*_SECONDS) and happens before the breaker admits the call,
+        so a half-open probe is never held while queued.
+        Raises LLMUnavailableError (CircuitOpenError when failing fast).
+        """
+        settings = get_settings()
+        # Fail fast without queueing while the breaker is open; the probe slot is claimed below
+        if llm_breaker.state == "open" and not llm_breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open")
+        # Up-front cost estimate: prompt + input + the output cap; settled with real usage below
+        limiter = rate_limiters[tier]
+        cost = self._system_tokens + sum(estimate_tokens(str(v)) for v in inputs.values()) + settings.llm_max_output_tokens
+        max_wait = (
+            settings.llm_queue_max_wait_bulk_seconds if lane == "bulk"
+            else settings.llm_queue_max_wait_interactive_seconds
+        )
+        try:
+            run.queue_wait_ms += await limiter.acquire(cost, lane, max_wait)
+        except asyncio.TimeoutError as e:
+            raise LLMUnavailableError(f"{tier} model rate limit: no budget within {max_wait}s") from e
+        if not llm_breaker.allow():
+            limiter.refund(cost)
+            raise CircuitOpenError("LLM circuit breaker is open")
+        hedges = []
+
+        def may_hedge() -> bool:
+            if not limiter.try_acquire(cost):
+                return False
+            hedges.append(cost)
+            return True
+
+        settled = False
+        try:
+            delay = None
+            if settings.llm_hedge_enabled:
+                p = self.latency[tier].percentile(settings.llm_hedge_percentile, settings.llm_hedge_min_samples)
+                delay = p / 1000.0 if p is not None else None
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    llm_hedger.call(lambda: chain.ainvoke(inputs), delay, may_hedge=may_hedge),
+                    timeout=settings.llm_timeout_seconds,
+                )
+            except asyncio.TimeoutError as e:
+                settled = True
+                llm_breaker.record_failure()
+                raise LLMUnavailableError(f"{tier} model timed out after {settings.llm_timeout_seconds}s") from e
+            except Exception as e:
+                settled = True
+                llm_breaker.record_failure()
+                raise LLMUnavailableError(f"{tier} model call failed: {e}") from e
+            settled = True
+            llm_breaker.record_success()
+        finally:
+            # Cancellation (client disconnect, an outer deadline, a coalesced leader going away)
+            # skips the handlers above; a half-open probe left in flight would block every later call
+            if not settled:
+                llm_breaker.release()
+        self.latency[tier].add((time.perf_counter() - start) * 1000.0)
+        total, output = self._token_usage(result)
+        limiter.settle(cost, total)
+        for reserved in hedges:
+            # The losing duplicate was cancelled mid-generation: the provider still
+            # counted its request and prompt, so charge those and return the output cap
+            limiter.settle(reserved, None if total is None else total - output)
+        return result
+
+    def _looks_complex(self, email_blurb: str, tokens: int) -> bool:
+        """Long inputs and blurbs with several distinct signatures go straight to the large tier."""
+        settings = get_settings()
+        if tokens > settings.cascade_complex_tokens:
+            return True
+        emails = {c.email.lower() for c in scan_blurb(email_blurb).candidates}
+        return len(emails) >= settings.cascade_complex_signatures
+
+    def _escalation_reason(self, run: TierRun) -> str:
+        """"parse" or "confidence" when the small tier's answer should not be used, else ""."""
+        if run.extraction is None:
+            return "parse"
+        thresholds = get_settings().cascade_min_confidence.as_list()
+        if any(self._to_conf(c) < t for c, t in zip(run.extraction.conf, thresholds)):
+            return "confidence"
+        return ""
+
+    def _token_usage(self, result):
+        """(total tokens or None, output tokens) from the provider's response metadata."""
         try:
             meta = getattr(result, "response_metadata", {}) or {}
             token_usage = meta.get("token_usage") or meta.get("usage") or {}
-            if isinstance(token_usage, dict):
-                total = token_usage.get("total_tokens")
-                if total is None:
-                    total = token_usage.get("total")
-                if total is None:
-                    inp = token_usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
-                    out = token_usage.get("output_tokens") or token_usage.get("completion_tokens") or 0
-                    total = inp + out
-                tokens_used = total
+            if not isinstance(token_usage, dict):
+                return None, 0
+            out = token_usage.get("output_tokens") or token_usage.get("completion_tokens") or 0
+            total = token_usage.get("total_tokens")
+            if total is None:
+                total = token_usage.get("total")
+            if total is None:
+                inp = token_usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
+                total = inp + out
+            return total, int(out)
         except Exception:
-            tokens_used = None
+            return None, 0
 
-        print(f"Tokens Used: {tokens_used}")
-
-        raw = result.content or ""
-
-        # Try to recover JSON if the model includes extra text/fences
-        json_str = self._extract_json_str(raw)
-        data: Dict[str, str] = {}
+    def _parse_output(self, raw: str):
+        """(CompactExtraction, "") for a valid reply, else (None, short error for the repair turn)."""
         try:
-            data = json.loads(json_str)
+            data = json.loads(raw)
         except Exception:
-            # Fallback: return empty fields when parse fails
-            data = {}
-
-        # Normalize and ensure all keys exist
-        return EmailAgentResponse(
-            broker_name=str(data.get("broker_name", "")),
-            broker_email=str(data.get("broker_email", "")),
-            brokerage=str(data.get("brokerage", "")),
-            complete_address=str(data.get("complete_address", "")),
-            broker_name_confidence=self._to_conf(data.get("broker_name_confidence", 0)),
-            broker_email_confidence=self._to_conf(data.get("broker_email_confidence", 0)),
-            brokerage_confidence=self._to_conf(data.get("brokerage_confidence", 0)),
-            complete_address_confidence=self._to_conf(data.get("complete_address_confidence", 0)),
-            tokens_used=str(tokens_used) if tokens_used is not None else ""
-        )
+            # Recover a JSON object surrounded by extra text/fences
+            if "{" not in raw:
+                return None, "no JSON object in the reply"
+            try:
+                data = json.loads(self._extract_json_str(raw))
+            except Exception as e:
+                return None, f"invalid JSON: {e}"
+        try:
+            return CompactExtraction.model_validate(data), ""
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'root'}: {err['msg']}" for err in e.errors()[:4])
+            return None, problems
+
+    def _prepare_input(self, email_blurb: str):
+        """
+        Prompt input: the canonical thread (repeated quotes dropped), then the
+        signature-focused, budget-capped compression. Returns (text, tokens before, tokens after).
+        """
+        settings = get_settings()
+        tokens_before = estimate_tokens(email_blurb)
+        text = email_blurb
+        try:
+            if settings.thread_normalize_enabled:
+                text = normalize_thread(text)
+            if settings.prompt_compression_enabled:
+                text = compress_blurb(
+                    text,
+                    budget=settings.prompt_token_budget,
+                    min_tokens=settings.prompt_compress_min_tokens,
+                )[0]
+        except Exception as e:
+            print(f"Prompt preparation failed, sending full blurb: {e}")
+            text = email_blurb
+        return text, tokens_before, estimate_tokens(text)
 
     def _extract_json_str(self, text: str) -> str:
         """Extract the first {...} block to reduce chances of fence/markdown noise."""
@@ -161,36 +538,19 @@ Rules:
         return f
 
 
-# Input-only state for LangGraph Dev UI
-class EmailState(TypedDict):
-    email_blurb: str
+_agent = None
+_agent_lock = threading.Lock()
+
+
+def get_agent() -> EmailParserAgent:
+    """Process-wide agent, built on first use (LangChain import + client setup)."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = EmailParserAgent()
+    return _agent
 
-agent = EmailParserAgent()
-
-async def parse_node(state: EmailState) -> dict:
-    try:
-        req = EmailAgentRequest(email_blurb=state["email_blurb"])
-        res = await agent.parse(req)
-        return {
-            "broker_name": res.broker_name,
-            "broker_name_confidence": res.broker_name_confidence,
-            "broker_email": res.broker_email,
-            "broker_email_confidence": res.broker_email_confidence,
-            "brokerage": res.brokerage,
-            "brokerage_confidence": res.brokerage_confidence,
-            "complete_address": res.complete_address,
-            "complete_address_confidence": res.complete_address_confidence,
-            "tokens_used": res.tokens_used,
-        }
-    except Exception as e:
-        return {"error": str(e)}
-
-builder = StateGraph(EmailState)
-builder.add_node("parse", parse_node)
-builder.add_edge(START, "parse")
-builder.add_edge("parse", END)
-
-graph = builder.compile()
 
 if __name__ == "__main__":
     import asyncio
@@ -208,7 +568,7 @@ if __name__ == "__main__":
         for i, email in enumerate(sample_inputs, 1):
             print(f"\n=== Sample {i} ===")
             req = EmailAgentRequest(email_blurb=email)
-            res = await agent.parse(req)
+            res = await get_agent().parse(req)
             print("Parsed JSON:")
             print(json.dumps({
                 "broker_name": res.broker_name,
@@ -220,5 +580,8 @@ if __name__ == "__main__":
                 "complete_address": res.complete_address,
                 "complete_address_confidence": res.complete_address_confidence,
                 "tokens_used": res.tokens_used,
+                "input_tokens": f"{res.input_tokens_before} -> {res.input_tokens_after}",
+                "output_tokens": res.output_tokens,
+                "parse_ok": res.parse_ok,
             }, indent=2))
     asyncio.run(run_tests())
\ No newline at end of file
@@ -0,0 +1,68 @@
+import threading
+from regex_fallback import extract_broker_fields
+from mongo_caching import CONFIDENCE_FIELDS
+
+
+def fast_path_fields(text: str, threshold: float):
+    """Rule-based fields when every per-field confidence clears the threshold, else None."""
+    fields = extract_broker_fields(text)
+    if min(fields[field] for field in CONFIDENCE_FIELDS) < threshold:
+        return None
+    return fields
+
+
+class FastPathStats:
+    """
+    Skip-rate and savings counters for the rule-based fast path.
+    Savings are estimates: each skip is credited with the running average
+    tokens and latency of the real LLM calls seen so far.
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.skips = 0
+        self.llm_calls = 0
+        self.avg_llm_tokens = 0.0
+        self.avg_llm_latency_ms = 0.0
+        self.tokens_saved = 0
+        self.latency_saved_ms = 0.0
+
+    def record_llm(self, tokens, latency_ms: float) -> None:
+        try:
+            tokens = int(tokens or 0)
+        except (TypeError, ValueError):
+            tokens = 0
+        with self._lock:
+            self.llm_calls += 1
+            # Exponential moving average; the first call seeds it
+            a = 1.0 if self.llm_calls == 1 else self.alpha
+            self.avg_llm_tokens += a * (tokens - self.avg_llm_tokens)
+            self.avg_llm_latency_ms += a * (latency_ms - self.avg_llm_latency_ms)
+
+    def record_attempt(self, skipped: bool, latency_ms: float = 0.0):
+        """Count one fast-path attempt; returns (tokens_saved, latency_saved_ms) for a skip."""
+        with self._lock:
+            self.attempts += 1
+            if not skipped:
+                return 0, 0.0
+            self.skips += 1
+            tokens = int(round(self.avg_llm_tokens))
+            latency = max(0.0, self.avg_llm_latency_ms - latency_ms)
+            self.tokens_saved += tokens
+            self.latency_saved_ms += latency
+            return tokens, latency
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "attempts": self.attempts,
+                "skips": self.skips,
+                "skip_rate": (self.skips / self.attempts) if self.attempts else 0.0,
+                "llm_calls": self.llm_calls,
+                "avg_llm_tokens": self.avg_llm_tokens,
+                "avg_llm_latency_ms": self.avg_llm_latency_ms,
+                "est_tokens_saved": self.tokens_saved,
+                "est_latency_saved_ms": self.latency_saved_ms,
+            }
@@ -0,0 +1,179 @@
+"""
+Streaming bulk ingest: push an mbox file or a directory of .eml files
+through the same cache → agent → fallback flow as /extract.
+
+Messages are read lazily (one at a time), processed with bounded
+parallelism, and written to NDJSON in input order as they complete.
+A checkpoint records how many messages have been written so an
+interrupted run can continue with --resume.
+
+Usage:
+    python ingest.py mailbox.mbox --out results.ndjson
+    python ingest.py ./eml_dir other.mbox --out results.ndjson --concurrency 16
+    python ingest.py mailbox.mbox --out results.ndjson --resume
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from collections import deque
+from email import policy
+from email.parser import BytesParser
+from itertools import islice
+from main import app, lifespan, ExtractRequest, extract_one
+from settings import get_settings
+
+_MBOX_FROM_RE = re.compile(rb"^>+From ")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def iter_mbox(path):
+    """Yield raw message bytes from an mbox file, one message at a time."""
+    lines = []
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"From ") and (not lines or lines[-1] in (b"\n", b"\r\n")):
+                if lines:
+                    yield b"".join(lines)
+                lines = []
+                continue  # the separator line is not part of the message
+            if _MBOX_FROM_RE.match(line):
+                line = line[1:]  # undo mboxrd ">From " quoting
+            lines.append(line)
+    if lines:
+        yield b"".join(lines)
+
+
+def iter_eml_dir(path):
+    """Yield raw message bytes for each .eml file under a directory (sorted, recursive)."""
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(".eml"):
+                with open(os.path.join(root, name), "rb") as f:
+                    yield f.read()
+
+
+def iter_messages(paths):
+    """Chain every input path into one lazy stream of (source, raw bytes)."""
+    for path in paths:
+        if os.path.isdir(path):
+            for i, raw in enumerate(iter_eml_dir(path)):
+                yield f"{path}#{i}", raw
+        else:
+            for i, raw in enumerate(iter_mbox(path)):
+                yield f"{path}#{i}", raw
+
+
+def message_text(raw: bytes):
+    """(message_id, body text) preferring text/plain, falling back to tag-stripped HTML."""
+    msg = BytesParser(policy=policy.default).parsebytes(raw)
+    body = msg.get_body(preferencelist=("plain", "html"))
+    text = ""
+    if body is not None:
+        try:
+            text = body.get_content()
+        except Exception:
+            text = (body.get_payload(decode=True) or b"").decode("utf-8", errors="replace")
+        if body.get_content_type() == "text/html":
+            text = _TAG_RE.sub(" ", text)
+    return str(msg.get("Message-ID", "")), text
+
+
+def read_checkpoint(path):
+    """(messages done, output byte offset) from a checkpoint file, or (0, 0)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return int(data.get("done", 0)), int(data.get("offset", 0))
+    except (FileNotFoundError, ValueError):
+        return 0, 0
+
+
+def write_checkpoint(path, done: int, offset: int) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"done": done, "offset": offset, "updated": time.time()}, f)
+    os.replace(tmp, path)  # atomic: a crash never leaves a torn checkpoint
+
+
+async def process_message(index: int, source: str, raw: bytes) -> dict:
+    record = {"index": index, "source": source, "message_id": "", "status": "ok", "result": None, "error": ""}
+    try:
+        record["message_id"], text = message_text(raw)
+        if not text.strip():
+            raise ValueError("Message has no text body")
+        res, _ = await extract_one(ExtractRequest(text=text, priority="bulk"))
+        record["result"] = res.model_dump()
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(getattr(e, "detail", e))
+    return record
+
+
+async def ingest(paths, out_path, checkpoint_path, concurrency=8, resume=False, checkpoint_every=50):
+    start, offset = read_checkpoint(checkpoint_path) if resume else (0, 0)
+    if start:
+        print(f"Resuming after {start} messages")
+    if resume and os.path.exists(out_path):
+        # Drop records written after the last checkpoint; they are redone below
+        with open(out_path, "r+b") as f:
+            f.truncate(offset)
+
+    written = start
+    window = deque()
+    started = time.perf_counter()
+    async with lifespan(app):
+        with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+            def drain_head():
+                nonlocal written
+                record = window.popleft().result()
+                out.write(json.dumps(record) + "\n")
+                written += 1
+                if written % checkpoint_every == 0:
+                    out.flush()
+                    write_checkpoint(checkpoint_path, written, out.tell())
+
+            messages = islice(iter_messages(paths), start, None)
+            for index, (source, raw) in enumerate(messages, start=start):
+                window.append(asyncio.ensure_future(process_message(index, source, raw)))
+                # Bounded parallelism: never more than `concurrency` messages in memory/in flight
+                while len(window) >= concurrency:
+                    await asyncio.wait({window[0]})
+                    while window and window[0].done():
+                        drain_head()
+            while window:
+                await asyncio.wait({window[0]})
+                drain_head()
+            out.flush()
+            write_checkpoint(checkpoint_path, written, out.tell())
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {written - start} messages in {elapsed:.1f}s ({written} total) -> {out_path}")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream mbox/.eml input through the extraction pipeline.")
+    parser.add_argument("paths", nargs="+", help="mbox files and/or directories of .eml files")
+    parser.add_argument("--out", required=True, help="NDJSON output file")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <out>.ckpt)")
+    parser.add_argument("--concurrency", type=int, default=get_settings().ingest_concurrency)
+    parser.add_argument("--checkpoint-every", type=int, default=50)
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    args = parser.parse_args()
+
+    asyncio.run(ingest(
+        args.paths,
+        args.out,
+        args.checkpoint or f"{args.out}.ckpt",
+        concurrency=max(1, args.concurrency),
+        resume=args.resume,
+        checkpoint_every=max(1, args.checkpoint_every),
+    ))
+
+
+if __name__ == "__main__":
+    main()
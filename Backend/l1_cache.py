@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from settings import get_settings, on_reload
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL.
+    Sits in front of the Mongo 'cache' collection; safe to use from the
+    storage executor threads.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if self.ttl_seconds > 0 and expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def put(self, key, value: dict) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Process-wide L1 used by mongo_caching
+l1_cache = LRUCache(
+    max_entries=get_settings().l1_cache_max_entries,
+    ttl_seconds=get_settings().l1_cache_ttl_seconds,
+)
+
+
+def _apply_settings(settings) -> None:
+    # New limits apply to entries stored from now on; a shrink takes effect on the next put
+    l1_cache.max_entries = max(0, int(settings.l1_cache_max_entries))
+    l1_cache.ttl_seconds = float(settings.l1_cache_ttl_seconds)
+
+
+on_reload(_apply_settings)
@@ -1,29 +1,101 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict
-import re
+from typing import Optional, List, Dict, Literal
 import uvicorn
 import time
-from email_parser_agent import EmailParserAgent, EmailAgentRequest, EmailAgentResponse
-from mongo_caching import cache_insert, cache_hit
-from mongo_metrics import insert_tracing
-from mongo_metrics import get_metrics as get_metrics_db
-from mongo_logging import get_logging as get_logging_db
-from mongo_logging import insert_log
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from email_parser_agent import EmailAgentRequest, USAGE_FIELDS, get_agent, check_config
+from email_parser_agent import parse_stats, cascade_stats, llm_breaker, llm_hedger, rate_limiters
+from mongo_caching import cache_insert_async, cache_hit_async, cache_stats, ensure_indexes, blurb_key
+from mongo_caching import signature_cache_hit_async, signature_cache_insert_async
+from mongo_caching import near_duplicate_hit_async, rebuild_near_duplicate_index
+from mongo_caching import cache_lookup_many_async, cache_insert_many_async
+from mongo_metrics import enqueue_tracing, metrics_writer
+from mongo_metrics import get_metrics_async as get_metrics_db
+from mongo_logging import get_logging_async as get_logging_db
+from mongo_logging import enqueue_log, log_writer
 from regex_fallback import get_broker_info
+from mongo_client import init_client, close_client, run_blocking
+from single_flight import SingleFlight
+from settings import get_settings, install_reload_handler, remove_reload_handler
+from fast_path import fast_path_fields, FastPathStats
+from resilience import LLMUnavailableError
+from telemetry import StageTimer, record_request, request_errors_total, registry, latency_summary
+from telemetry import keep_spans, server_timing
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_config()
+    # Settings are parsed once; `kill -HUP <pid>` re-reads Backend/.env
+    loop = asyncio.get_running_loop()
+    install_reload_handler(loop)
+    # One pooled Mongo client for the whole process, shared by cache/logging/metrics
+    init_client()
+    ensure_indexes()
+    # Warm the near-duplicate index in the background; exact lookups work meanwhile
+    rebuild_stop = threading.Event()
+    rebuild = asyncio.create_task(run_blocking(rebuild_near_duplicate_index, stop=rebuild_stop))
+    rebuild.add_done_callback(
+        lambda t: t.cancelled() or t.exception() is None or print(f"Near-duplicate rebuild failed: {t.exception()}")
+    )
+    # Build the agent (LangChain import, client setup) after startup instead of on the first request
+    if get_settings().agent_warmup:
+        warmup = asyncio.create_task(asyncio.to_thread(get_agent))
+        warmup.add_done_callback(
+            lambda t: t.cancelled() or t.exception() is None or print(f"Agent warm-up failed: {t.exception()}")
+        )
+    # Logging/metrics documents are written in batches off the request path
+    log_writer.start()
+    metrics_writer.start()
+    try:
+        yield
+    finally:
+        # Stop the rebuild (checked per batch) before close_client() waits on the executor
+        rebuild_stop.set()
+        await asyncio.gather(rebuild, return_exceptions=True)
+        await log_writer.stop()
+        await metrics_writer.stop()
+        close_client()
+        remove_reload_handler(loop)
+
+app = FastAPI(lifespan=lifespan)
 
 # ---- Models ----
 class ExtractRequest(BaseModel):
     text: str
+    # Provider rate-limit lane; bulk callers (ingest.py) yield to interactive ones
+    priority: Literal["interactive", "bulk"] = "interactive"
 
 class ExtractResponse(BaseModel):
     broker_name: str = ""
     broker_email: str = ""
     brokerage: str = ""
     complete_address: str = ""
+    # "exact", "fuzzy" or "signature" when served from cache, "" otherwise
+    cache_match: str = ""
+    # Estimated similarity to the cached blurb (fuzzy hits only)
+    similarity: Optional[float] = None
+    # True when the LLM was unavailable and only the regex fallback ran
+    degraded: bool = False
+
+
+class BatchExtractRequest(BaseModel):
+    texts: List[str]
+
+class BatchItemResult(BaseModel):
+    index: int
+    # "cached", "extracted" or "error"
+    status: str
+    result: Optional[ExtractResponse] = None
+    error: str = ""
+
+class BatchExtractResponse(BaseModel):
+    results: List[BatchItemResult]
 
 
 # ---- Utilities ----
@@ -53,101 +125,356 @@ app.add_middleware(
 def health() -> Dict[str, str]:
     return {"status": "ok"}
 
-agent = EmailParserAgent()
+# In-process counters (no Mongo round-trip)
+@app.get("/stats")
+def stats() -> Dict[str, Dict]:
+    return {
+        "cache": cache_stats(),
+        "coalescing": extract_flight.stats(),
+        "fast_path": fast_path_stats.stats(),
+        "agent_parse": parse_stats.stats(),
+        "cascade": cascade_stats.stats(),
+        "llm_breaker": llm_breaker.stats(),
+        "llm_hedging": llm_hedger.stats(),
+        "rate_limits": {tier: limiter.stats() for tier, limiter in rate_limiters.items()},
+        "log_writer": log_writer.stats(),
+        "metrics_writer": metrics_writer.stats(),
+    }
 
-@app.post("/extract", response_model=ExtractResponse)
-async def extract_text(req: ExtractRequest):
-    start_time = time.perf_counter()
-    if not req.text or not req.text.strip():
-        raise HTTPException(status_code=400, detail="Text is required")
+# Point-in-time values for GET /metrics, read at scrape time
+registry.gauge(
+    "writer_queued", "Log/metrics documents waiting in the background writers.",
+    lambda: {("logging",): log_writer.stats()["queued"], ("metrics",): metrics_writer.stats()["queued"]},
+    ("writer",),
+)
+registry.gauge("llm_breaker_open", "1 while the LLM circuit breaker is open or half-open.",
+               lambda: float(llm_breaker.state != "closed"))
+registry.gauge(
+    "llm_queue_depth", "LLM calls waiting for provider rate-limit budget.",
+    lambda: {
+        (tier, lane): lane_stats["queue_depth"]
+        for tier, limiter in rate_limiters.items()
+        for lane, lane_stats in limiter.stats()["lanes"].items()
+    },
+    ("tier", "lane"),
+)
 
-    # (1) Cache lookup
-    cached = None
+# Identical blurbs arriving together share one lookup/agent call
+extract_flight = SingleFlight()
+# Skip rate and estimated savings of the rule-based fast path
+fast_path_stats = FastPathStats()
+CACHE_MATCHES = ("exact", "fuzzy", "signature")
+
+def _with_fallback(text: str, fields: Dict, cache_match: str = "", degraded: bool = False) -> ExtractResponse:
+    """Swap low-confidence email/address for the regex fallback when it finds one."""
+    use_email_fallback = float(fields.get("broker_email_confidence", 0.0)) < 0.8
+    use_address_fallback = float(fields.get("complete_address_confidence", 0.0)) < 0.8
+    broker_info = get_broker_info(text) if (use_email_fallback or use_address_fallback) else None
+    fallback_email = broker_info.get("broker_email", "") if broker_info else ""
+    fallback_address = broker_info.get("complete_address", "") if broker_info else ""
+
+    return ExtractResponse(
+        broker_name=fields["broker_name"],
+        broker_email=(fallback_email if (use_email_fallback and fallback_email) else fields["broker_email"]),
+        brokerage=fields["brokerage"],
+        complete_address=(fallback_address if (use_address_fallback and fallback_address) else fields["complete_address"]),
+        cache_match=cache_match,
+        similarity=fields.get("similarity"),
+        degraded=degraded,
+    )
+
+def _degraded_fields(text: str) -> Dict:
+    """Regex-only result used when the LLM is unavailable (never cached)."""
+    info = get_broker_info(text)
+    return {
+        "broker_name": "",
+        "broker_email": info.get("broker_email", ""),
+        "brokerage": "",
+        "complete_address": info.get("complete_address", ""),
+        "broker_name_confidence": 0.0,
+        "broker_email_confidence": 0.0,
+        "brokerage_confidence": 0.0,
+        "complete_address_confidence": 0.0,
+    }
+
+def _try_fast_path(text: str):
+    """
+    Rule-based extraction when the LLM can be skipped: (fields, savings) or (None, None).
+    savings is (estimated tokens saved, estimated latency saved in ms).
+    """
+    settings = get_settings()
+    if not settings.fast_path_enabled:
+        return None, None
+    start = time.perf_counter()
     try:
-        cached = cache_hit(req.text)
-    except Exception as cache_err:
-        print(f"Cache lookup failed: {cache_err}")
+        fields = fast_path_fields(text, settings.fast_path_threshold)
+    except Exception as rule_err:
+        print(f"Fast path failed: {rule_err}")
+        fields = None
+    savings = fast_path_stats.record_attempt(fields is not None, (time.perf_counter() - start) * 1000.0)
+    return fields, (savings if fields is not None else None)
+
+async def _parse_with_agent(text: str, priority: str = "interactive"):
+    """
+    Agent call that feeds the fast-path savings estimate.
+    Returns (fields, usage) with usage = tokens_used, input/output token counts,
+    parse_ok and retries. Fields with parse_ok False are empty and must not be cached.
+    """
+    start = time.perf_counter()
+    res = await get_agent().parse(EmailAgentRequest(email_blurb=text, priority=priority))
+    fast_path_stats.record_llm(res.tokens_used, (time.perf_counter() - start) * 1000.0)
+    return res.model_dump(exclude=USAGE_FIELDS), {"lane": priority, **res.model_dump(include=USAGE_FIELDS)}
 
-    # (2A) Cache hit → return cached values
+async def _resolve(text: str, priority: str = "interactive"):
+    """
+    Cache tiers → rule-based fast path → agent → cache insert for one blurb.
+    Returns (fields, trace); trace["source"] is a cache match ("exact", "fuzzy",
+    "signature"), "rules", "llm" or "degraded" (LLM unavailable, regex only),
+    plus tokens/savings for the metrics record, trace["stages"] (ms per stage:
+    cache, rules, llm, fallback, storage) and trace["spans"] (ms per step).
+    """
+    timer = StageTimer()
+    # (1) Cache lookup: exact blurb, then near-duplicate blurb, then the signature tier
+    cached, match = None, ""
+    with timer.stage("cache"):
+        try:
+            for match, lookup in (
+                ("exact", cache_hit_async),
+                ("fuzzy", near_duplicate_hit_async),
+                ("signature", signature_cache_hit_async),
+            ):
+                with timer.span(f"cache.{match}"):
+                    cached = await lookup(text)
+                if cached:
+                    break
+        except Exception as cache_err:
+            print(f"Cache lookup failed: {cache_err}")
     if cached:
-        latency_ms = (time.perf_counter() - start_time) * 1000.0
-        insert_log(
-            source_hash=req.text,
-            cache_hit=True,
-            latency=latency_ms,
-        )
+        return cached, {"source": match, "stages": timer.stages, "spans": timer.spans}
+
+    # (2) Clean signature → rules alone; otherwise run the agent. Either way, insert cache
+    with timer.stage("rules", span="fast_path"):
+        fields, savings = _try_fast_path(text)
+    if fields is not None:
+        trace = {"source": "rules", "tokens_saved": savings[0], "latency_saved": savings[1]}
+    else:
         try:
-            insert_tracing(tokens_used=0, latency=latency_ms)
-        except Exception as metrics_err:
-            print(f"Metrics insert failed: {metrics_err}")
-
-        use_email_fallback = float(cached.get("broker_email_confidence", 0.0)) < 0.8
-        use_address_fallback = float(cached.get("complete_address_confidence", 0.0)) < 0.8
-        broker_info = get_broker_info(req.text) if (use_email_fallback or use_address_fallback) else None
-        fallback_email = broker_info.get("broker_email", "") if broker_info else ""
-        fallback_address = broker_info.get("complete_address", "") if broker_info else ""
-
-        return ExtractResponse(
-            broker_name=cached["broker_name"],
-            broker_email=(fallback_email if (use_email_fallback and fallback_email) else cached["broker_email"]),
-            brokerage=cached["brokerage"],
-            complete_address=(fallback_address if (use_address_fallback and fallback_address) else cached["complete_address"]),
-        )
+            with timer.stage("llm", span="agent.parse"):
+                fields, usage = await _parse_with_agent(text, priority)
+        except LLMUnavailableError as llm_err:
+            print(f"LLM unavailable, serving regex-only result: {llm_err}")
+            with timer.stage("fallback", span="regex_fallback"):
+                fields = _degraded_fields(text)
+            return fields, {"source": "degraded", "stages": timer.stages, "spans": timer.spans}
+        trace = {"source": "llm", **usage}
+        if not usage["parse_ok"]:
+            # Empty fields from an unparseable reply: return them (regex fallback applies), don't cache
+            return fields, {**trace, "stages": timer.stages, "spans": timer.spans}
+    with timer.stage("storage"):
+        with timer.span("cache.insert"):
+            await cache_insert_async(email_blurb=text, **fields)
+        try:
+            with timer.span("signature_cache.insert"):
+                await signature_cache_insert_async(text, **fields)
+        except Exception as sig_err:
+            print(f"Signature cache insert failed: {sig_err}")
+    return fields, {**trace, "stages": timer.stages, "spans": timer.spans}
+
+async def extract_one(req: ExtractRequest):
+    """
+    The /extract flow without the HTTP response: returns (result, timing), where
+    timing is the Server-Timing header value for sampled requests, else "".
+    ingest.py calls this directly.
+    """
+    start_time = time.perf_counter()
+    if not req.text or not req.text.strip():
+        raise HTTPException(status_code=400, detail="Text is required")
 
-    # (2B) No hit → original flow: run agent, insert cache, log metrics, return
+    settings = get_settings()
+    timer = StageTimer()
     try:
-        res = await agent.parse(EmailAgentRequest(email_blurb=req.text))
+        with timer.span("single_flight"):
+            (fields, trace), shared = await extract_flight.do(
+                blurb_key(req.text), lambda: _resolve(req.text, req.priority)
+            )
+        # Coalesced callers waited on the leader's stages; only their own time is theirs
+        if not shared:
+            timer.spans.pop("single_flight")
+            timer.add(trace.get("stages"))
+            timer.add_spans(trace.get("spans"))
+        cache_match = trace["source"] if trace["source"] in CACHE_MATCHES else ""
+        with timer.stage("fallback", span="regex_fallback"):
+            result = _with_fallback(req.text, fields, cache_match, degraded=trace["source"] == "degraded")
         latency_ms = (time.perf_counter() - start_time) * 1000.0
 
-        insert_log(
-            source_hash=req.text,
-            cache_hit=False,
-            latency=latency_ms,
-        )
+        with timer.stage("storage"):
+            # Coalesced callers didn't spend (or save) tokens of their own
+            if shared:
+                trace = {"source": trace["source"]}
+            with timer.span("metrics.enqueue"):
+                await enqueue_tracing(latency=latency_ms, **{"tokens_used": 0, **trace})
+            # Sampled (and all slow) requests keep their breakdown; the log entry can't time itself
+            sampled = keep_spans(latency_ms, settings.timing_sample_rate, settings.timing_slow_ms)
+            with timer.span("log.enqueue"):
+                await enqueue_log(
+                    source_hash=req.text,
+                    cache_hit=bool(cache_match),
+                    latency=latency_ms,
+                    stages=dict(timer.spans) if sampled else None,
+                )
+    except Exception as e:
+        request_errors_total.inc(route="extract")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
 
-        cache_insert(
-            email_blurb=req.text,  
-            broker_name=res.broker_name,
-            broker_email=res.broker_email,
-            brokerage=res.brokerage,
-            complete_address=res.complete_address,
-            broker_name_confidence=res.broker_name_confidence,
-            broker_email_confidence=res.broker_email_confidence,
-            brokerage_confidence=res.brokerage_confidence,
-            complete_address_confidence=res.complete_address_confidence,
-        )
+    total_ms = (time.perf_counter() - start_time) * 1000.0
+    record_request("extract", trace["source"], bool(cache_match), total_ms, timer.stages, trace)
+    return result, server_timing(timer.spans, total_ms) if sampled else ""
+
+@app.post("/extract", response_model=ExtractResponse)
+async def extract_text(req: ExtractRequest, response: Response):
+    result, timing = await extract_one(req)
+    if timing and get_settings().server_timing_enabled:
+        response.headers["Server-Timing"] = timing
+    return result
+
+@app.post("/extract/batch", response_model=BatchExtractResponse)
+async def extract_batch(req: BatchExtractRequest):
+    start_time = time.perf_counter()
+    settings = get_settings()
+    max_items = settings.batch_max_items
+    if len(req.texts) > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_items} items")
+
+    results: List[Optional[BatchItemResult]] = [None] * len(req.texts)
+    latencies: Dict[str, float] = {}
+    keys: Dict[int, str] = {}
+    texts_by_key: Dict[str, str] = {}
+    for i, text in enumerate(req.texts):
+        if not text or not text.strip():
+            results[i] = BatchItemResult(index=i, status="error", error="Text is required")
+            continue
+        key = blurb_key(text)
+        keys[i] = key
+        texts_by_key.setdefault(key, text)  # dedupe within the batch
+
+    # (1) Cache tiers: one query per tier for the whole batch
+    hits: Dict[str, tuple] = {}
+    try:
+        hits = await cache_lookup_many_async(texts_by_key.values())
+    except Exception as cache_err:
+        print(f"Batch cache lookup failed: {cache_err}")
+    lookup_ms = (time.perf_counter() - start_time) * 1000.0
+    for key in hits:
+        latencies[key] = lookup_ms
+
+    # (2) Misses: rule-based fast path, else fan out to the agent with bounded concurrency
+    semaphore = asyncio.Semaphore(settings.batch_llm_concurrency)
+    extracted: Dict[str, Dict] = {}
+    traces: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    # Per unique blurb; the batch-wide lookup counts as every item's cache stage
+    timers: Dict[str, StageTimer] = {}
+
+    async def parse_one(key: str, text: str) -> None:
+        timer = timers[key] = StageTimer()
+        timer.add({"cache": lookup_ms})
+        timer.add_spans({"cache.lookup_many": lookup_ms})
+        with timer.stage("rules", span="fast_path"):
+            fields, saved = _try_fast_path(text)
+        if fields is not None:
+            extracted[key] = fields
+            traces[key] = {"source": "rules", "tokens_saved": saved[0], "latency_saved": saved[1]}
+            latencies[key] = (time.perf_counter() - start_time) * 1000.0
+            return
+        async with semaphore:
+            try:
+                with timer.stage("llm", span="agent.parse"):
+                    extracted[key], usage = await _parse_with_agent(text, "bulk")
+                traces[key] = {"source": "llm", **usage}
+            except LLMUnavailableError as llm_err:
+                print(f"LLM unavailable, serving regex-only result: {llm_err}")
+                with timer.stage("fallback", span="regex_fallback"):
+                    extracted[key], traces[key] = _degraded_fields(text), {"source": "degraded"}
+            except Exception as e:
+                errors[key] = f"Processing failed: {e}"
+            latencies[key] = (time.perf_counter() - start_time) * 1000.0
 
-        insert_tracing(tokens_used=res.tokens_used, latency=latency_ms)
+    await asyncio.gather(*(parse_one(k, t) for k, t in texts_by_key.items() if k not in hits))
+
+    # (3) Bulk cache/signature upserts; logs and metrics go to the background writers
+    insert_start = time.perf_counter()
+    try:
+        await cache_insert_many_async(
+            (texts_by_key[k], f) for k, f in extracted.items()
+            if traces[k]["source"] != "degraded" and traces[k].get("parse_ok", True)
+        )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+        print(f"Batch cache insert failed: {e}")
+    insert_ms = (time.perf_counter() - insert_start) * 1000.0
+    for timer in timers.values():
+        timer.add({"storage": insert_ms})
+        timer.add_spans({"cache.insert_many": insert_ms})
 
-    use_email_fallback = float(getattr(res, "broker_email_confidence", 0.0)) < 0.8
-    use_address_fallback = float(getattr(res, "complete_address_confidence", 0.0)) < 0.8
-    broker_info = get_broker_info(req.text) if (use_email_fallback or use_address_fallback) else None
-    fallback_email = broker_info.get("broker_email", "") if broker_info else ""
-    fallback_address = broker_info.get("complete_address", "") if broker_info else ""
+    charged = set()
+    for i, key in keys.items():
+        if key in hits:
+            fields, match = hits[key]
+            results[i] = BatchItemResult(index=i, status="cached", result=_with_fallback(req.texts[i], fields, match))
+        elif key in extracted:
+            degraded = traces[key]["source"] == "degraded"
+            results[i] = BatchItemResult(
+                index=i, status="extracted", result=_with_fallback(req.texts[i], extracted[key], degraded=degraded)
+            )
+        else:
+            results[i] = BatchItemResult(index=i, status="error", error=errors.get(key, "Processing failed"))
+            request_errors_total.inc(route="batch")
+            continue
+        spans = timers[key].spans if key in timers else {"cache.lookup_many": lookup_ms}
+        sampled = keep_spans(latencies[key], settings.timing_sample_rate, settings.timing_slow_ms)
+        await enqueue_log(
+            source_hash=req.texts[i],
+            cache_hit=key in hits,
+            latency=latencies[key],
+            stages=spans if sampled else None,
+        )
+        # Tokens (and fast-path savings) are charged once per unique blurb
+        if key in hits:
+            trace = {"source": hits[key][1]}
+        elif key in charged:
+            trace = {"source": traces[key]["source"]}
+        else:
+            trace = traces[key]
+        await enqueue_tracing(latency=latencies[key], **{"tokens_used": 0, **trace})
+        charged.add(key)
+        stages = timers[key].stages if key in timers else {"cache": lookup_ms}
+        record_request("batch", trace["source"], key in hits, latencies[key], stages, trace)
 
-    return ExtractResponse(
-        broker_name=res.broker_name,
-        broker_email=(fallback_email if (use_email_fallback and fallback_email) else res.broker_email),
-        brokerage=res.brokerage,
-        complete_address=(fallback_address if (use_address_fallback and fallback_address) else res.complete_address),
-    )
+    return BatchExtractResponse(results=results)
 
 # HTTP route: return latest logging entries
 @app.post("/logging")
-def get_logging():
+async def get_logging():
     try:
-        items = get_logging_db()
+        items = await get_logging_db()
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch logs: {e}")
 
+# Prometheus text exposition of the in-process counters/histograms (cheap to scrape, no Mongo)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_exposition() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Histogram-based latency percentiles per route, stage and cache-hit status (Metrics page)
+@app.get("/metrics/summary")
+def metrics_summary() -> Dict[str, List]:
+    return {"latency": latency_summary()}
+
 # HTTP route: return latest metrics list
 @app.post("/metrics")
-def get_metrics():
+async def get_metrics():
     try:
-        items = get_metrics_db()
+        items = await get_metrics_db()
         return items
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch metrics: {e}")
@@ -0,0 +1,102 @@
+"""
+Backfill cache keys for existing documents, in batches.
+
+With ENCRYPTION_ON=1 every cache document gets a `blind_index` (HMAC of
+the normalized blurb) and any unkeyed `blurb_key` is removed; with
+encryption off, documents missing `blurb_key` get one. Documents are
+assumed to have been written under the current ENCRYPTION_ON setting.
+Entries that turn out to duplicate an already-keyed blurb are deleted
+(the cache keeps one document per blurb). Safe to re-run: progress is
+driven by the missing field, so an interrupted run just continues.
+
+--rekey recomputes the key of every document instead (after a key
+rotation or a change to how blurbs are canonicalized, e.g. toggling
+THREAD_NORMALIZE_ENABLED).
+
+Usage:
+    python migrate_blind_index.py
+    python migrate_blind_index.py --batch-size 500 --dry-run
+    python migrate_blind_index.py --rekey
+"""
+import argparse
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from mongo_client import get_collection, close_client
+from mongo_caching import blurb_key, cache_key_field, ensure_indexes
+from email_blurb_hashing import get_codec
+from settings import get_settings
+
+
+def _pending_filter(enc_on: bool) -> dict:
+    field = cache_key_field(enc_on)
+    if enc_on:
+        # Also catch encrypted documents still carrying the unkeyed digest
+        return {"$or": [{field: {"$exists": False}}, {"blurb_key": {"$exists": True}}]}
+    return {field: {"$exists": False}}
+
+
+def backfill(batch_size: int = 1000, dry_run: bool = False, rekey: bool = False) -> dict:
+    enc_on = get_settings().encryption_on
+    field = cache_key_field(enc_on)
+    coll = get_collection("cache")
+    if not dry_run:
+        ensure_indexes()
+
+    counts = {"updated": 0, "duplicates": 0, "skipped": 0}
+    last_id = None
+    while True:
+        query = {} if rekey else _pending_filter(enc_on)
+        if last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        docs = list(coll.find(query, {"email_blurb": 1}).sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        ops = []
+        keys = {}
+        for doc in docs:
+            raw = doc.get("email_blurb")
+            if not raw:
+                counts["skipped"] += 1  # legacy entry without a blurb: nothing to key
+                continue
+            text = get_codec().decode(raw) if enc_on else raw
+            key = blurb_key(text)
+            update = {"$set": {field: key}}
+            if enc_on:
+                update["$unset"] = {"blurb_key": ""}
+            ops.append(UpdateOne({"_id": doc["_id"]}, update))
+            keys[len(ops) - 1] = doc["_id"]
+
+        if dry_run:
+            counts["updated"] += len(ops)
+            continue
+        if not ops:
+            continue
+        try:
+            result = coll.bulk_write(ops, ordered=False)
+            counts["updated"] += result.modified_count
+        except BulkWriteError as bwe:
+            counts["updated"] += bwe.details.get("nModified", 0)
+            dup_ids = [keys[e["index"]] for e in bwe.details.get("writeErrors", []) if e.get("code") == 11000]
+            if len(dup_ids) != len(bwe.details.get("writeErrors", [])):
+                raise
+            # Another document already holds this key; drop the redundant copy
+            coll.bulk_write([DeleteOne({"_id": _id}) for _id in dup_ids], ordered=False)
+            counts["duplicates"] += len(dup_ids)
+        print(f"Batch done (last _id {last_id}): {counts}")
+
+    print(f"Backfilled '{field}'{' (dry run)' if dry_run else ''}: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill cache keys (blind index when ENCRYPTION_ON=1).")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    parser.add_argument("--rekey", action="store_true", help="recompute keys of all documents, not just unkeyed ones")
+    args = parser.parse_args()
+    try:
+        backfill(batch_size=max(1, args.batch_size), dry_run=args.dry_run, rekey=args.rekey)
+    finally:
+        close_client()
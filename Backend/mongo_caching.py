@@ -1,59 +1,158 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-import os
-from dotenv import load_dotenv
-from urllib.parse import quote_plus, unquote
-from email_blurb_hashing import hash as blurb_hash, unhash as blurb_unhash
+import re
+import hashlib
+from datetime import datetime
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from mongo_client import get_collection, run_blocking
+from email_blurb_hashing import get_codec
+from l1_cache import l1_cache
+from near_duplicate_index import MinHashIndex
+from prompt_compression import strip_boilerplate
+from regex_fallback import get_signature_block
+from thread_normalizer import normalize_thread
+from settings import get_settings, on_reload
 
-def cache_hit(email_blurb: str):
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
+_HSPACE_RE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
 
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
-    try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
+# Fuzzy tier: near-duplicate blurbs (greeting/timestamp/disclaimer changes) reuse the nearest entry
+near_dup_index = MinHashIndex(threshold=get_settings().near_dup_threshold)
 
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    db = client["MailMorph"]
-    coll = db["cache"]
+def _near_dup_enabled() -> bool:
+    return get_settings().near_dup_enabled
 
-    # Encryption toggle: 1 means on, else off
-    enc_on = os.getenv("ENCRYPTION_ON", "0") == "1"
+def _apply_settings(settings) -> None:
+    near_dup_index.threshold = float(settings.near_dup_threshold)
+
+on_reload(_apply_settings)
+
+PII_FIELDS = ("broker_name", "broker_email", "brokerage", "complete_address")
+CONFIDENCE_FIELDS = (
+    "broker_name_confidence",
+    "broker_email_confidence",
+    "brokerage_confidence",
+    "complete_address_confidence",
+)
+
+def normalize_blurb(email_blurb: str) -> str:
+    """Canonical text used for cache keys: unified newlines, collapsed spacing, trimmed lines."""
+    text = email_blurb.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(_HSPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+def canonical_blurb(email_blurb: str) -> str:
+    """
+    normalize_blurb of the blurb's canonical thread form (each quoted message once,
+    header noise dropped), so replies quoting the same chain share keys.
+    """
+    if get_settings().thread_normalize_enabled:
+        email_blurb = normalize_thread(email_blurb)
+    return normalize_blurb(email_blurb)
+
+def _content_key(normalized: str) -> str:
+    """SHA-256 hex of a normalized value, or its keyed blind index (HMAC) when encryption is on."""
+    if get_settings().encryption_on:
+        # An unkeyed digest would let anyone with a guess confirm a blurb's content
+        return get_codec().blind_index(normalized)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+def blurb_key(email_blurb: str) -> str:
+    """Fixed-size content address of the canonical blurb (blind index when encrypted)."""
+    return _content_key(canonical_blurb(email_blurb))
+
+def _near_dup_text(email_blurb: str) -> str:
+    """Text the fuzzy tier compares: the canonical blurb without disclaimers/legal footers,
+    so a long shared footer can't make two different brokers' emails look alike. Capped at
+    NEAR_DUP_MAX_CHARS (the newest message comes first) so hashing cost stays bounded."""
+    return strip_boilerplate(canonical_blurb(email_blurb))[:get_settings().near_dup_max_chars]
+
+def _near_dup_scheme() -> str:
+    """Tag stored with each signature; a different scheme or text cap means recompute."""
+    return f"{near_dup_index.scheme}-{get_settings().near_dup_max_chars}"
+
+def _near_dup_fields(key: str, email_blurb: str) -> dict:
+    """Index a blurb in the fuzzy tier; returns the signature fields to store on its cache document."""
+    if not _near_dup_enabled():
+        return {}
+    sig = near_dup_index.add(key, _near_dup_text(email_blurb))
+    if sig is None:
+        return {}
+    return {"near_dup_sig": list(sig), "near_dup_scheme": _near_dup_scheme()}
+
+def _same_broker(result: dict, email_blurb: str) -> bool:
+    """A fuzzy match is only served when its cached broker email appears in the new blurb."""
+    broker_email = str(result.get("broker_email") or "").lower()
+    return bool(broker_email) and broker_email in email_blurb.lower()
+
+def cache_key_field(enc_on: bool) -> str:
+    """Cache document field holding blurb_key(): "blind_index" when encrypted, else "blurb_key"."""
+    return "blind_index" if enc_on else "blurb_key"
+
+def ensure_indexes() -> None:
+    """Create the unique cache-key indexes (idempotent; called at app startup)."""
+    coll = get_collection("cache")
+    # Partial so legacy documents without a key don't collide on null
+    for field in ("blurb_key", "blind_index"):
+        coll.create_index(
+            [(field, ASCENDING)],
+            name=f"{field}_unique",
+            unique=True,
+            partialFilterExpression={field: {"$exists": True}},
+        )
+    get_collection("signature_cache").create_index(
+        [("signature_key", ASCENDING)],
+        name="signature_key_unique",
+        unique=True,
+    )
+
+def _encode_fields(fields: dict, enc_on: bool, email_blurb=None) -> dict:
+    """Extracted fields (and optionally the blurb) as stored, hashing PII in one codec call if encryption is on."""
+    doc = _plain_fields(fields)
+    pii = PII_FIELDS
+    if email_blurb is not None:
+        doc["email_blurb"] = email_blurb
+        pii = PII_FIELDS + ("email_blurb",)
+    return get_codec().encode_fields(doc, pii) if enc_on else doc
+
+def _plain_fields(fields: dict) -> dict:
+    """Extracted fields in the shape cache_hit returns (for L1)."""
+    result = {field: str(fields.get(field, "")) for field in PII_FIELDS}
+    for field in CONFIDENCE_FIELDS:
+        result[field] = float(fields.get(field, 0.0))
+    return result
 
-    print(f"enc_on: {enc_on}")
-    # (2) Hash before querying if encryption is on
-    query_blurb = blurb_hash(email_blurb) if enc_on else email_blurb
+def _decode_doc(doc: dict, enc_on: bool) -> dict:
+    """Cached fields as plaintext, unhashing PII if encryption is on."""
+    result = {field: doc.get(field, "") for field in PII_FIELDS}
+    if enc_on:
+        result = get_codec().decode_fields(result, PII_FIELDS)
+    for field in CONFIDENCE_FIELDS:
+        result[field] = float(doc.get(field, 0.0))
+    return result
 
-    # Try to find a matching document by email_blurb
-    doc = coll.find_one({"email_blurb": query_blurb})
+def cache_hit(email_blurb: str):
+    # (1) In-process L1 first; warm hits never leave the process
+    key = blurb_key(email_blurb)
+    cached = l1_cache.get(key)
+    if cached is not None:
+        return cached
+    return _cache_hit_mongo(key)
+
+def _cache_hit_mongo(key: str):
+    coll = get_collection("cache")
+
+    # Encryption toggle: 1 means on, else off
+    enc_on = get_settings().encryption_on
+
+    # (2) Indexed point lookup on the fixed-size key (blind index when encrypted)
+    doc = coll.find_one({cache_key_field(enc_on): key})
     if not doc:
         return False
 
     # (3) Unhash PII before returning if encryption is on
-    return {
-        "broker_name": (blurb_unhash(doc.get("broker_name", "")) if enc_on else doc.get("broker_name", "")),
-        "broker_email": (blurb_unhash(doc.get("broker_email", "")) if enc_on else doc.get("broker_email", "")),
-        "brokerage": (blurb_unhash(doc.get("brokerage", "")) if enc_on else doc.get("brokerage", "")),
-        "complete_address": (blurb_unhash(doc.get("complete_address", "")) if enc_on else doc.get("complete_address", "")),
-        "broker_name_confidence": float(doc.get("broker_name_confidence", 0.0)),
-        "broker_email_confidence": float(doc.get("broker_email_confidence", 0.0)),
-        "brokerage_confidence": float(doc.get("brokerage_confidence", 0.0)),
-        "complete_address_confidence": float(doc.get("complete_address_confidence", 0.0)),
-    }
+    result = _decode_doc(doc, enc_on)
+    l1_cache.put(key, result)
+    return result
 
 def cache_insert(
     email_blurb: str,
@@ -66,53 +165,320 @@ def cache_insert(
     brokerage_confidence: float,
     complete_address_confidence: float,
 ):
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
-
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
-    try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
-
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    client.admin.command('ping')
-
-    db = client["MailMorph"]
-    coll = db["cache"]
+    coll = get_collection("cache")
 
     # Encryption toggle: 1 means on, else off
-    enc_on = os.getenv("ENCRYPTION_ON", "0") == "1"
-    print(f"enc_on: {enc_on}")
+    enc_on = get_settings().encryption_on
+    key = blurb_key(email_blurb)
 
-    # (1) Hash PII before inserting if encryption is on
-    doc = {
-        "email_blurb": (blurb_hash(email_blurb) if enc_on else email_blurb),
-        "broker_name": (blurb_hash(broker_name) if enc_on else broker_name),
-        "broker_email": (blurb_hash(broker_email) if enc_on else broker_email),
-        "brokerage": (blurb_hash(brokerage) if enc_on else brokerage),
-        "complete_address": (blurb_hash(complete_address) if enc_on else complete_address),
+    fields = {
+        "broker_name": broker_name,
+        "broker_email": broker_email,
+        "brokerage": brokerage,
+        "complete_address": complete_address,
         "broker_name_confidence": broker_name_confidence,
         "broker_email_confidence": broker_email_confidence,
         "brokerage_confidence": brokerage_confidence,
         "complete_address_confidence": complete_address_confidence,
     }
-    # Insert only once to avoid duplicate _id errors
-    result = coll.insert_one(doc)
-    print(f"Inserted document id: {result.inserted_id}")
-    return str(result.inserted_id)
+
+    # (1) Hash PII before inserting if encryption is on
+    field = cache_key_field(enc_on)
+    doc = {field: key, **_encode_fields(fields, enc_on, email_blurb), **_near_dup_fields(key, email_blurb)}
+    # Idempotent upsert keyed on the cache key: concurrent misses converge on one document
+    update = {"$set": doc, "$setOnInsert": {"created_at": datetime.utcnow()}}
+    upsert_kwargs = dict(upsert=True, projection={"_id": 1}, return_document=ReturnDocument.AFTER)
+    try:
+        saved = coll.find_one_and_update({field: key}, update, **upsert_kwargs)
+    except DuplicateKeyError:
+        # Lost an upsert race against another writer; the document exists now
+        saved = coll.find_one_and_update({field: key}, update, **upsert_kwargs)
+    doc_id = saved["_id"] if saved else None
+    print(f"Upserted document id: {doc_id}")
+
+    # Populate L1 with the plaintext values so the next lookup skips Mongo
+    l1_cache.put(key, _plain_fields(fields))
+    return str(doc_id)
+
+def near_duplicate_hit(email_blurb: str):
+    """
+    Fuzzy tier: serve the nearest cached extraction when a blurb is a
+    near-duplicate (MinHash similarity >= NEAR_DUP_THRESHOLD) of a cached one
+    and the cached broker email appears in it. Returns the cached fields plus
+    "similarity", or False.
+    """
+    if not _near_dup_enabled():
+        return False
+    match = near_dup_index.query(_near_dup_text(email_blurb))
+    if match is None:
+        return False
+    key, similarity = match
+    result = l1_cache.get(key) or _cache_hit_mongo(key)
+    if not result:
+        # Stale index entry (document deleted); drop it
+        near_dup_index.remove(key)
+        return False
+    if not _same_broker(result, email_blurb):
+        return False
+    result["similarity"] = similarity
+    return result
+
+def rebuild_near_duplicate_index(batch_size: int = 1000, stop=None) -> int:
+    """
+    Rebuild the in-memory near-duplicate index from the cache collection.
+    Documents carrying a signature of the current scheme are indexed as stored;
+    older ones are re-hashed from their blurb and get the signature written back,
+    so the next startup reads it. `stop` (a threading.Event, set at app shutdown)
+    is checked before each document and ends the rebuild early.
+    """
+    if not _near_dup_enabled():
+        return 0
+    coll = get_collection("cache")
+    enc_on = get_settings().encryption_on
+    field = cache_key_field(enc_on)
+    scheme = _near_dup_scheme()
+    near_dup_index.clear()
+    count = 0
+    backfill = []
+
+    def flush_backfill():
+        if backfill:
+            coll.bulk_write(backfill, ordered=False)
+            backfill.clear()
+
+    stored = coll.find({"near_dup_scheme": scheme}, {field: 1, "near_dup_sig": 1}).batch_size(batch_size)
+    legacy = coll.find(
+        {field: {"$exists": True}, "near_dup_scheme": {"$ne": scheme}},
+        {field: 1, "email_blurb": 1},
+    ).batch_size(batch_size)
+    for cursor, rehash in ((stored, False), (legacy, True)):
+        for doc in cursor:
+            if stop is not None and stop.is_set():
+                flush_backfill()
+                print(f"Near-duplicate rebuild stopped after {count} entries")
+                return count
+            if len(backfill) >= batch_size:
+                flush_backfill()
+            if rehash:
+                raw = doc.get("email_blurb", "")
+                blurb = get_codec().decode(raw) if (enc_on and raw) else raw
+                sig = near_dup_index.add(doc[field], _near_dup_text(blurb))
+                if sig is not None:
+                    update = {"$set": {"near_dup_sig": list(sig), "near_dup_scheme": scheme}}
+                    backfill.append(UpdateOne({field: doc[field]}, update))
+            else:
+                near_dup_index.add_signature(doc[field], doc["near_dup_sig"])
+            count += 1
+    flush_backfill()
+    print(f"Near-duplicate index rebuilt: {count} entries")
+    return count
+
+def signature_key(signature_block: str) -> str:
+    """Key for the signature tier: content key of the normalized, lowercased signature block."""
+    return _content_key(normalize_blurb(signature_block).lower())
+
+def _signature_min_confidence() -> float:
+    return get_settings().signature_cache_min_confidence
+
+def signature_cache_hit(email_blurb: str):
+    """
+    Second cache tier: reuse a prior extraction of the same broker signature
+    under a different email body. Returns False on miss or when the blurb
+    is ambiguous (several signatures / email addresses).
+    """
+    block = get_signature_block(email_blurb)
+    if not block:
+        return False
+
+    coll = get_collection("signature_cache")
+    enc_on = get_settings().encryption_on
+    doc = coll.find_one({"signature_key": signature_key(block)})
+    if not doc:
+        return False
+
+    result = _decode_doc(doc, enc_on)
+    # Confidence guard: only serve extractions that were solid when stored
+    if min(result[field] for field in CONFIDENCE_FIELDS) < _signature_min_confidence():
+        return False
+    # The cached email must actually appear in this blurb's signature
+    if result["broker_email"].lower() not in block.lower():
+        return False
+    return result
+
+def _signature_entry(email_blurb: str, fields: dict):
+    """
+    (signature_key, document) for an LLM extraction, or None when the
+    signature is ambiguous, confidence is low, or the extracted email does
+    not come from the signature block.
+    """
+    block = get_signature_block(email_blurb)
+    if not block:
+        return None
+    if min(float(fields.get(field, 0.0)) for field in CONFIDENCE_FIELDS) < _signature_min_confidence():
+        return None
+    broker_email = str(fields.get("broker_email", ""))
+    if not broker_email or broker_email.lower() not in block.lower():
+        return None
+
+    key = signature_key(block)
+    enc_on = get_settings().encryption_on
+    return key, {"signature_key": key, **_encode_fields(fields, enc_on)}
+
+def signature_cache_insert(email_blurb: str, **fields):
+    """Store an LLM extraction under its signature key; returns None when skipped."""
+    entry = _signature_entry(email_blurb, fields)
+    if entry is None:
+        return None
+    key, doc = entry
+    coll = get_collection("signature_cache")
+    update = {"$set": doc, "$setOnInsert": {"created_at": datetime.utcnow()}}
+    try:
+        coll.update_one({"signature_key": key}, update, upsert=True)
+    except DuplicateKeyError:
+        coll.update_one({"signature_key": key}, update, upsert=True)
+    return key
+
+def _cache_get_many(keys) -> dict:
+    """{blurb_key: result} for the keys found in L1 or, in one $in query, in Mongo."""
+    found = {}
+    missing = []
+    for key in keys:
+        cached = l1_cache.get(key)
+        if cached is not None:
+            found[key] = cached
+        else:
+            missing.append(key)
+    if missing:
+        enc_on = get_settings().encryption_on
+        field = cache_key_field(enc_on)
+        for doc in get_collection("cache").find({field: {"$in": missing}}):
+            result = _decode_doc(doc, enc_on)
+            l1_cache.put(doc[field], result)
+            found[doc[field]] = result
+    return found
+
+def cache_lookup_many(email_blurbs) -> dict:
+    """
+    Batch lookup across all cache tiers with one query per tier.
+    Returns {blurb_key: (result, match)} with match "exact", "fuzzy" or "signature";
+    keys that missed every tier are absent.
+    """
+    pending = {}
+    for text in email_blurbs:
+        pending.setdefault(blurb_key(text), text)
+    hits = {}
+
+    # (1) Exact tier: L1 + one $in on the cache key
+    for key, result in _cache_get_many(list(pending)).items():
+        hits[key] = (result, "exact")
+        pending.pop(key, None)
+
+    # (2) Fuzzy tier: in-memory index, then one $in for the matched entries
+    if pending and _near_dup_enabled():
+        nearest = {}
+        for key, text in pending.items():
+            match = near_dup_index.query(_near_dup_text(text))
+            if match is not None:
+                nearest[key] = match
+        found = _cache_get_many({match_key for match_key, _ in nearest.values()})
+        for key, (match_key, similarity) in nearest.items():
+            if match_key in found and _same_broker(found[match_key], pending[key]):
+                hits[key] = (dict(found[match_key], similarity=similarity), "fuzzy")
+                pending.pop(key, None)
+
+    # (3) Signature tier: one $in on signature_key
+    if pending:
+        blocks = {}
+        for key, text in pending.items():
+            block = get_signature_block(text)
+            if block:
+                blocks[key] = block
+        by_sig = {signature_key(block): key for key, block in blocks.items()}
+        if by_sig:
+            enc_on = get_settings().encryption_on
+            min_conf = _signature_min_confidence()
+            cursor = get_collection("signature_cache").find({"signature_key": {"$in": list(by_sig)}})
+            sig_docs = {doc["signature_key"]: doc for doc in cursor}
+            for sig, key in by_sig.items():
+                if sig not in sig_docs:
+                    continue
+                result = _decode_doc(sig_docs[sig], enc_on)
+                if min(result[field] for field in CONFIDENCE_FIELDS) < min_conf:
+                    continue
+                if result["broker_email"].lower() not in blocks[key].lower():
+                    continue
+                hits[key] = (result, "signature")
+    return hits
+
+def cache_insert_many(items) -> int:
+    """
+    Bulk upsert of (email_blurb, fields) pairs into the cache and signature
+    tiers (one bulk_write each). Returns the number of cache entries written.
+    """
+    enc_on = get_settings().encryption_on
+    field = cache_key_field(enc_on)
+    now = datetime.utcnow()
+    cache_ops = {}
+    sig_ops = {}
+    for email_blurb, fields in items:
+        key = blurb_key(email_blurb)
+        doc = {field: key, **_encode_fields(fields, enc_on, email_blurb), **_near_dup_fields(key, email_blurb)}
+        cache_ops[key] = UpdateOne({field: key}, {"$set": doc, "$setOnInsert": {"created_at": now}}, upsert=True)
+        l1_cache.put(key, _plain_fields(fields))
+
+        entry = _signature_entry(email_blurb, fields)
+        if entry is not None:
+            sig, sig_doc = entry
+            sig_ops[sig] = UpdateOne({"signature_key": sig}, {"$set": sig_doc, "$setOnInsert": {"created_at": now}}, upsert=True)
+
+    for name, ops in (("cache", cache_ops), ("signature_cache", sig_ops)):
+        if not ops:
+            continue
+        try:
+            get_collection(name).bulk_write(list(ops.values()), ordered=False)
+        except BulkWriteError as bwe:
+            # Duplicate-key races with concurrent writers are harmless: the entry exists
+            errors = [e for e in bwe.details.get("writeErrors", []) if e.get("code") != 11000]
+            if errors:
+                raise
+    return len(cache_ops)
+
+def cache_stats() -> dict:
+    """Counters for the in-process L1 cache and near-duplicate index."""
+    return {"l1": l1_cache.stats(), "near_duplicate": near_dup_index.stats()}
+
+async def cache_hit_async(email_blurb: str):
+    """Async variant of cache_hit for the FastAPI routes."""
+    # Serve warm L1 hits inline; only go to the executor on an L1 miss
+    key = blurb_key(email_blurb)
+    cached = l1_cache.get(key)
+    if cached is not None:
+        return cached
+    return await run_blocking(_cache_hit_mongo, key)
+
+async def cache_insert_async(**fields):
+    """Async variant of cache_insert; takes the same keyword arguments."""
+    return await run_blocking(cache_insert, **fields)
+
+async def signature_cache_hit_async(email_blurb: str):
+    """Async variant of signature_cache_hit for the FastAPI routes."""
+    return await run_blocking(signature_cache_hit, email_blurb)
+
+async def near_duplicate_hit_async(email_blurb: str):
+    """Async variant of near_duplicate_hit for the FastAPI routes."""
+    return await run_blocking(near_duplicate_hit, email_blurb)
+
+async def cache_lookup_many_async(email_blurbs):
+    """Async variant of cache_lookup_many for the FastAPI routes."""
+    return await run_blocking(cache_lookup_many, list(email_blurbs))
+
+async def cache_insert_many_async(items):
+    """Async variant of cache_insert_many for the FastAPI routes."""
+    return await run_blocking(cache_insert_many, list(items))
+
+async def signature_cache_insert_async(email_blurb: str, **fields):
+    """Async variant of signature_cache_insert for the FastAPI routes."""
+    return await run_blocking(signature_cache_insert, email_blurb, **fields)
 
 if __name__ == "__main__":
     email_blurb = "Hello, I am Bob. I am a broker at Bob Inc. My email is bob@gmail.com. My address is 123 Main St, Los Angeles, CA 90001."
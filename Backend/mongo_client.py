@@ -0,0 +1,111 @@
+from pymongo.mongo_client import MongoClient
+from pymongo.server_api import ServerApi
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, unquote
+from settings import get_settings
+
+DB_NAME = "MailMorph"
+
+_client = None
+_client_lock = threading.Lock()
+_executor = None
+
+
+def _safe_uri(raw_uri: str) -> str:
+    """Rebuild the URI so credentials are escaped exactly once."""
+    try:
+        scheme, rest = raw_uri.split("://", 1)
+        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
+        if ":" in auth:
+            username, password = auth.split(":", 1)
+            safe_user = quote_plus(unquote(username))
+            safe_pass = quote_plus(unquote(password))
+            return f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
+        safe_auth = quote_plus(unquote(auth))
+        return f"{scheme}://{safe_auth}@{host_and_query}"
+    except Exception:
+        return raw_uri
+
+
+def _pool_options() -> dict:
+    """Pool size and timeouts, overridable via Backend/.env."""
+    settings = get_settings()
+    return {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "connectTimeoutMS": settings.mongo_connect_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "socketTimeoutMS": settings.mongo_socket_timeout_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+    }
+
+
+def init_client(ping: bool = True) -> MongoClient:
+    """
+    Create the process-wide pooled MongoClient (idempotent).
+    Called once at app startup; every module shares the same pool afterwards.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+
+        raw_uri = get_settings().mongo_uri
+        if not raw_uri:
+            raise SystemExit("Mongo_DB_URI missing in Backend/.env")
+
+        client = MongoClient(_safe_uri(raw_uri), server_api=ServerApi('1'), **_pool_options())
+        if ping:
+            # One round-trip at startup instead of one per call
+            client.admin.command('ping')
+        _client = client
+        return _client
+
+
+def get_client() -> MongoClient:
+    """Return the shared client, creating it lazily for scripts that skip init_client()."""
+    if _client is None:
+        return init_client(ping=False)
+    return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def get_collection(name: str):
+    return get_db()[name]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Bounded worker pool that runs blocking pymongo calls off the event loop."""
+    global _executor
+    with _client_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_settings().mongo_executor_workers,
+                thread_name_prefix="mongo",
+            )
+        return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Await a synchronous storage call without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def close_client() -> None:
+    """Close the shared client and release its pooled connections (app shutdown)."""
+    global _client, _executor
+    with _client_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _client is not None:
+            _client.close()
+            _client = None
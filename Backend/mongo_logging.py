@@ -1,56 +1,39 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-import os
-from dotenv import load_dotenv
-from urllib.parse import quote_plus, unquote
+from mongo_client import get_collection, run_blocking
+from mongo_writer import BufferedWriter
 import random
 from datetime import datetime
-from email_blurb_hashing import hash as blurb_hash, unhash as blurb_unhash
+from email_blurb_hashing import get_codec
+from settings import get_settings
 
 
-def insert_log(source_hash: str, cache_hit: bool, latency: float) -> str:
+def _log_doc(record: dict) -> dict:
     """
-    Insert a log document into the MailMorph.Logging collection.
-    Mirrors mongo_metrics.py but targets the 'Logging' collection.
+    Build a Logging document from a {"source_hash", "cache_hit", "latency"[, "stages", "timestamp"]} record.
+    stages: per-stage milliseconds ({"cache.exact": 0.4, "agent.parse": 812.3, ...}) for sampled requests.
     """
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
-
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
-    try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
-
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    client.admin.command('ping')
-
-    db = client["MailMorph"]
-    coll = db["Logging"]  # use Logging collection
-
     # Encrypt source_hash if ENCRYPTION_ON=1
-    enc_on = os.getenv("ENCRYPTION_ON", "0") == "1"
-    safe_source = blurb_hash(str(source_hash)) if enc_on else str(source_hash)
-
+    enc_on = get_settings().encryption_on
+    source = str(record["source_hash"])
     doc = {
-        "source_hash": safe_source,
-        "cache_hit": bool(cache_hit),
-        "latency": float(latency),
+        "source_hash": get_codec().encode(source) if enc_on else source,
+        "cache_hit": bool(record["cache_hit"]),
+        "latency": float(record["latency"]),
         # Store timestamp for sorting, but we won’t return it from get_logging()
-        "timestamp": datetime.utcnow(),
+        "timestamp": record.get("timestamp") or datetime.utcnow(),
     }
+    if record.get("stages"):
+        doc["stages"] = {name: round(float(ms), 2) for name, ms in record["stages"].items()}
+    return doc
+
+
+def insert_log(source_hash: str, cache_hit: bool, latency: float) -> str:
+    """
+    Insert a log document into the MailMorph.Logging collection.
+    Mirrors mongo_metrics.py but targets the 'Logging' collection.
+    """
+    coll = get_collection("Logging")  # use Logging collection
+
+    doc = _log_doc({"source_hash": source_hash, "cache_hit": cache_hit, "latency": latency})
     result = coll.insert_one(doc)
     print(f"Inserted log id: {result.inserted_id}")
     return str(result.inserted_id)
@@ -60,32 +43,10 @@ def get_logging():
     """
     Fetch up to 200 most recent log documents and return as a Python list.
     Returns dictionaries with: request_id (str), source_hash (str),
-    cache_hit (bool), latency (float). Timestamp is omitted.
+    cache_hit (bool), latency (float), stages (dict, empty when not sampled)
+    and timestamp (ISO string).
     """
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
-
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
-    try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
-
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    db = client["MailMorph"]
-    coll = db["Logging"]
+    coll = get_collection("Logging")
 
     # Latest first; cap at 200
     cursor = coll.find({}).sort("timestamp", -1).limit(200)
@@ -100,11 +61,32 @@ def get_logging():
             "source_hash": short_source,
             "cache_hit": bool(doc.get("cache_hit", False)),
             "latency": float(doc.get("latency", 0.0)),
+            "stages": doc.get("stages") or {},
             "timestamp": ts.isoformat() if hasattr(ts, "isoformat") else (str(ts) if ts is not None else None),
         })
     return items
 
 
+# Request path only enqueues; a background task batches inserts (started in main.lifespan)
+log_writer = BufferedWriter.from_settings("Logging", get_settings().log_writer, build=_log_doc)
+
+
+async def enqueue_log(source_hash: str, cache_hit: bool, latency: float, stages=None) -> bool:
+    """Queue a log record for the background writer; returns False if it was dropped."""
+    return await log_writer.submit({
+        "source_hash": source_hash,
+        "cache_hit": cache_hit,
+        "latency": latency,
+        "stages": stages,
+        "timestamp": datetime.utcnow(),
+    })
+
+
+async def get_logging_async():
+    """Async variant of get_logging for the FastAPI routes."""
+    return await run_blocking(get_logging)
+
+
 if __name__ == "__main__":
     # Insert 5 random logs
     for _ in range(5):
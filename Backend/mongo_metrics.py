@@ -1,49 +1,65 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
-import os
-from dotenv import load_dotenv
-from urllib.parse import quote_plus, unquote
+from mongo_client import get_collection, run_blocking
+from mongo_writer import BufferedWriter
 import random
 from datetime import datetime
-from email_blurb_hashing import hash as blurb_hash, unhash as blurb_unhash
+from settings import get_settings
 
-def insert_tracing(tokens_used, latency):
-    """
-    Insert a tracing document into the MailMorph.metrics collection.
-    Uses the same env/URI handling as mongo_caching.py.
-    """
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
+# Optional per-request fields and their defaults:
+#   source: exact/fuzzy/signature/rules/llm
+#   tokens_saved, latency_saved: estimated savings of a fast-path skip
+#   input_tokens_before, input_tokens_after: LLM input size around prompt compression
+#   output_tokens, parse_ok, retries: structured-output result of the agent call
+#   model_tier, escalation, small_/large_tokens, small_/large_latency: model cascade
+#   lane, queue_wait: rate-limit lane and time spent waiting for provider budget (ms)
+TRACE_FIELDS = {
+    "source": "",
+    "tokens_saved": 0,
+    "latency_saved": 0.0,
+    "input_tokens_before": 0,
+    "input_tokens_after": 0,
+    "output_tokens": 0,
+    "parse_ok": True,
+    "retries": 0,
+    "model_tier": "",
+    "escalation": "",
+    "small_tokens": 0,
+    "small_latency": 0.0,
+    "large_tokens": 0,
+    "large_latency": 0.0,
+    "lane": "",
+    "queue_wait": 0.0,
+}
 
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
+def _trace_value(value, default):
+    if value is None:
+        return default
     try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
-
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    client.admin.command('ping')
-
-    db = client["MailMorph"]
-    coll = db["metrics"]  # use metrics collection instead of cache
+        return type(default)(value)
+    except (TypeError, ValueError):
+        return default
 
+def _tracing_doc(record: dict) -> dict:
+    """
+    Build a metrics document from a {"tokens_used", "latency"[, "timestamp"]} record
+    plus any of the optional TRACE_FIELDS.
+    """
     doc = {
-        "tokens_used": int(tokens_used),
-        "latency": latency,
-        "timestamp": datetime.utcnow(),
+        "tokens_used": _trace_value(record.get("tokens_used"), 0),
+        "latency": record["latency"],
     }
+    for name, default in TRACE_FIELDS.items():
+        doc[name] = _trace_value(record.get(name), default)
+    doc["timestamp"] = record.get("timestamp") or datetime.utcnow()
+    return doc
+
+def insert_tracing(tokens_used, latency):
+    """
+    Insert a tracing document into the MailMorph.metrics collection.
+    Uses the shared pooled client from mongo_client.py.
+    """
+    coll = get_collection("metrics")  # use metrics collection instead of cache
+
+    doc = _tracing_doc({"tokens_used": tokens_used, "latency": latency})
     result = coll.insert_one(doc)
     print(f"Inserted metrics id: {result.inserted_id}")
     return str(result.inserted_id)
@@ -53,30 +69,7 @@ def get_metrics():
     Fetch up to 200 most recent metric documents and return as a Python list.
     Normalizes _id to str and timestamp to ISO string for easy serialization.
     """
-    # Load env and read URI
-    load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"), override=True)
-    raw_uri = os.getenv("Mongo_DB_URI")
-    if not raw_uri:
-        raise SystemExit("Mongo_DB_URI missing in Backend/.env")
-
-    # Safely rebuild URI to avoid double-encoding or invalid escaping
-    try:
-        scheme, rest = raw_uri.split("://", 1)
-        auth, host_and_query = rest.rsplit("@", 1)  # last '@' separates host
-        if ":" in auth:
-            username, password = auth.split(":", 1)
-            safe_user = quote_plus(unquote(username))
-            safe_pass = quote_plus(unquote(password))
-            safe_uri = f"{scheme}://{safe_user}:{safe_pass}@{host_and_query}"
-        else:
-            safe_auth = quote_plus(unquote(auth))
-            safe_uri = f"{scheme}://{safe_auth}@{host_and_query}"
-    except Exception:
-        safe_uri = raw_uri
-
-    client = MongoClient(safe_uri, server_api=ServerApi('1'))
-    db = client["MailMorph"]
-    coll = db["metrics"]
+    coll = get_collection("metrics")
 
     # Latest first; cap at 200
     cursor = coll.find({}).sort("timestamp", -1).limit(200)
@@ -84,13 +77,32 @@ def get_metrics():
     items = []
     for doc in cursor:
         ts = doc.get("timestamp")
-        items.append({
+        item = {
             "tokens_used": int(doc.get("tokens_used", 0)),
             "latency": float(doc.get("latency", 0)),
-            "timestamp": ts.isoformat() if hasattr(ts, "isoformat") else (str(ts) if ts is not None else None),
-        })
+        }
+        for name, default in TRACE_FIELDS.items():
+            item[name] = _trace_value(doc.get(name), default)
+        item["timestamp"] = ts.isoformat() if hasattr(ts, "isoformat") else (str(ts) if ts is not None else None)
+        items.append(item)
     return items
 
+# Request path only enqueues; a background task batches inserts (started in main.lifespan)
+metrics_writer = BufferedWriter.from_settings("metrics", get_settings().metrics_writer, build=_tracing_doc)
+
+async def enqueue_tracing(tokens_used, latency, **fields) -> bool:
+    """
+    Queue a metrics record for the background writer; returns False if it was dropped.
+    fields: any of TRACE_FIELDS (others are ignored).
+    """
+    record = {name: fields[name] for name in TRACE_FIELDS if name in fields}
+    record.update(tokens_used=tokens_used, latency=latency, timestamp=datetime.utcnow())
+    return await metrics_writer.submit(record)
+
+async def get_metrics_async():
+    """Async variant of get_metrics for the FastAPI routes."""
+    return await run_blocking(get_metrics)
+
 if __name__ == "__main__":
     tokens_used = random.randint(50, 2500)
     latency = round(random.uniform(5.0, 1000.0), 2)
@@ -0,0 +1,141 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+from mongo_client import get_collection, run_blocking
+
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class BufferedWriter:
+    """
+    Background writer for append-only collections (Logging, metrics).
+    The request path only appends a record to a bounded in-memory queue;
+    a flusher task writes batches with insert_many when batch_size records
+    are waiting or flush_interval seconds have passed since the first one.
+
+    When the queue is full the drop policy decides: "drop_newest" rejects
+    the new record, "drop_oldest" evicts the oldest queued one, "block"
+    makes submit() wait for space (backpressure).
+    """
+
+    def __init__(self, collection: str, build=None, max_queue: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 drop_policy: str = "drop_newest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}")
+        self.collection = collection
+        # Turns a queued record into a document; runs on the flush thread, off the request path
+        self.build = build or (lambda record: record)
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.drop_policy = drop_policy
+        self._buffer = deque()
+        self._task = None
+        self._closing = False
+        self._wake = None
+        self._space = None
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+
+    @classmethod
+    def from_settings(cls, collection: str, config, build=None):
+        """Writer configured from a settings.WriterSettings (<prefix>_MAX_QUEUE/... in .env)."""
+        return cls(
+            collection,
+            build=build,
+            max_queue=config.max_queue,
+            batch_size=config.batch_size,
+            flush_interval=config.flush_interval,
+            drop_policy=config.drop_policy,
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._closing = False
+            self._wake = asyncio.Event()
+            self._space = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def submit(self, record: dict) -> bool:
+        """Queue a record for the next flush. Returns False if it was dropped."""
+        if self._task is None:
+            # Writer not started (one-off scripts): write straight through
+            await self._flush([record])
+            return True
+        while len(self._buffer) >= self.max_queue:
+            if self.drop_policy == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.drop_policy == "drop_oldest":
+                self._buffer.popleft()
+                self.dropped += 1
+                break
+            # "block": wait until the flusher frees space
+            self._space.clear()
+            await self._space.wait()
+        self._buffer.append(record)
+        self.enqueued += 1
+        # Wake the flusher to start its interval timer, or early once a full batch is waiting
+        if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+            self._wake.set()
+        return True
+
+    async def _run(self) -> None:
+        # Stopped with a flag rather than cancellation so no buffered record is lost mid-batch
+        while True:
+            if not self._buffer:
+                if self._closing:
+                    return
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            if len(self._buffer) < self.batch_size and not self._closing:
+                self._wake.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            self._space.set()
+            await self._flush(batch)
+
+    def _insert(self, batch) -> None:
+        get_collection(self.collection).insert_many([self.build(r) for r in batch], ordered=False)
+
+    async def _flush(self, batch) -> None:
+        if not batch:
+            return
+        try:
+            await run_blocking(self._insert, batch)
+            self.flushed += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"{self.collection} flush failed ({len(batch)} records): {e}")
+
+    async def stop(self) -> None:
+        """Flush everything still buffered and stop the flusher (app shutdown)."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._buffer),
+            "max_queue": self.max_queue,
+            "drop_policy": self.drop_policy,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
@@ -0,0 +1,159 @@
+from array import array
+import random
+import re
+import threading
+import zlib
+
+_TOKEN_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class MinHashIndex:
+    """
+    Locality-sensitive index over cached blurbs (word shingles + MinHash,
+    banded lookup). Finds the cached blurb most similar to a new one without
+    scanning the whole cache: only blurbs sharing at least one band bucket
+    are compared.
+
+    Signatures use one-permutation hashing: each shingle is hashed once and
+    kept in one of num_perm bins (the minimum per bin), and empty bins borrow
+    from the next filled one (rotation densification). Cost is linear in the
+    shingles instead of num_perm passes over them, and two signatures agree
+    per bin with probability ~ their Jaccard similarity, as with num_perm
+    independent permutations.
+
+    With num_perm=64 and bands=16 (4 rows per band) a pair with Jaccard
+    similarity s becomes a candidate with probability 1 - (1 - s^4)^16,
+    i.e. ~0.99 at s=0.8 and ~0.01 at s=0.2.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.9,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = float(threshold)
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._hash = (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        # Densified bins add distance * _bin_span, so every value fits a signed 64-bit int (BSON)
+        self._bin_span = _MERSENNE_PRIME // num_perm + 1
+        # Identifies the signature layout; stored signatures from another scheme are recomputed
+        self.scheme = f"oph-{num_perm}-{shingle_size}-{seed}"
+        self._signatures = {}  # key -> signature (array of int64)
+        self._buckets = [dict() for _ in range(bands)]  # band -> {band hash: set(keys)}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.hits = 0
+
+    def _shingles(self, text: str) -> set:
+        tokens = _TOKEN_RE.findall(text.lower())
+        k = self.shingle_size
+        if len(tokens) < k:
+            grams = [" ".join(tokens)] if tokens else []
+        else:
+            grams = [" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)]
+        return {zlib.crc32(g.encode("utf-8")) for g in grams}
+
+    def signature(self, text: str):
+        shingles = self._shingles(text)
+        if not shingles:
+            return None
+        n, p = self.num_perm, _MERSENNE_PRIME
+        a, b = self._hash
+        bins = [None] * n
+        for x in shingles:
+            h = (a * x + b) % p
+            slot, value = h % n, h // n
+            if bins[slot] is None or value < bins[slot]:
+                bins[slot] = value
+        # Rotation densification: an empty bin takes the next filled bin's value, offset by the distance
+        if None in bins:
+            out = list(bins)
+            nxt = next(i for i in range(n) if bins[i] is not None) + n  # wraps past the end
+            for i in range(n - 1, -1, -1):
+                if bins[i] is not None:
+                    nxt = i
+                else:
+                    out[i] = bins[nxt % n] + (nxt - i) * self._bin_span
+            bins = out
+        return array("q", bins)
+
+    def _band_hashes(self, sig):
+        r = self.rows
+        return [hash(tuple(sig[i * r:(i + 1) * r])) for i in range(self.bands)]
+
+    def add(self, key: str, text: str):
+        """Index a blurb; returns its signature (None for text without words)."""
+        sig = self.signature(text)
+        if sig is not None:
+            self.add_signature(key, sig)
+        return sig
+
+    def add_signature(self, key: str, sig) -> None:
+        """Index a precomputed signature (e.g. one stored on the cache document)."""
+        sig = array("q", sig)
+        if len(sig) != self.num_perm:
+            return
+        with self._lock:
+            if key in self._signatures:
+                self._remove_locked(key)
+            self._signatures[key] = sig
+            for band, h in enumerate(self._band_hashes(sig)):
+                self._buckets[band].setdefault(h, set()).add(key)
+
+    def _remove_locked(self, key: str) -> None:
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band, h in enumerate(self._band_hashes(sig)):
+            bucket = self._buckets[band].get(h)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][h]
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def query(self, text: str):
+        """Return (key, estimated similarity) of the nearest indexed blurb above threshold, else None."""
+        sig = self.signature(text)
+        if sig is None:
+            return None
+        band_hashes = self._band_hashes(sig)
+        with self._lock:
+            self.queries += 1
+            candidates = set()
+            for band, h in enumerate(band_hashes):
+                candidates.update(self._buckets[band].get(h, ()))
+            best_key, best_sim = None, 0.0
+            for key in candidates:
+                other = self._signatures[key]
+                sim = sum(1 for x, y in zip(sig, other) if x == y) / self.num_perm
+                if sim > best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None or best_sim < self.threshold:
+                return None
+            self.hits += 1
+            return best_key, best_sim
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._signatures),
+                "threshold": self.threshold,
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "queries": self.queries,
+                "hits": self.hits,
+            }
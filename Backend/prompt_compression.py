@@ -0,0 +1,149 @@
+import re
+from regex_fallback import scan_blurb, signature_paragraph
+
+# Rough token count (word pieces + punctuation); close enough to compare before/after
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORDS_PER_LONG_TOKEN = 8
+
+# Paragraphs that are legal/boilerplate rather than content
+_BOILERPLATE_RE = re.compile(
+    r"(?:confidentiality notice|privacy notice|the contents of this e-?mail|this e-?mail and any attach"
+    r"|this message (?:and any attachments )?(?:is|may be) (?:confidential|privileged|intended)"
+    r"|if you are not the intended recipient|unsubscribe|please consider the environment"
+    r"|disclaimer:|legal notice|this communication (?:is|may be) confidential)",
+    re.IGNORECASE,
+)
+_RULE_LINE_RE = re.compile(r"^[\s_=*~-]{4,}$")
+_FROM_LINE_RE = re.compile(r"^\s*From\s*:", re.IGNORECASE)
+_GAP = "[...]"
+# Context lines (greeting, text around a signature) are clipped to this many tokens each
+MAX_CONTEXT_LINE_TOKENS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate LLM tokens: one per word piece / punctuation mark, long words count extra."""
+    count = 0
+    for token in _TOKEN_RE.findall(text or ""):
+        count += 1 + len(token) // _WORDS_PER_LONG_TOKEN
+    return count
+
+
+def strip_boilerplate(text: str) -> str:
+    """Drop confidentiality/legal/unsubscribe paragraphs and decorative rule lines."""
+    paragraphs = re.split(r"\n[ \t]*\n", text.replace("\r\n", "\n"))
+    kept = []
+    for para in paragraphs:
+        if _BOILERPLATE_RE.search(para):
+            continue
+        lines = [line for line in para.split("\n") if not _RULE_LINE_RE.match(line)]
+        if any(line.strip() for line in lines):
+            kept.append("\n".join(lines))
+    return "\n\n".join(kept)
+
+
+def _clip(line: str, max_tokens: int) -> str:
+    """Line shortened to about max_tokens tokens (whole words), marked with an ellipsis."""
+    if estimate_tokens(line) <= max_tokens:
+        return line
+    out = []
+    used = 0
+    for word in line.split():
+        used += estimate_tokens(word)
+        if used > max_tokens:
+            break
+        out.append(word)
+    return " ".join(out) + " ..."
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Leading part of text that fits the token budget (cut at a line boundary when possible)."""
+    out = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not out:
+                # A single over-long first line: keep its leading words rather than nothing
+                out.append(_clip(line, budget - 1))
+            break
+        out.append(line)
+        used += cost
+    return "\n".join(out)
+
+
+def compress_blurb(text: str, budget: int = 600, min_tokens: int = 300, context_lines: int = 2):
+    """
+    Shrink a blurb to what the extractor needs: signature candidates and their
+    neighbourhood, sender header lines, and the opening lines of the newest
+    message. Boilerplate notices are removed and the result is capped at `budget`.
+    Blurbs under `min_tokens` (after boilerplate removal) are sent unchanged.
+
+    Returns (compressed text, tokens before, tokens after).
+    """
+    before = estimate_tokens(text)
+    cleaned = strip_boilerplate(text)
+    cleaned_tokens = estimate_tokens(cleaned)
+    if cleaned_tokens <= min_tokens:
+        return cleaned, before, cleaned_tokens
+
+    scan = scan_blurb(cleaned)
+    lines = scan.lines
+    if not scan.candidates:
+        compressed = _truncate(cleaned, budget)
+        return compressed, before, estimate_tokens(compressed)
+
+    # Signature lines are kept whole; everything else is clipped context
+    lines = [_clip(line, MAX_CONTEXT_LINE_TOKENS) for line in lines]
+    for c in scan.candidates:
+        start, end = signature_paragraph(scan, c)
+        for i in range(start, end + 1):
+            lines[i] = scan.lines[i]
+
+    # Line ranges to keep, most useful first: licensed signatures, other signatures, then context
+    ranges = []
+    for licensed in (True, False):
+        for c in scan.candidates:
+            if c.licensed == licensed:
+                start, end = signature_paragraph(scan, c)
+                ranges.append((max(c.start, start - context_lines), min(c.end, end + context_lines)))
+    ranges.append((0, min(len(lines) - 1, 2 * context_lines)))  # greeting / opening of the newest message
+    ranges.extend((i, i) for i, line in enumerate(lines) if _FROM_LINE_RE.match(line))
+
+    keep = set()
+    used = 0
+    for start, end in ranges:
+        new = [i for i in range(start, end + 1) if i not in keep]
+        cost = sum(estimate_tokens(lines[i]) + 1 for i in new)
+        if used + cost > budget:
+            continue
+        keep.update(new)
+        used += cost
+
+    if not keep:
+        compressed = _truncate(cleaned, budget)
+        return compressed, before, estimate_tokens(compressed)
+
+    # Reassemble in original order, marking skipped stretches
+    out = []
+    last = -1
+    for i in sorted(keep):
+        if last != -1 and i != last + 1:
+            out.append(_GAP)
+        if lines[i].strip() or (out and out[-1].strip()):
+            out.append(lines[i])
+        last = i
+    compressed = "\n".join(out).strip()
+    return compressed, before, estimate_tokens(compressed)
+
+
+if __name__ == "__main__":
+    sample = (
+        "Hi team,\n\nPlease see the renewal below.\n\n" + "Lots of quoted discussion here. " * 80 + "\n\n"
+        "Thanks,\nHarry Smith, AINS\nLicense 0G12345\nABC Insurance\n123 Main St, Los Angeles, CA 90001\n"
+        "harry@abc.com\n\nCONFIDENTIALITY NOTICE: This e-mail and any attachments are confidential.\n\n"
+        "-----Original Message-----\nFrom: Jane Roe <jane@wholesale.com>\nSent: Monday\n\n"
+        + "Older thread text. " * 200
+    )
+    compressed, before, after = compress_blurb(sample)
+    print(compressed)
+    print(f"\nTokens: {before} -> {after}")
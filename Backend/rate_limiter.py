@@ -0,0 +1,186 @@
+import asyncio
+import time
+from collections import deque
+
+# Highest priority first: interactive /extract calls are granted before bulk work
+LANES = ("interactive", "bulk")
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to `per_minute`; 0 means unlimited."""
+
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = float(per_minute)
+        self.level = self.per_minute
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self._refill()
+            self.level -= amount
+
+    def give(self, amount: float) -> None:
+        """Return (or, negative, charge extra) units after the real cost is known."""
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.per_minute, self.level + amount)
+
+
+class RateScheduler:
+    """
+    Requests-per-minute and tokens-per-minute budgets for one provider model.
+    acquire(cost, lane) waits until both buckets can cover the call; waiters
+    are granted strictly by lane priority (LANES), FIFO within a lane.
+    Token costs are estimates: settle() corrects the bucket with the real usage,
+    refund() hands back a grant that was never used.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queues = {lane: deque() for lane in LANES}
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self.granted = {lane: 0 for lane in LANES}
+        self.wait_total_ms = {lane: 0.0 for lane in LANES}
+        self.wait_max_ms = {lane: 0.0 for lane in LANES}
+        self.timed_out = {lane: 0 for lane in LANES}
+
+    def set_limits(self, rpm: int, tpm: int) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        if self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    @property
+    def unlimited(self) -> bool:
+        return self.requests.unlimited and self.tokens.unlimited
+
+    def _clamp(self, cost: float) -> float:
+        # A single call larger than the whole minute budget would never be granted
+        return cost if self.tokens.unlimited else min(cost, self.tokens.per_minute)
+
+    async def acquire(self, cost: float, lane: str = "interactive", max_wait: float = 0) -> float:
+        """
+        Wait for budget for one call of about `cost` tokens; returns the wait in ms.
+        Raises asyncio.TimeoutError after `max_wait` seconds in the queue (0 = no limit).
+        """
+        lane = lane if lane in self._queues else LANES[-1]
+        start = time.monotonic()
+        if not self.unlimited:
+            self._ensure_dispatcher()
+            future = self._loop.create_future()
+            self._queues[lane].append((self._clamp(cost), future))
+            self._wake.set()
+            try:
+                # wait_for cancels the future on timeout, so the dispatcher skips it
+                await asyncio.wait_for(future, timeout=max_wait if max_wait > 0 else None)
+            except asyncio.TimeoutError:
+                self.timed_out[lane] += 1
+                raise
+        waited_ms = (time.monotonic() - start) * 1000.0
+        self.granted[lane] += 1
+        self.wait_total_ms[lane] += waited_ms
+        self.wait_max_ms[lane] = max(self.wait_max_ms[lane], waited_ms)
+        return waited_ms
+
+    def try_acquire(self, cost: float) -> bool:
+        """Take budget only if it is available now and nobody is queued (e.g. for a hedge)."""
+        if self.unlimited:
+            return True
+        cost = self._clamp(cost)
+        if any(self._depth(lane) for lane in LANES):
+            return False
+        if self.requests.wait_time(1) > 0 or self.tokens.wait_time(cost) > 0:
+            return False
+        self.requests.take(1)
+        self.tokens.take(cost)
+        return True
+
+    def refund(self, reserved: float) -> None:
+        """Hand back a grant from acquire/try_acquire whose call was never made."""
+        self.requests.give(1)
+        self.tokens.give(self._clamp(reserved))
+
+    def settle(self, reserved: float, actual) -> None:
+        """Adjust the token bucket by the difference between the estimate and the real usage."""
+        if actual is None:
+            return
+        self.tokens.give(self._clamp(reserved) - float(actual))
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._dispatch())
+
+    def _head(self):
+        for lane in LANES:
+            queue = self._queues[lane]
+            while queue and queue[0][1].done():
+                queue.popleft()  # caller gave up (timeout/disconnect)
+            if queue:
+                return queue
+        return None
+
+    async def _dispatch(self) -> None:
+        while True:
+            queue = self._head()
+            if queue is None:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            cost, future = queue[0]
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+            if delay <= 0:
+                queue.popleft()
+                self.requests.take(1)
+                self.tokens.take(cost)
+                future.set_result(None)
+                continue
+            # Sleep until budget refills, or re-check early when a new (maybe higher-priority) waiter arrives
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _depth(self, lane: str) -> int:
+        # list() copies in one step, so stats() is safe to call from another thread
+        return sum(1 for _, future in list(self._queues[lane]) if not future.done())
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.requests.per_minute,
+            "tpm": self.tokens.per_minute,
+            "lanes": {
+                lane: {
+                    "queue_depth": self._depth(lane),
+                    "granted": self.granted[lane],
+                    "avg_wait_ms": (self.wait_total_ms[lane] / self.granted[lane]) if self.granted[lane] else 0.0,
+                    "max_wait_ms": self.wait_max_ms[lane],
+                    "timed_out": self.timed_out[lane],
+                }
+                for lane in LANES
+            },
+        }
@@ -1,111 +1,444 @@
 import re
 import os
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+# Regex for standard email format (quantifiers bounded so a long run without "@" stays linear)
+EMAIL_PATTERN = r'\b([a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9.-]{1,253}\.[a-zA-Z]{2,24})\b'
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+_HEADER_LINE_RE = re.compile(r'^\s*(?:From|To|Cc|Bcc|Sent|Subject)\s*:', re.IGNORECASE)
+# Lines that start an older message in a reply chain; signatures never span them
+_BOUNDARY_LINE_RE = re.compile(
+    r'^\s*(?:(?:From|Sent)\s*:|-{2,}\s*(?:Original|Forwarded) Message|On\b.{0,200}\bwrote:\s*$)',
+    re.IGNORECASE,
+)
+_VALEDICTION_RE = re.compile(
+    r'^(?:thanks|thank you|regards|best|best regards|kind regards|warm regards|sincerely|cheers)\b[\w ]*[,!.]?$',
+    re.IGNORECASE,
+)
+_LICENSE_RE = re.compile(r'licen[sc]e|\blic\b\.?[ \t]*(?:#|no\b)', re.IGNORECASE)
+_DIGIT_RE = re.compile(r'\d')
+_PHONE_RE = re.compile(
+    r'(?<![\d-])(?:\+?1[ .-]?)?(?:\(\d{3}\)|\d{3})[ .-]?\d{3}[ .-]?\d{4}(?:[ \t]*(?:x|ext\.?)[ \t]*\d{1,6})?(?![\d-])',
+    re.IGNORECASE,
+)
+
+# USPS abbreviations (states, DC, territories, military) and full state names
+_STATE_ABBREVIATIONS = (
+    "AL AK AZ AR CA CO CT DE FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ "
+    "NM NY NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY DC PR GU VI AS MP AA AE AP"
+).split()
+_STATE_NAMES = (
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "Florida", "Georgia", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas", "Kentucky",
+    "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota", "Mississippi",
+    "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey", "New Mexico",
+    "New York", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon", "Pennsylvania",
+    "Rhode Island", "South Carolina", "South Dakota", "Tennessee", "Texas", "Utah", "Vermont",
+    "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming", "District of Columbia",
+    "Puerto Rico", "Guam",
+)
+# Abbreviations are matched in capitals only ("in", "or", "me" are words); names in any case
+_STATE = r'(?:{}|(?i:{}))'.format(
+    "|".join(_STATE_ABBREVIATIONS),
+    "|".join(sorted(_STATE_NAMES, key=len, reverse=True)),
+)
+# Addresses are anchored on ZIP codes and read backwards from there, so each
+# ZIP costs a fixed-size window and text without a ZIP costs one linear search
+_ZIP_RE = re.compile(r'(?<![\w-])\d{5}(?:-\d{4})?(?![\w-])')
+_STATE_TAIL_RE = re.compile(r'[ ,][ \t]*(?:' + _STATE + r')\.?,?[ \t]+$')
+_STREET_NUMBER_RE = re.compile(r'(?<![\w-])\d{1,6}[ \t]+[A-Za-z]')
+# A street line above a "City, ST 12345" line (two-line addresses)
+_STREET_LINE_RE = re.compile(r'^[ \t]*(\d{1,6}[ \t]+[A-Za-z][^\n|]{0,80}?)[ \t,]*$')
+_CITY_RE = re.compile(r'^[ \t]*[A-Za-z][^\d|]{0,60}$')
+_STATE_WINDOW = 40
+_STREET_WINDOW = 80
+
+# Rule-based name/brokerage extraction
+_NAME_RE = re.compile(
+    r"^[A-Z][A-Za-z'\u2019-]{1,20}(?:[ \t]+[A-Z]\.?)?(?:[ \t]+[A-Z][A-Za-z'\u2019-]{1,25}){1,2}$"
+)
+_BROKERAGE_RE = re.compile(
+    r'\b(?:Insurance|Insurers?|Agency|Agencies|Brokers?|Brokerage|Group|Risk|Underwriters|Underwriting|'
+    r'Partners|Associates|Services|Financial|Company|Co\.|LLC|L\.L\.C\.|Inc\.?|Corp\.?|Ltd\.?)(?![\w])'
+)
+_FIELD_SPLIT_RE = re.compile(r'[|,\u2022]')
+_WHOLESALE_RE = re.compile(r'wholesal', re.IGNORECASE)
+_FREE_MAIL_DOMAINS = {"gmail", "yahoo", "outlook", "hotmail", "aol", "icloud", "live", "msn", "protonmail", "me"}
+_NON_LETTERS_RE = re.compile(r'[^a-z]')
+
+# Per-field confidence for extract_broker_fields, one row per kind of evidence.
+# Each value is the lower 95% bound of the row's measured precision on the labelled corpus
+# (python -m benchmarks.bench_accuracy --extractors rules --count 1000 --sizes --calibrate);
+# re-run it after changing the rules rather than tuning values inline. The corpus is synthetic, so a
+# row backed by a single uncorroborated rule stays below FAST_PATH_THRESHOLD (0.9) until it has been
+# measured against LLM answers on real traffic.
+RULE_CONFIDENCE = {
+    "email_unique": 0.98,         # the only email across licensed signatures
+    "email_ambiguous": 0.65,      # several distinct emails in licensed signatures
+    "address_in_signature": 0.98, # address with ZIP in the signature paragraph, email unique
+    "address_ambiguous": 0.65,    # same, but several distinct emails in licensed signatures
+    "name_matches_email": 0.94,   # name line agreeing with the email's local part
+    "name_line": 0.85,            # plausible name line, no corroboration; uncalibrated on real traffic
+    "brokerage_matches_domain": 0.99,
+    "brokerage_keyword": 0.7,     # never seen in the corpus; uncalibrated prior
+    "wholesaler_cap": 0.0,        # wholesaler wording nearby: rules pick the wrong party, defer to the LLM
+}
+
+# Upper bound on scanned text; keeps worst-case time fixed for huge reply chains
+MAX_SCAN_CHARS = 200_000
+
+
+@dataclass
+class SignatureCandidate:
+    """A non-header line carrying an email, with the line window around it."""
+    anchor: int
+    email: str
+    start: int
+    end: int
+    licensed: bool
+
+
+@dataclass
+class ScanResult:
+    """Everything get_* needs, found in one pass over the lines of a blurb."""
+    lines: list
+    emails: list = field(default_factory=list)       # (line index, email), header lines excluded
+    phones: list = field(default_factory=list)       # (line index, phone)
+    addresses: list = field(default_factory=list)    # (line index, address)
+    candidates: list = field(default_factory=list)   # SignatureCandidate, top to bottom
+
+    def first_in(self, items, start, end):
+        """First (index, value) from a sorted list with start <= index <= end, else ""."""
+        pos = bisect_left(items, (start, ""))
+        if pos < len(items) and items[pos][0] <= end:
+            return items[pos][1]
+        return ""
+
+
+def _address_on(lines, idx):
+    """
+    First address ending on line idx: "<number> <street>[,] <state> <ZIP>",
+    or a street line above joined with a "City, ST 12345" line.
+    """
+    line = lines[idx]
+    floor = 0
+    for zip_match in _ZIP_RE.finditer(line):
+        zip_start = zip_match.start()
+        tail = _STATE_TAIL_RE.search(line, max(floor, zip_start - _STATE_WINDOW), zip_start)
+        if tail:
+            lo = max(floor, tail.start() - _STREET_WINDOW)
+            bar = line.rfind('|', lo, tail.start())  # "|" separates signature fields
+            street = _STREET_NUMBER_RE.search(line, lo if bar == -1 else bar + 1, tail.start())
+            if street:
+                return line[street.start():zip_match.end()].strip()
+            if idx > 0 and _CITY_RE.match(line, 0, tail.start()):
+                above = _STREET_LINE_RE.match(lines[idx - 1])
+                if above:
+                    return f"{above.group(1).strip()}, {line[:zip_match.end()].strip()}"
+        floor = zip_match.end()
+    return ""
+
+
+def scan_blurb(email_blurb, max_lines_before=8, max_lines_after=4, first_only=False):
+    """
+    Locate emails, phone numbers, addresses and signature candidates in one pass
+    
+    Strategy:
+    1. Walk the lines once (after capping the text at MAX_SCAN_CHARS); each
+       precompiled pattern runs at most once per line and has bounded repeats
+    2. Split at reply-chain boundaries ("From:", "-----Original Message-----",
+       "On ... wrote:"); signatures never span two messages
+    3. Every email on a non-header line is a signature candidate; its window spans
+       up to max_lines_before/max_lines_after lines inside the same message and
+       is "licensed" when a license line falls inside it
+    4. With first_only, stop after the first message holding a licensed candidate
+       (replies quote older messages below, so that is the sender's)
+    
+    :param email_blurb: Full email text
+    :return: ScanResult
+    """
+    text = (email_blurb or "")[:MAX_SCAN_CHARS]
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    result = ScanResult(lines=lines)
+    licenses = []
+    seg_start = 0
+    seg_emails = 0
+
+    def close_segment(seg_end):
+        # Candidates for the emails of lines[seg_start:seg_end + 1]
+        found = False
+        for idx, email in result.emails[seg_emails:]:
+            start = max(seg_start, idx - max_lines_before)
+            end = min(seg_end, idx + max_lines_after)
+            pos = bisect_left(licenses, start)
+            licensed = pos < len(licenses) and licenses[pos] <= end
+            result.candidates.append(SignatureCandidate(idx, email, start, end, licensed))
+            found = found or licensed
+        return found
+
+    for idx, line in enumerate(lines):
+        if _BOUNDARY_LINE_RE.match(line):
+            if close_segment(idx - 1) and first_only:
+                return result
+            seg_start, seg_emails = idx + 1, len(result.emails)
+            continue
+        if _LICENSE_RE.search(line):
+            licenses.append(idx)
+        if '@' in line and not _HEADER_LINE_RE.match(line):
+            for email in _EMAIL_RE.findall(line):
+                result.emails.append((idx, email))
+        if _DIGIT_RE.search(line):
+            for phone in _PHONE_RE.findall(line):
+                result.phones.append((idx, phone.strip()))
+            address = _address_on(lines, idx)
+            if address:
+                result.addresses.append((idx, address))
+    close_segment(len(lines) - 1)
+    return result
+
 
 def get_signature(email_blurb):
     """
     Extract the signature section from an email blurb
     
     Strategy:
-    1. Look for sections that contain both "License" and an email
-    2. Prioritize sections near the end of the email
-    3. Handle multiple possible signatures
+    1. Scan the blurb once (scan_blurb)
+    2. Take the first signature candidate whose window mentions a license;
+       replies quote older messages below, so the first one is the sender's
     
     :param email_blurb: Full email text
-    :return: Extracted signature section
-    """
-    # Split patterns that typically end an email body
-    split_patterns = [
-        r'((?:From:|Sent:).*)',  # Stop at next email header
-        r'(The contents of this email.*)',  # Stop at confidentiality notice
-        r'(Privacy Notice.*)'  # Stop at legal notices
-    ]
-    
-    # Clean up the blurb
-    cleaned_blurb = email_blurb.replace('\n', ' ')
-    
-    # Find signatures containing "License" with an email domain,
-    # limiting to <=200 chars before and after "License", and requiring ".com" (case-sensitive)
-    chunk_size = 1500
-    selected_signature = ""
-    for i in range(0, len(cleaned_blurb), chunk_size):
-        chunk = cleaned_blurb[i:i+chunk_size]
-        if (("license" in chunk) or ("License" in chunk)) and (".com" in chunk):
-            selected_signature = chunk.strip()
-            break
-    
-    # If no signatures found, return empty string
-    if not selected_signature:
+    :return: Extracted signature section (lines joined by newlines), or ""
+    """
+    scan = scan_blurb(email_blurb, first_only=True)
+    candidate = next((c for c in scan.candidates if c.licensed), None)
+    if candidate is None:
         return ""
+    return '\n'.join(line.strip() for line in scan.lines[candidate.start:candidate.end + 1] if line.strip())
+
+def signature_paragraph(scan, candidate):
+    """(start, end) of the contiguous non-blank lines around a candidate's email, within its window."""
+    lines = scan.lines
+    start = candidate.anchor
+    while start > candidate.start and lines[start - 1].strip():
+        start -= 1
+    end = candidate.anchor
+    while end < candidate.end and lines[end + 1].strip():
+        end += 1
+    return start, end
+
+def get_signature_block(email_blurb, max_lines_before=8, max_lines_after=4):
+    """
+    Extract a compact, body-independent signature block for caching
+    
+    Strategy:
+    1. Scan the blurb once and keep the licensed signature candidates
+    2. Refuse ambiguous blurbs: zero or several distinct email addresses
+       across those candidates
+    3. Return the contiguous lines around that email in the original text
     
-    # Return the last (most likely) signature
-    return selected_signature
+    :param email_blurb: Full email text
+    :return: Signature block (lines joined by newlines), or "" when ambiguous
+    """
+    scan = scan_blurb(email_blurb, max_lines_before, max_lines_after)
+    licensed = [c for c in scan.candidates if c.licensed]
+    emails = set()
+    for candidate in licensed:
+        emails.update(e.lower() for _, e in scan.emails[
+            bisect_left(scan.emails, (candidate.start, "")):bisect_left(scan.emails, (candidate.end + 1, ""))
+        ])
+    if len(emails) != 1:
+        return ""
+
+    start, end = signature_paragraph(scan, licensed[0])
+    block = [line.strip() for line in scan.lines[start:end + 1] if line.strip()]
+    # Sign-offs vary between replies; they are not part of the signature itself
+    while block and _VALEDICTION_RE.match(block[0]):
+        block.pop(0)
+    return '\n'.join(block)
 
 def get_email(signature):
     """
     Extract email from a signature
     
     Strategy:
-    1. Use regex to find standard email format
+    1. Use the precompiled email pattern
     2. Return the first match
     
     :param signature: Signature text
     :return: Extracted email address
     """
-    # Regex for standard email format
-    email_pattern = r'\b([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})\b'
-    
-    # Find emails
-    emails = re.findall(email_pattern, signature, re.IGNORECASE)
+    match = _EMAIL_RE.search(signature or "")
+    return match.group(1) if match else ""
+
+def get_phone(signature):
+    """
+    Extract a US phone number from a signature
     
-    # Return first email found
-    return emails[0] if emails else ""
+    :param signature: Signature text
+    :return: First phone number found, or ""
+    """
+    match = _PHONE_RE.search(signature or "")
+    return match.group(0).strip() if match else ""
 
 def get_address(signature):
     """
     Extract address from a signature
     
     Strategy:
-    1. Look for pattern starting with number
-    2. Contain "CA" 
-    3. End with a 5-digit ZIP code
-    4. Limit to 10 words
+    1. Look for a line starting with a street number and ending in
+       "<state> <ZIP or ZIP+4>" (any US state, abbreviated or spelled out)
+    2. Otherwise join a street line with a following "City, ST 12345" line
+    3. Return the first address found
     
     :param signature: Signature text
     :return: Extracted address
     """
-    # Regex for address pattern
-    # Starts with number, contains CA, optional zip code, max 10 words
-    address_pattern = r'(\d+[^0-9\n]*(?:CA|WA)\s+\d{5}(?:\-\d{4})?)'
-    
-    # Find addresses
-    addresses = re.findall(address_pattern, signature, re.IGNORECASE)
-    
-    # Return first address found
-    return addresses[0].strip() if addresses else ""
+    lines = (signature or "")[:MAX_SCAN_CHARS].replace('\r\n', '\n').split('\n')
+    for idx in range(len(lines)):
+        address = _address_on(lines, idx)
+        if address:
+            return address
+    return ""
 
 def get_broker_info(email_blurb):
     """
     Extract broker information from an email blurb
     
     Strategy:
-    1. Get signature
-    2. Extract email from signature
-    3. Extract address from signature
+    1. Scan the blurb once
+    2. Take the first licensed signature candidate
+    3. Use its email plus the first address/phone inside its window
     
     :param email_blurb: Full email text
-    :return: Dictionary with broker_name, broker_email, and complete_address
+    :return: Dictionary with broker_email, broker_phone and complete_address
     """
-    # Get signature
-    signature = get_signature(email_blurb)
+    scan = scan_blurb(email_blurb, first_only=True)
+    candidate = next((c for c in scan.candidates if c.licensed), None)
+    if candidate is None:
+        return {"broker_email": "", "broker_phone": "", "complete_address": ""}
+
+    return {
+        "broker_email": candidate.email,
+        "broker_phone": scan.first_in(scan.phones, candidate.start, candidate.end),
+        "complete_address": scan.first_in(scan.addresses, candidate.start, candidate.end),
+    }
+
+def _name_matches_email(name, local):
+    """True when the email's local part spells the name (harry.smith, hsmith, smithh, harrys)."""
+    parts = [p.lower() for p in name.replace('.', ' ').split() if len(p) > 1]
+    if len(parts) < 2:
+        return False
+    first, last = _NON_LETTERS_RE.sub('', parts[0]), _NON_LETTERS_RE.sub('', parts[-1])
+    local = _NON_LETTERS_RE.sub('', local.lower())
+    if not first or not last:
+        return False
+    if last in local:
+        return first in local or local.startswith(first[0]) or local.endswith(first[0])
+    return first in local and (local.startswith(last[0]) or local.endswith(last[0]))
+
+def _brokerage_matches_domain(brokerage, domain):
+    """True when the email domain spells the brokerage (abcinsurance.com / abc.com for "ABC Insurance")."""
+    label = _NON_LETTERS_RE.sub('', domain.lower().split('.')[0])
+    if len(label) < 3 or label in _FREE_MAIL_DOMAINS:
+        return False
+    compact = _NON_LETTERS_RE.sub('', brokerage.lower())
+    return compact.startswith(label) or label.startswith(compact[:max(3, len(label) // 2)])
+
+def extract_broker_fields(email_blurb):
+    """
+    Rule-based extraction of all four broker fields with per-field confidence
+    (see explain_broker_fields)
+    
+    :param email_blurb: Full email text
+    :return: Dictionary shaped like the agent output (fields + *_confidence)
+    """
+    return explain_broker_fields(email_blurb)[0]
+
+def explain_broker_fields(email_blurb):
+    """
+    Rule-based extraction of all four broker fields with per-field confidence
     
-    # Extract broker info
-    broker_email = get_email(signature)
-    complete_address = get_address(signature)
+    Strategy:
+    1. Scan the blurb and take the first licensed signature candidate
+    2. Email: the candidate's email (confident only when it is the only
+       email across licensed signatures)
+    3. Name: a capitalized 2-3 word line in the signature, confident when it
+       matches the email's local part
+    4. Brokerage: a line with company wording, confident when it matches the
+       email domain
+    5. Address: first address inside the signature paragraph
+    Each confidence is the RULE_CONFIDENCE row for the evidence found.
     
-    return {
-        "broker_email": broker_email,
-        "complete_address": complete_address
+    :param email_blurb: Full email text
+    :return: (fields dict shaped like the agent output, {field: RULE_CONFIDENCE row})
+    """
+    fields = {
+        "broker_name": "", "broker_name_confidence": 0.0,
+        "broker_email": "", "broker_email_confidence": 0.0,
+        "brokerage": "", "brokerage_confidence": 0.0,
+        "complete_address": "", "complete_address_confidence": 0.0,
     }
+    evidence = {}
+    scan = scan_blurb(email_blurb)
+    licensed = [c for c in scan.candidates if c.licensed]
+    if not licensed:
+        return fields, evidence
+    candidate = licensed[0]
+    email = candidate.email
+    local, _, domain = email.partition('@')
+    distinct = {c.email.lower() for c in licensed}
+    unique = len(distinct) == 1
+    fields["broker_email"] = email
+    evidence["broker_email"] = "email_unique" if unique else "email_ambiguous"
+
+    # Only the sender's own signature paragraph: the wider window can reach a colleague's signature
+    start, end = signature_paragraph(scan, candidate)
+    address = scan.first_in(scan.addresses, start, end)
+    if address:
+        fields["complete_address"] = address
+        # With several licensed emails the paragraph may be a colleague's, so the address may be too
+        evidence["complete_address"] = "address_in_signature" if unique else "address_ambiguous"
+
+    names = []
+    companies = []
+    for line in scan.lines[start:end + 1]:
+        line = line.strip()
+        if not line or '@' in line or _VALEDICTION_RE.match(line):
+            continue
+        # "Harry Smith, AINS" / "Susan Miller | Lic #0K1234": the name is the first field
+        head = _FIELD_SPLIT_RE.split(line, maxsplit=1)[0].strip()
+        if _BROKERAGE_RE.search(head):
+            if not _DIGIT_RE.search(head):
+                companies.append(head)
+        elif _NAME_RE.match(head):
+            names.append(head)
+
+    matched = next((n for n in names if _name_matches_email(n, local)), None)
+    if matched:
+        fields["broker_name"] = matched
+        evidence["broker_name"] = "name_matches_email"
+    elif names:
+        fields["broker_name"] = names[0]
+        evidence["broker_name"] = "name_line"
+
+    matched = next((c for c in companies if _brokerage_matches_domain(c, domain)), None)
+    if matched:
+        fields["brokerage"] = matched
+        evidence["brokerage"] = "brokerage_matches_domain"
+    elif companies:
+        fields["brokerage"] = companies[0]
+        evidence["brokerage"] = "brokerage_keyword"
+
+    # The prompt prefers the insurance broker over a wholesaler; rules can't tell them apart
+    window = "\n".join(scan.lines[start:end + 1])
+    if _WHOLESALE_RE.search(window):
+        for key in ("broker_name", "brokerage"):
+            if key in evidence and RULE_CONFIDENCE["wholesaler_cap"] < RULE_CONFIDENCE[evidence[key]]:
+                evidence[key] = "wholesaler_cap"
+    for key, row in evidence.items():
+        fields[f"{key}_confidence"] = RULE_CONFIDENCE[row]
+    return fields, evidence
 
 # Demonstration
 def demonstrate_extraction():
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class LLMUnavailableError(RuntimeError):
+    """The LLM could not answer (deadline exceeded, provider error, or circuit open)."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class LatencyWindow:
+    """Recent latencies (ms) for percentile-based hedge delays."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, latency_ms: float) -> None:
+        with self._lock:
+            self._samples.append(latency_ms)
+
+    def percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """q-th percentile (0-100) of the window, or None until min_samples are seen."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker. Closed: calls pass. After `failure_threshold`
+    failures in a row it opens and rejects calls for `cooldown_seconds`, then
+    half-opens and lets a single probe through; the probe's outcome closes or
+    re-opens it. Every call admitted by allow() must end in record_success,
+    record_failure or release.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = "half_open"
+            self._probe_inflight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go to the provider now (counts a rejection otherwise)."""
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._probe_inflight = False
+            self.consecutive_failures = 0
+
+    def release(self) -> None:
+        """
+        A call admitted by allow() ended without an outcome (cancelled): free the
+        half-open probe slot so the next call can probe instead of waiting forever.
+        """
+        with self._lock:
+            if self._state == "half_open":
+                self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._state == "half_open" or (
+                self._state == "closed" and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_inflight = False
+                self.times_opened += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class Hedger:
+    """
+    Hedged requests: if the first attempt hasn't finished after `delay` seconds,
+    start an identical second one and take whichever finishes first (the other
+    is cancelled). A failed attempt defers to the other one still running.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    async def call(self, make_call, delay: Optional[float] = None, may_hedge=None):
+        """
+        Await make_call() (a coroutine factory), hedging after `delay` seconds when set.
+        may_hedge(): optional check at hedge time (e.g. rate-limit budget); False skips the duplicate.
+        """
+        with self._lock:
+            self.calls += 1
+        first = asyncio.ensure_future(make_call())
+        if delay is None:
+            return await first
+        second = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done:
+                return first.result()
+            if may_hedge is not None and not may_hedge():
+                return await first
+            with self._lock:
+                self.hedged += 1
+            second = asyncio.ensure_future(make_call())
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (first, second):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_win_rate": (self.hedge_wins / self.hedged) if self.hedged else 0.0,
+            }
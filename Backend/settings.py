@@ -0,0 +1,257 @@
+import os
+import signal
+import threading
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+ENV_PATH = os.path.join(os.path.dirname(__file__), ".env")
+
+
+def _int(env, name: str, default: int) -> int:
+    return int(env.get(name) or default)
+
+
+def _float(env, name: str, default: float) -> float:
+    return float(env.get(name) or default)
+
+
+def _bool(env, name: str, default: bool) -> bool:
+    value = env.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class WriterSettings:
+    """Background writer limits (see mongo_writer.BufferedWriter)."""
+    max_queue: int = 10000
+    batch_size: int = 500
+    flush_interval: float = 1.0
+    drop_policy: str = "drop_newest"
+
+    @classmethod
+    def from_env(cls, env, prefix: str) -> "WriterSettings":
+        return cls(
+            max_queue=_int(env, f"{prefix}_MAX_QUEUE", 10000),
+            batch_size=_int(env, f"{prefix}_BATCH_SIZE", 500),
+            flush_interval=_float(env, f"{prefix}_FLUSH_INTERVAL", 1.0),
+            drop_policy=env.get(f"{prefix}_DROP_POLICY") or "drop_newest",
+        )
+
+
+@dataclass(frozen=True)
+class CascadeThresholds:
+    """Minimum small-model confidence per field; any field below it escalates to the large model."""
+    name: float = 0.8
+    email: float = 0.8
+    brokerage: float = 0.8
+    address: float = 0.8
+
+    @classmethod
+    def from_env(cls, env, prefix: str) -> "CascadeThresholds":
+        base = _float(env, prefix, 0.8)
+        return cls(**{f: _float(env, f"{prefix}_{f.upper()}", base) for f in ("name", "email", "brokerage", "address")})
+
+    def as_list(self):
+        """Thresholds in the agent's confidence order (name, email, brokerage, address)."""
+        return [self.name, self.email, self.brokerage, self.address]
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed view of Backend/.env and the process environment.
+    Built once (get_settings) and swapped atomically on reload_settings,
+    so request handlers read plain attributes instead of parsing env vars.
+    """
+    # Mongo
+    mongo_uri: str = ""
+    mongo_max_pool_size: int = 50
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int = 300000
+    mongo_connect_timeout_ms: int = 5000
+    mongo_server_selection_timeout_ms: int = 5000
+    mongo_socket_timeout_ms: int = 10000
+    mongo_wait_queue_timeout_ms: int = 5000
+    mongo_executor_workers: int = 32
+    # Encryption
+    encryption_on: bool = False
+    hash_secret_key: str = ""
+    blind_index_key: str = ""
+    # Cache tiers
+    l1_cache_max_entries: int = 10000
+    l1_cache_ttl_seconds: float = 3600.0
+    near_dup_enabled: bool = True
+    near_dup_threshold: float = 0.9
+    near_dup_max_chars: int = 8192
+    signature_cache_min_confidence: float = 0.8
+    # Rule-based fast path (skips the LLM when every field is confident)
+    fast_path_enabled: bool = True
+    fast_path_threshold: float = 0.9
+    # Reply-chain canonicalization (cache keys and LLM input)
+    thread_normalize_enabled: bool = True
+    # Prompt compression (signature-focused LLM input)
+    prompt_compression_enabled: bool = True
+    prompt_token_budget: int = 600
+    prompt_compress_min_tokens: int = 300
+    # Batch / ingest
+    batch_max_items: int = 1000
+    batch_llm_concurrency: int = 4
+    ingest_concurrency: int = 8
+    # Background writers
+    log_writer: WriterSettings = field(default_factory=WriterSettings)
+    metrics_writer: WriterSettings = field(default_factory=WriterSettings)
+    # Per-stage request timing (Server-Timing header, Logging document)
+    timing_sample_rate: float = 1.0
+    timing_slow_ms: float = 1000.0
+    server_timing_enabled: bool = True
+    # LLM
+    groq_api_key: str = ""
+    groq_model: str = "llama-3.3-70b-versatile"
+    llm_json_mode: bool = True
+    llm_repair_retries: int = 1
+    llm_max_output_tokens: int = 256
+    # Model cascade (small model first, large model on low confidence / complex input)
+    cascade_enabled: bool = True
+    groq_small_model: str = "llama-3.1-8b-instant"
+    cascade_min_confidence: CascadeThresholds = field(default_factory=CascadeThresholds)
+    cascade_complex_tokens: int = 400
+    cascade_complex_signatures: int = 2
+    # LLM call deadline, hedging and circuit breaker
+    llm_timeout_seconds: float = 15.0
+    llm_hedge_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_min_samples: int = 20
+    llm_breaker_failures: int = 5
+    llm_breaker_cooldown_seconds: float = 30.0
+    # Provider rate limits per model (0 = unlimited)
+    llm_rpm: int = 0
+    llm_tpm: int = 0
+    llm_small_rpm: int = 0
+    llm_small_tpm: int = 0
+    # Longest a call may wait for rate-limit budget before failing (seconds, 0 = no limit)
+    llm_queue_max_wait_interactive_seconds: float = 2.0
+    llm_queue_max_wait_bulk_seconds: float = 60.0
+    agent_warmup: bool = True
+
+    @classmethod
+    def from_env(cls, env=None) -> "Settings":
+        env = os.environ if env is None else env
+        return cls(
+            mongo_uri=env.get("Mongo_DB_URI", ""),
+            mongo_max_pool_size=_int(env, "MONGO_MAX_POOL_SIZE", 50),
+            mongo_min_pool_size=_int(env, "MONGO_MIN_POOL_SIZE", 0),
+            mongo_max_idle_time_ms=_int(env, "MONGO_MAX_IDLE_TIME_MS", 300000),
+            mongo_connect_timeout_ms=_int(env, "MONGO_CONNECT_TIMEOUT_MS", 5000),
+            mongo_server_selection_timeout_ms=_int(env, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+            mongo_socket_timeout_ms=_int(env, "MONGO_SOCKET_TIMEOUT_MS", 10000),
+            mongo_wait_queue_timeout_ms=_int(env, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+            mongo_executor_workers=_int(env, "MONGO_EXECUTOR_WORKERS", 32),
+            encryption_on=_bool(env, "ENCRYPTION_ON", False),
+            hash_secret_key=env.get("HASH_SECRET_KEY", ""),
+            blind_index_key=env.get("BLIND_INDEX_KEY", ""),
+            l1_cache_max_entries=_int(env, "L1_CACHE_MAX_ENTRIES", 10000),
+            l1_cache_ttl_seconds=_float(env, "L1_CACHE_TTL_SECONDS", 3600.0),
+            near_dup_enabled=_bool(env, "NEAR_DUP_ENABLED", True),
+            near_dup_threshold=_float(env, "NEAR_DUP_THRESHOLD", 0.9),
+            near_dup_max_chars=_int(env, "NEAR_DUP_MAX_CHARS", 8192),
+            signature_cache_min_confidence=_float(env, "SIGNATURE_CACHE_MIN_CONFIDENCE", 0.8),
+            fast_path_enabled=_bool(env, "FAST_PATH_ENABLED", True),
+            fast_path_threshold=_float(env, "FAST_PATH_THRESHOLD", 0.9),
+            thread_normalize_enabled=_bool(env, "THREAD_NORMALIZE_ENABLED", True),
+            prompt_compression_enabled=_bool(env, "PROMPT_COMPRESSION_ENABLED", True),
+            prompt_token_budget=_int(env, "PROMPT_TOKEN_BUDGET", 600),
+            prompt_compress_min_tokens=_int(env, "PROMPT_COMPRESS_MIN_TOKENS", 300),
+            batch_max_items=_int(env, "BATCH_MAX_ITEMS", 1000),
+            batch_llm_concurrency=_int(env, "BATCH_LLM_CONCURRENCY", 4),
+            ingest_concurrency=_int(env, "INGEST_CONCURRENCY", 8),
+            log_writer=WriterSettings.from_env(env, "LOG_WRITER"),
+            metrics_writer=WriterSettings.from_env(env, "METRICS_WRITER"),
+            timing_sample_rate=_float(env, "TIMING_SAMPLE_RATE", 1.0),
+            timing_slow_ms=_float(env, "TIMING_SLOW_MS", 1000.0),
+            server_timing_enabled=_bool(env, "SERVER_TIMING_ENABLED", True),
+            groq_api_key=env.get("GROQ_API_KEY", ""),
+            groq_model=env.get("GROQ_MODEL") or "llama-3.3-70b-versatile",
+            llm_json_mode=_bool(env, "LLM_JSON_MODE", True),
+            llm_repair_retries=_int(env, "LLM_REPAIR_RETRIES", 1),
+            llm_max_output_tokens=_int(env, "LLM_MAX_OUTPUT_TOKENS", 256),
+            cascade_enabled=_bool(env, "CASCADE_ENABLED", True),
+            groq_small_model=env.get("GROQ_SMALL_MODEL") or "llama-3.1-8b-instant",
+            cascade_min_confidence=CascadeThresholds.from_env(env, "CASCADE_MIN_CONFIDENCE"),
+            cascade_complex_tokens=_int(env, "CASCADE_COMPLEX_TOKENS", 400),
+            cascade_complex_signatures=_int(env, "CASCADE_COMPLEX_SIGNATURES", 2),
+            llm_timeout_seconds=_float(env, "LLM_TIMEOUT_SECONDS", 15.0),
+            llm_hedge_enabled=_bool(env, "LLM_HEDGE_ENABLED", False),
+            llm_hedge_percentile=_float(env, "LLM_HEDGE_PERCENTILE", 95.0),
+            llm_hedge_min_samples=_int(env, "LLM_HEDGE_MIN_SAMPLES", 20),
+            llm_breaker_failures=_int(env, "LLM_BREAKER_FAILURES", 5),
+            llm_breaker_cooldown_seconds=_float(env, "LLM_BREAKER_COOLDOWN_SECONDS", 30.0),
+            llm_rpm=_int(env, "LLM_RPM", 0),
+            llm_tpm=_int(env, "LLM_TPM", 0),
+            llm_small_rpm=_int(env, "LLM_SMALL_RPM", 0),
+            llm_small_tpm=_int(env, "LLM_SMALL_TPM", 0),
+            llm_queue_max_wait_interactive_seconds=_float(env, "LLM_QUEUE_MAX_WAIT_INTERACTIVE_SECONDS", 2.0),
+            llm_queue_max_wait_bulk_seconds=_float(env, "LLM_QUEUE_MAX_WAIT_BULK_SECONDS", 60.0),
+            agent_warmup=_bool(env, "AGENT_WARMUP", True),
+        )
+
+
+_settings = None
+_settings_lock = threading.Lock()
+_listeners = []
+
+
+def _load() -> Settings:
+    # .env values win over inherited environment, as before
+    load_dotenv(dotenv_path=ENV_PATH, override=True)
+    return Settings.from_env()
+
+
+def get_settings() -> Settings:
+    """Process-wide settings; Backend/.env is parsed once, on first use."""
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = _load()
+    return _settings
+
+
+def on_reload(callback) -> None:
+    """Register callback(new_settings) to run after reload_settings (e.g. to drop derived state)."""
+    _listeners.append(callback)
+
+
+def reload_settings() -> Settings:
+    """Re-read Backend/.env and swap in a new Settings object."""
+    global _settings
+    with _settings_lock:
+        _settings = _load()
+        current = _settings
+    for callback in list(_listeners):
+        try:
+            callback(current)
+        except Exception as e:
+            print(f"Settings reload hook failed: {e}")
+    print("Settings reloaded")
+    return current
+
+
+def install_reload_handler(loop) -> bool:
+    """Reload settings on SIGHUP (`kill -HUP <pid>`). Returns False where unsupported."""
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        loop.add_signal_handler(signal.SIGHUP, reload_settings)
+    except (NotImplementedError, RuntimeError, ValueError):
+        return False
+    return True
+
+
+def remove_reload_handler(loop) -> None:
+    if hasattr(signal, "SIGHUP"):
+        try:
+            loop.remove_signal_handler(signal.SIGHUP)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass
@@ -0,0 +1,50 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key: the first caller runs the
+    work, later callers await the same result. The entry is dropped as soon
+    as the work finishes, so a failure is delivered to the callers that were
+    waiting on it but is never remembered for the next request.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Task
+        self.leaders = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key, fn):
+        """
+        Run `await fn()` once per key among concurrent callers.
+        Returns (result, shared): shared is True for callers that joined
+        another caller's in-flight work instead of doing it themselves.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        # Shield so one cancelled caller (client disconnect) doesn't cancel the others
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key, task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
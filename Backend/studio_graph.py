@@ -0,0 +1,39 @@
+"""
+LangGraph graph for LangGraph/LangSmith Studio (see langgraph.json).
+Kept out of email_parser_agent.py so the API process never imports
+LangGraph or compiles this graph.
+"""
+from typing import TypedDict
+from langgraph.graph import StateGraph, START, END
+from email_parser_agent import EmailAgentRequest, get_agent
+
+
+# Input-only state for LangGraph Dev UI
+class EmailState(TypedDict):
+    email_blurb: str
+
+async def parse_node(state: EmailState) -> dict:
+    try:
+        req = EmailAgentRequest(email_blurb=state["email_blurb"])
+        res = await get_agent().parse(req)
+        return {
+            "broker_name": res.broker_name,
+            "broker_name_confidence": res.broker_name_confidence,
+            "broker_email": res.broker_email,
+            "broker_email_confidence": res.broker_email_confidence,
+            "brokerage": res.brokerage,
+            "brokerage_confidence": res.brokerage_confidence,
+            "complete_address": res.complete_address,
+            "complete_address_confidence": res.complete_address_confidence,
+            "tokens_used": res.tokens_used,
+            "parse_ok": res.parse_ok,
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+builder = StateGraph(EmailState)
+builder.add_node("parse", parse_node)
+builder.add_edge(START, "parse")
+builder.add_edge("parse", END)
+
+graph = builder.compile()
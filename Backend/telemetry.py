@@ -0,0 +1,281 @@
+import bisect
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Upper bounds (ms) of the latency buckets; fixed so histograms from any process can be summed
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge:
+    """Value read at scrape time from `read()`: a number, or {label values tuple: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._read = read
+
+    def samples(self):
+        try:
+            value = self._read()
+        except Exception as e:
+            print(f"Gauge {self.name} failed: {e}")
+            return []
+        if isinstance(value, dict):
+            return [(self.name, tuple(str(v) for v in key), float(v)) for key, v in sorted(value.items())]
+        return [(self.name, (), float(value))]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram per label set (Prometheus semantics: cumulative
+    `le` buckets plus _sum and _count). Percentiles are estimated from the
+    buckets, interpolating linearly inside the bucket that holds the rank,
+    and capped at the largest value observed.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS_MS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}  # label values -> [bucket counts..., +Inf count, sum, max]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0.0]
+            series[idx] += 1
+            series[-2] += value
+            series[-1] = max(series[-1], value)
+
+    def _snapshot(self):
+        with self._lock:
+            return {key: list(series) for key, series in sorted(self._series.items())}
+
+    def _quantile(self, q: float, series) -> Optional[float]:
+        counts, largest = series[:-2], series[-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q / 100.0 * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if i == len(self.buckets):
+                    return largest  # beyond the last bound
+                lower = self.buckets[i - 1] if i else 0.0
+                return min(largest, lower + (self.buckets[i] - lower) * (rank - seen) / count)
+            seen += count
+        return largest
+
+    def percentile(self, q: float, **labels) -> Optional[float]:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        series = self._snapshot().get(key)
+        return self._quantile(q, series) if series else None
+
+    def summary(self, quantiles=(50, 95, 99)) -> list:
+        """One row per label set: labels, count, mean and estimated percentiles."""
+        rows = []
+        for key, series in self._snapshot().items():
+            total = sum(series[:-2])
+            row = dict(zip(self.labelnames, key))
+            row.update(count=total, mean=(series[-2] / total) if total else 0.0, max=series[-1])
+            for q in quantiles:
+                row[f"p{q}"] = self._quantile(q, series)
+            rows.append(row)
+        return rows
+
+    def samples(self):
+        out = []
+        for key, series in self._snapshot().items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-2]):
+                cumulative += count
+                out.append((f"{self.name}_bucket", key, cumulative, f'le="{_number(bound)}"'))
+            out.append((f"{self.name}_sum", key, series[-2]))
+            out.append((f"{self.name}_count", key, cumulative))
+        return out
+
+
+class Registry:
+    """In-process metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics = []
+
+    def _add(self, metric):
+        metric.name = self.prefix + metric.name
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, read, labelnames=()) -> Gauge:
+        return self._add(Gauge(name, help, read, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS_MS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else ""
+                lines.append(f"{name}{_labels_text(metric.labelnames, key, extra)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Wall time (ms) for one request: per stage (the histogram categories) and per
+    span (finer names like "cache.exact" or "agent.parse" for Server-Timing and the
+    Logging document). Repeated names accumulate.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.spans: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str, span: Optional[str] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - start) * 1000.0
+            self.add({name: ms})
+            if span:
+                self.add_spans({span: ms})
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_spans({name: (time.perf_counter() - start) * 1000.0})
+
+    def add(self, stages) -> None:
+        for name, ms in (stages or {}).items():
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def add_spans(self, spans) -> None:
+        for name, ms in (spans or {}).items():
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+
+def keep_spans(total_ms: float, sample_rate: float, slow_ms: float) -> bool:
+    """Whether a request's spans are reported: always when slow, otherwise with probability sample_rate."""
+    if slow_ms > 0 and total_ms >= slow_ms:
+        return True
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+def server_timing(spans, total_ms: float) -> str:
+    """Server-Timing header value, e.g. 'cache.exact;dur=0.41, agent.parse;dur=812.3, total;dur=815.2'."""
+    parts = [f"{name};dur={ms:.2f}" for name, ms in spans.items()]
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
+
+
+registry = Registry(prefix="mailmorph_")
+requests_total = registry.counter(
+    "requests_total", "Extraction requests (batch items count individually) by route, source and cache-hit status.",
+    ("route", "source", "cache_hit"),
+)
+request_errors_total = registry.counter("request_errors_total", "Extraction requests that failed.", ("route",))
+tokens_total = registry.counter("llm_tokens_total", "LLM tokens used, by model tier.", ("tier",))
+stage_latency = registry.histogram(
+    "stage_latency_ms", "Time per request stage in milliseconds (stage=total is the whole request).",
+    ("route", "stage", "cache_hit"),
+)
+
+
+def record_request(route: str, source: str, cache_hit: bool, total_ms: float, stages=None, trace=None) -> None:
+    """Count one extraction and observe its total and per-stage times."""
+    hit = "true" if cache_hit else "false"
+    requests_total.inc(route=route, source=source, cache_hit=hit)
+    stage_latency.observe(total_ms, route=route, stage="total", cache_hit=hit)
+    for stage, ms in (stages or {}).items():
+        stage_latency.observe(ms, route=route, stage=stage, cache_hit=hit)
+    for tier in ("small", "large"):
+        tokens = (trace or {}).get(f"{tier}_tokens") or 0
+        if tokens:
+            tokens_total.inc(tokens, tier=tier)
+
+
+def latency_summary() -> list:
+    """Histogram-based count/mean/p50/p95/p99 per route, stage and cache-hit status."""
+    return stage_latency.summary()
+
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    for _ in range(1000):
+        hit = rng.random() < 0.6
+        timer = StageTimer()
+        timer.add({"cache": rng.uniform(0.2, 3.0)})
+        if not hit:
+            timer.add({"llm": rng.lognormvariate(math.log(400), 0.5), "storage": rng.uniform(1, 8)})
+        total = sum(timer.stages.values()) + 0.3
+        record_request("extract", "exact" if hit else "llm", hit, total, timer.stages, {"large_tokens": 0 if hit else 900})
+    print(registry.render()[:1500])
+    for row in latency_summary():
+        print(row)
@@ -0,0 +1,46 @@
+"""
+Shared fixtures. The app runs against benchmarks.inmemory_mongo and the fake
+chat model from benchmarks.bench_load, so the suite needs no Mongo, Groq key
+or network. Run from Backend/:
+    python -m pytest -q tests
+"""
+import dataclasses
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import settings
+
+# Before importing main: module-level objects (breaker, limiters) read settings at import
+settings._settings = dataclasses.replace(
+    settings.get_settings(), groq_api_key="test-key", agent_warmup=False, encryption_on=False,
+)
+
+
+@pytest.fixture
+def fake_mongo():
+    """A fresh in-memory Mongo per test, with the in-process cache tiers emptied."""
+    import mongo_client
+    from benchmarks.inmemory_mongo import InMemoryMongoClient
+    from l1_cache import l1_cache
+    from mongo_caching import near_dup_index
+    client = InMemoryMongoClient()
+    mongo_client._client = client  # init_client() keeps an existing client
+    l1_cache.clear()
+    near_dup_index.clear()
+    yield client
+    mongo_client._client = None
+
+
+@pytest.fixture
+def fake_model(fake_mongo):
+    """The agent's chat model (both tiers) replaced by the benchmark fake."""
+    from benchmarks.bench_load import FakeChatModel, parse_latency
+    from email_parser_agent import get_agent
+    model = FakeChatModel(parse_latency("fixed:0"))
+    for tier in get_agent().tiers.values():
+        tier.chain = tier.repair_chain = model
+    return model
@@ -0,0 +1,24 @@
+import random
+
+from benchmarks.bench_regex import make_message
+
+
+def test_empty_tables_clears_every_cache_tier(fake_mongo):
+    from clear_history import empty_tables
+    from mongo_caching import cache_hit, cache_insert, near_duplicate_hit, signature_cache_hit, signature_cache_insert
+    text, email, address = make_message(random.Random(4), 4)
+    fields = dict(
+        broker_name="Broker4 Person", broker_email=email, brokerage="Agency 4 Insurance", complete_address=address,
+        broker_name_confidence=0.95, broker_email_confidence=0.95,
+        brokerage_confidence=0.95, complete_address_confidence=0.95,
+    )
+    cache_insert(email_blurb=text, **fields)
+    assert signature_cache_insert(text, **fields)
+    other_body = text.replace("Hi team,", "Hello again,")
+    assert cache_hit(text) and signature_cache_hit(other_body)
+
+    empty_tables()
+
+    assert not cache_hit(text)
+    assert not near_duplicate_hit(text)
+    assert not signature_cache_hit(other_body)
@@ -0,0 +1,37 @@
+import asyncio
+import dataclasses
+import random
+
+import httpx
+
+import settings
+from benchmarks.bench_regex import make_message
+
+
+def _post_extract(text):
+    import main
+
+    async def go():
+        async with main.lifespan(main.app):
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/extract", json={"text": text})
+
+    return asyncio.run(go())
+
+
+def test_extract_sets_server_timing(fake_model):
+    text, email, _ = make_message(random.Random(1), 1)
+    response = _post_extract(text)
+    assert response.status_code == 200
+    assert response.json()["broker_email"] == email
+    timing = response.headers["Server-Timing"]
+    assert "cache.exact;dur=" in timing and timing.split(", ")[-1].startswith("total;dur=")
+
+
+def test_server_timing_can_be_disabled(fake_model, monkeypatch):
+    monkeypatch.setattr(settings, "_settings", dataclasses.replace(settings.get_settings(), server_timing_enabled=False))
+    text, _, _ = make_message(random.Random(2), 2)
+    response = _post_extract(text)
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
@@ -0,0 +1,35 @@
+import asyncio
+import json
+import random
+from email.message import EmailMessage
+
+from benchmarks.bench_regex import make_message
+
+
+def _write_eml(directory, count):
+    rng = random.Random(3)
+    expected = []
+    for i in range(count):
+        text, email, address = make_message(rng, i)
+        msg = EmailMessage()
+        msg["From"] = email
+        msg["Message-ID"] = f"<m{i}@test>"
+        msg.set_content(text)
+        (directory / f"{i:03d}.eml").write_bytes(bytes(msg))
+        expected.append(email)
+    return expected
+
+
+def test_ingest_runs_the_extract_flow(tmp_path, fake_model):
+    import ingest
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    emails = _write_eml(inbox, 4)
+    out = tmp_path / "out.ndjson"
+
+    written = asyncio.run(ingest.ingest([str(inbox)], str(out), str(tmp_path / "out.ckpt"), concurrency=2))
+
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    assert written == 4
+    assert [r["status"] for r in records] == ["ok"] * 4, [r["error"] for r in records]
+    assert [r["result"]["broker_email"] for r in records] == emails
@@ -0,0 +1,94 @@
+import random
+
+from benchmarks.bench_regex import make_message
+
+_LEGAL_WORDS = (
+    "confidential privileged recipient notify sender delete review retransmission dissemination coverage "
+    "bound altered written confirmation authorized representative quotes subject underwriting change notice "
+    "liability errors omissions transmission virus attachments opinions advice binding contract policy terms"
+).split()
+# A long footer with hundreds of distinct shingles, shared verbatim by every broker's email
+DISCLAIMER = "CONFIDENTIALITY NOTICE: " + " ".join(
+    f"{_LEGAL_WORDS[n % len(_LEGAL_WORDS)]} clause {n}" for n in range(300)
+)
+BODY = (
+    "Please see the attached renewal quote for the commercial package. The insured added two locations "
+    "this year and would like higher limits on the umbrella. Loss runs for the last five years are "
+    "attached as well. Let me know if you need anything else to get this bound before the effective date."
+)
+
+
+def _fields(email, address):
+    return dict(
+        broker_name="Someone", broker_email=email, brokerage="Agency", complete_address=address,
+        broker_name_confidence=0.95, broker_email_confidence=0.95,
+        brokerage_confidence=0.95, complete_address_confidence=0.95,
+    )
+
+
+def _with_disclaimer(i):
+    # Same body and footer for every broker; only the signature differs
+    _, email, address = make_message(random.Random(i), i)
+    signature = f"Best regards,\nBroker{i} Person\nAgency {i} Insurance\n{address}\n{email}"
+    return f"Hi team,\n\n{BODY}\n\n{signature}\n\n{DISCLAIMER}", email, address
+
+
+def test_shared_disclaimer_does_not_leak_another_brokers_fields(fake_mongo):
+    from mongo_caching import cache_insert, cache_lookup_many, near_duplicate_hit
+    first, email, address = _with_disclaimer(1)
+    second, _, _ = _with_disclaimer(2)
+    cache_insert(email_blurb=first, **_fields(email, address))
+
+    assert near_duplicate_hit(second) is False
+    assert cache_lookup_many([second]) == {}
+
+
+def test_near_duplicate_of_the_same_broker_still_hits(fake_mongo):
+    from mongo_caching import blurb_key, cache_insert, cache_lookup_many, near_duplicate_hit
+    first, email, address = _with_disclaimer(1)
+    cache_insert(email_blurb=first, **_fields(email, address))
+    reply = first.replace("Hi team,", "Hi all,")
+
+    hit = near_duplicate_hit(reply)
+    assert hit and hit["broker_email"] == email
+    result, match = cache_lookup_many([reply])[blurb_key(reply)]
+    assert match == "fuzzy" and result["broker_email"] == email
+
+
+def test_rebuild_reads_stored_signatures_and_backfills_old_documents(fake_mongo):
+    from mongo_caching import near_dup_index, near_duplicate_hit, cache_insert, rebuild_near_duplicate_index
+    from mongo_client import get_collection
+    first, email, address = _with_disclaimer(1)
+    second, email2, address2 = _with_disclaimer(2)
+    cache_insert(email_blurb=first, **_fields(email, address))
+    cache_insert(email_blurb=second, **_fields(email2, address2))
+    coll = get_collection("cache")
+    # An entry written before signatures were stored
+    coll.update_one({"broker_email": email2}, {"$unset": {"near_dup_sig": "", "near_dup_scheme": ""}})
+    near_dup_index.clear()
+
+    assert rebuild_near_duplicate_index() == 2
+    assert near_duplicate_hit(first.replace("Hi team,", "Hi all,"))["broker_email"] == email
+    assert near_duplicate_hit(second.replace("Hi team,", "Hi all,"))["broker_email"] == email2
+    assert coll.find_one({"broker_email": email2})["near_dup_sig"]
+
+
+def test_rebuild_stops_when_asked(fake_mongo):
+    import threading
+    from mongo_caching import cache_insert, near_dup_index, rebuild_near_duplicate_index
+    for i in range(5):
+        text, email, address = _with_disclaimer(i)
+        cache_insert(email_blurb=text, **_fields(email, address))
+    stop = threading.Event()
+    stop.set()
+    assert rebuild_near_duplicate_index(batch_size=2, stop=stop) == 0
+    assert near_dup_index.stats()["size"] == 0
+
+
+def test_fuzzy_tier_hashes_at_most_the_configured_prefix(fake_mongo, monkeypatch):
+    import dataclasses
+    import settings
+    from mongo_caching import _near_dup_text
+    monkeypatch.setattr(settings, "_settings", dataclasses.replace(settings.get_settings(), near_dup_max_chars=1000))
+    first, _, _ = _with_disclaimer(1)
+    assert len(_near_dup_text(first + "\n\n" + BODY * 500)) == 1000
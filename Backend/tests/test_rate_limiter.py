@@ -0,0 +1,126 @@
+import asyncio
+import dataclasses
+from types import SimpleNamespace
+
+import pytest
+
+import email_parser_agent
+import settings
+from email_parser_agent import TierRun, get_agent
+from rate_limiter import RateScheduler
+from resilience import CircuitBreaker, LLMUnavailableError
+
+
+def test_interactive_is_granted_before_queued_bulk():
+    limiter = RateScheduler(tpm=6000)  # 100 tokens/s
+    order = []
+
+    async def call(lane, delay=0.0):
+        await asyncio.sleep(delay)
+        await limiter.acquire(20, lane)
+        order.append(lane)
+
+    async def go():
+        limiter.tokens.take(limiter.tokens.per_minute)  # empty: every waiter queues
+        await asyncio.gather(call("bulk"), call("bulk"), call("interactive", delay=0.01))
+
+    asyncio.run(go())
+    assert order == ["interactive", "bulk", "bulk"]
+    assert limiter.stats()["lanes"]["interactive"]["granted"] == 1
+
+
+def test_settle_refunds_overestimates_and_charges_overdrafts():
+    limiter = RateScheduler(tpm=60)  # 1 token/s: refill is negligible here
+    limiter.tokens.take(50)
+    limiter.settle(50, 20)
+    assert limiter.tokens.level == pytest.approx(40, abs=0.5)
+    limiter.settle(10, 70)  # used far more than estimated: the bucket goes negative
+    assert limiter.tokens.level == pytest.approx(-20, abs=0.5)
+    assert limiter.tokens.wait_time(1) > 0
+    limiter.settle(10, None)  # no usage reported: keep the estimate
+    assert limiter.tokens.level == pytest.approx(-20, abs=0.5)
+
+
+def test_try_acquire_allows_a_burst_up_to_the_budget():
+    limiter = RateScheduler(rpm=3)
+    assert [limiter.try_acquire(10) for _ in range(4)] == [True, True, True, False]
+    limiter.refund(10)
+    assert limiter.try_acquire(10)
+
+
+def test_try_acquire_never_jumps_the_queue():
+    limiter = RateScheduler(rpm=60)  # 1 request/s
+
+    async def go():
+        limiter.requests.take(60)
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0.01)
+        limiter.requests.give(5)  # budget is free again, but someone is waiting
+        assert not limiter.try_acquire(1)
+        await waiter
+
+    asyncio.run(go())
+
+
+def test_queue_wait_is_capped():
+    limiter = RateScheduler(rpm=1)
+
+    async def go():
+        limiter.requests.take(1)
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire(10, "interactive", max_wait=0.05)
+
+    asyncio.run(go())
+    lanes = limiter.stats()["lanes"]
+    assert lanes["interactive"]["timed_out"] == 1 and lanes["interactive"]["queue_depth"] == 0
+
+
+def test_invoke_fails_after_the_max_wait_without_holding_the_probe(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.0)
+    breaker.record_failure()  # half-open on the next allow()
+    limiter = RateScheduler(rpm=1)
+    limiter.requests.take(1)
+    monkeypatch.setattr(email_parser_agent, "llm_breaker", breaker)
+    monkeypatch.setitem(email_parser_agent.rate_limiters, "small", limiter)
+    monkeypatch.setattr(settings, "_settings", dataclasses.replace(
+        settings.get_settings(), llm_queue_max_wait_interactive_seconds=0.05,
+    ))
+    agent = get_agent()
+
+    async def go():
+        with pytest.raises(LLMUnavailableError):
+            await agent._invoke("small", None, {"email_blurb": "hi"}, "interactive", TierRun("small"))
+
+    asyncio.run(go())
+    assert breaker.allow()  # the queued call never claimed the half-open probe
+
+
+class _SlowThenFastChain:
+    """First call hangs, the hedged duplicate answers at once."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(3600)
+        return SimpleNamespace(content="{}", response_metadata={"token_usage": {
+            "prompt_tokens": 400, "completion_tokens": 100, "total_tokens": 500,
+        }})
+
+
+def test_hedge_reservation_is_settled(monkeypatch):
+    limiter = RateScheduler(tpm=6000)
+    monkeypatch.setitem(email_parser_agent.rate_limiters, "small", limiter)
+    monkeypatch.setattr(email_parser_agent, "llm_breaker", CircuitBreaker())
+    monkeypatch.setattr(settings, "_settings", dataclasses.replace(settings.get_settings(), llm_hedge_enabled=True))
+    agent = get_agent()
+    monkeypatch.setattr(agent.latency["small"], "percentile", lambda *args: 20.0)
+    chain = _SlowThenFastChain()
+
+    asyncio.run(agent._invoke("small", chain, {"email_blurb": "hi"}, "interactive", TierRun("small")))
+
+    assert chain.calls == 2
+    # Winner: its 500 reported tokens; loser: its 400-token prompt. Both estimates are returned.
+    assert 6000 - 900 <= limiter.tokens.level <= 6000 - 900 + 20
@@ -0,0 +1,49 @@
+from regex_fallback import extract_broker_fields
+
+# A colleague's signature (no email) sits inside the sender's 8-line window, one paragraph up
+COLLEAGUE_ABOVE = """Hi team,
+
+Please see the renewal below.
+
+Priya Moore
+Moore Insurance Agency
+12 Oak St, Austin, TX 78701
+License 0G11111
+
+Victor Garcia
+License 0G22222
+Garcia Insurance Group
+victor.garcia@garciainsurance.com
+"""
+
+
+def test_address_comes_from_the_senders_own_signature():
+    fields = extract_broker_fields(COLLEAGUE_ABOVE)
+    assert fields["broker_email"] == "victor.garcia@garciainsurance.com"
+    assert fields["complete_address"] == ""
+    assert fields["complete_address_confidence"] == 0.0
+
+
+def test_address_in_the_signature_paragraph_is_kept():
+    text = COLLEAGUE_ABOVE.replace(
+        "Garcia Insurance Group\n", "Garcia Insurance Group\n400 Elm Ave, Dallas, TX 75201\n"
+    )
+    fields = extract_broker_fields(text)
+    assert fields["complete_address"] == "400 Elm Ave, Dallas, TX 75201"
+    assert fields["complete_address_confidence"] > 0.9
+
+
+def test_uncorroborated_name_line_does_not_take_the_fast_path():
+    from fast_path import fast_path_fields
+    text = COLLEAGUE_ABOVE.replace(
+        "Garcia Insurance Group\n", "Garcia Insurance Group\n400 Elm Ave, Dallas, TX 75201\n"
+    )
+    matched = extract_broker_fields(text)
+    assert matched["broker_name"] == "Victor Garcia" and matched["broker_name_confidence"] > 0.9
+
+    # Same signature, but the name no longer matches the email's local part
+    text = text.replace("victor.garcia@", "vg.renewals@")
+    fields = extract_broker_fields(text)
+    assert fields["broker_name"] == "Victor Garcia"
+    assert fields["broker_name_confidence"] < 0.9
+    assert fast_path_fields(text, 0.9) is None
@@ -0,0 +1,58 @@
+import asyncio
+
+import email_parser_agent
+from email_parser_agent import TierRun, get_agent
+from resilience import CircuitBreaker
+
+
+class _HangingChain:
+    async def ainvoke(self, inputs):
+        await asyncio.sleep(3600)
+
+
+def test_cancelled_half_open_probe_frees_the_breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.0)
+    breaker.record_failure()  # open; with no cooldown the next allow() is the half-open probe
+    monkeypatch.setattr(email_parser_agent, "llm_breaker", breaker)
+    agent = get_agent()
+
+    async def go():
+        probe = asyncio.create_task(
+            agent._invoke("small", _HangingChain(), {"email_blurb": "hi"}, "interactive", TierRun("small"))
+        )
+        await asyncio.sleep(0.05)
+        assert breaker.state == "half_open" and not breaker.allow()  # the probe holds the slot
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(go())
+    assert breaker.allow()
+
+
+def test_release_keeps_a_closed_breaker_closed():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60.0)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_small_tier_outage_escalates_to_large(monkeypatch):
+    import random
+    from benchmarks.bench_load import FakeChatModel, parse_latency
+    from benchmarks.bench_regex import make_message
+    from email_parser_agent import EmailAgentRequest, cascade_stats
+
+    monkeypatch.setattr(email_parser_agent, "llm_breaker", CircuitBreaker(failure_threshold=5))
+    agent = get_agent()
+    assert "small" in agent.tiers  # CASCADE_ENABLED defaults on
+    small, large = agent.tiers["small"], agent.tiers["large"]
+    monkeypatch.setattr(small, "chain", FakeChatModel(parse_latency("fixed:0"), fail=True))
+    monkeypatch.setattr(large, "chain", FakeChatModel(parse_latency("fixed:0")))
+    before = cascade_stats.stats()["escalations"]["small_unavailable"]
+
+    text, email, _ = make_message(random.Random(5), 5)
+    response = asyncio.run(agent.parse(EmailAgentRequest(email_blurb=text)))
+
+    assert response.model_tier == "large" and response.escalation == "small_unavailable"
+    assert response.broker_email == email
+    assert cascade_stats.stats()["escalations"]["small_unavailable"] == before + 1
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_leader_failure_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fail():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        raise ValueError("boom")
+
+    async def ok():
+        nonlocal calls
+        calls += 1
+        return "fresh"
+
+    async def go():
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert calls == 1
+        return await flight.do("k", ok)
+
+    assert asyncio.run(go()) == ("fresh", False)
+    assert calls == 2
+    assert flight.stats() == {"inflight": 0, "leaders": 2, "coalesced": 2, "errors": 1}
+
+
+def test_cancelled_leader_does_not_strand_waiters():
+    flight = SingleFlight()
+    release = None
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    async def go():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.wait_for(waiter, timeout=1.0) == ("done", True)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(go())
+    assert flight.stats()["inflight"] == 0
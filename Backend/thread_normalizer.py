@@ -0,0 +1,118 @@
+import re
+from dataclasses import dataclass, field
+from typing import List
+
+# Leading reply markers ("> ", ">> ") on quoted lines
+_QUOTE_PREFIX_RE = re.compile(r"^(?:[ \t]*>)+[ \t]?")
+# Lines that start an older message in a reply chain (same split points as regex_fallback)
+_FROM_RE = re.compile(r"^\s*From\s*:\s*(.*)$", re.IGNORECASE)
+_SEPARATOR_RE = re.compile(r"^\s*-{2,}\s*(?:Original|Forwarded) Message\b.*$", re.IGNORECASE)
+_WROTE_RE = re.compile(r"^\s*On\b(.{0,200})\bwrote:\s*$", re.IGNORECASE)
+# Remaining header fields of an older message; they vary between copies and carry no broker info
+_HEADER_RE = re.compile(r"^\s*(?:To|Cc|Bcc|Sent|Date|Subject|Reply-To|Importance)\s*:", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[\w.%+-]{1,64}@[\w-]{1,63}(?:\.[\w-]{1,63}){0,8}\.[A-Za-z]{2,24}")
+# Decorative separators (Outlook's underscore rule etc.); dropped like header lines
+_RULE_RE = re.compile(r"^[\s_=*~-]{4,}$")
+_WORDS_RE = re.compile(r"\W+")
+# Shorter bodies ("Thanks", "See below") are only dropped on an exact repeat, not by containment
+MIN_CONTAINED_CHARS = 40
+
+
+@dataclass
+class Message:
+    """One message of a reply chain: canonical sender ("" for the newest) and body lines."""
+    sender: str = ""
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def body(self) -> str:
+        return "\n".join(self.lines).strip()
+
+    def fingerprint(self) -> str:
+        """Body reduced to lowercase words, so re-quoted copies compare equal."""
+        return _WORDS_RE.sub(" ", self.body).lower().strip()
+
+
+def _sender(value: str) -> str:
+    """Sender identity for a header: the email when present (clients format names/dates differently)."""
+    email = _EMAIL_RE.search(value)
+    if email:
+        return email.group(0).lower()
+    return " ".join(value.split()).strip(" ,<>")
+
+
+def split_messages(email_blurb: str) -> List[Message]:
+    """
+    Split a blurb into messages at From:/Original Message/"On ... wrote:" lines,
+    newest first. Quote markers are removed and header blocks (To/Sent/Subject...)
+    are dropped; the From: value becomes the message's sender.
+    """
+    messages = [Message()]
+    in_header = False
+    for raw in email_blurb.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+        line = _QUOTE_PREFIX_RE.sub("", raw)
+        from_match = _FROM_RE.match(line)
+        wrote_match = None if from_match else _WROTE_RE.match(line)
+        if from_match or wrote_match or _SEPARATOR_RE.match(line):
+            if not in_header:
+                messages.append(Message())
+                in_header = True
+            if from_match or wrote_match:
+                messages[-1].sender = _sender((from_match or wrote_match).group(1))
+            continue
+        if _RULE_RE.match(line) or (in_header and (not line.strip() or _HEADER_RE.match(line))):
+            continue
+        in_header = False
+        messages[-1].lines.append(line)
+    return messages
+
+
+def dedupe_messages(messages: List[Message]) -> List[Message]:
+    """Drop empty messages and any message already contained in one kept earlier (re-quoted copies)."""
+    kept = []
+    exact = set()
+    seen = ""
+    for message in messages:
+        fp = message.fingerprint()
+        if not fp or fp in exact or (len(fp) >= MIN_CONTAINED_CHARS and f" {fp} " in seen):
+            continue
+        kept.append(message)
+        exact.add(fp)
+        seen += f"\x00 {fp} "
+    return kept
+
+
+def normalize_thread(email_blurb: str) -> str:
+    """
+    Canonical form of a reply chain: each distinct message once, newest first,
+    older ones introduced by a single "From: <sender>" line.
+    Blurbs without reply structure or quote markers are returned unchanged.
+    """
+    if not email_blurb:
+        return ""
+    messages = split_messages(email_blurb)
+    if len(messages) == 1 and not any(_QUOTE_PREFIX_RE.match(line) for line in email_blurb.split("\n")):
+        return email_blurb
+
+    parts = []
+    for message in dedupe_messages(messages):
+        header = f"From: {message.sender or 'unknown'}\n" if (parts or message.sender) else ""
+        parts.append(header + message.body)
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    original = (
+        "Can you bind this today?\n\nThanks,\nHarry Smith\nLicense 0G12345\nharry@abc.com\n\n"
+        "-----Original Message-----\nFrom: Jane Roe <jane@wholesale.com>\nSent: Monday, May 6, 2024 9:12 AM\n"
+        "To: Harry Smith\nSubject: RE: quote\n\nQuote attached.\n\nJane\n"
+    )
+    reply = (
+        "Bound, thank you.\n\nJane\n\n"
+        "On Tue, May 7, 2024 at 8:00 AM Harry Smith <Harry@abc.com> wrote:\n"
+        + "".join(f"> {line}\n" for line in original.split("\n"))
+    )
+    for text in (original, reply):
+        canonical = normalize_thread(text)
+        print(canonical)
+        print(f"--- {len(text)} -> {len(canonical)} chars\n")
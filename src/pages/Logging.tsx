@@ -6,6 +6,7 @@ type LogDoc = {
   cache_hit: boolean;
   latency: number;
   timestamp: any;
+  stages?: Record<string, number>;
 };
 
 function parseTimestamp(ts: any): Date | null {
@@ -17,6 +18,21 @@ function parseTimestamp(ts: any): Date | null {
   return null;
 }
 
+// Slowest span first, in bold, so a slow request shows where its time went
+function StageBreakdown({ stages }: { stages?: Record<string, number> }) {
+  const spans = Object.entries(stages ?? {}).sort((a, b) => b[1] - a[1]);
+  if (!spans.length) return <span>-</span>;
+  return (
+    <span>
+      {spans.map(([name, ms], i) => (
+        <span key={name} style={{ fontWeight: i === 0 ? "bold" : "normal", marginRight: 8 }}>
+          {name} {ms.toFixed(2)}
+        </span>
+      ))}
+    </span>
+  );
+}
+
 export default function Logging() {
   const [rows, setRows] = useState<LogDoc[]>([]);
   const [loading, setLoading] = useState(true);
@@ -54,6 +70,7 @@ export default function Logging() {
               <th style={{ textAlign: "left", borderBottom: "1px solid #ddd" }}>Source Hash</th>
               <th style={{ textAlign: "left", borderBottom: "1px solid #ddd" }}>Cache Hit</th>
               <th style={{ textAlign: "left", borderBottom: "1px solid #ddd" }}>Latency (ms)</th>
+              <th style={{ textAlign: "left", borderBottom: "1px solid #ddd" }}>Stages (ms)</th>
               <th style={{ textAlign: "left", borderBottom: "1px solid #ddd" }}>Timestamp</th>
             </tr>
           </thead>
@@ -66,6 +83,7 @@ export default function Logging() {
                   <td style={{ padding: "8px 0" }}>{r.source_hash}</td>
                   <td style={{ padding: "8px 0" }}>{String(r.cache_hit)}</td>
                   <td style={{ padding: "8px 0" }}>{r.latency}</td>
+                  <td style={{ padding: "8px 0" }}><StageBreakdown stages={r.stages} /></td>
                   <td style={{ padding: "8px 0" }}>{d ? d.toLocaleString() : String(r.timestamp)}</td>
                 </tr>
               );
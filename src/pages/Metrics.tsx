@@ -7,6 +7,25 @@ type MetricDoc = {
   timestamp: any;
 };
 
+// One row of GET /metrics/summary: percentiles estimated from in-process histograms
+type LatencyRow = {
+  route: string;
+  stage: string;
+  cache_hit: string;
+  count: number;
+  mean: number;
+  max: number;
+  p50: number | null;
+  p95: number | null;
+  p99: number | null;
+};
+
+const API_BASE = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000";
+
+function formatMs(v: number | null | undefined): string {
+  return v === null || v === undefined ? "-" : v.toFixed(v < 10 ? 2 : 1);
+}
+
 function parseTimestamp(ts: any): Date | null {
   try {
     if (typeof ts === "string") return new Date(ts);
@@ -18,36 +37,73 @@ function parseTimestamp(ts: any): Date | null {
 
 export default function Metrics() {
   const [rows, setRows] = useState<MetricDoc[]>([]);
+  const [latency, setLatency] = useState<LatencyRow[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    const url =
-      import.meta.env.VITE_API_BASE_URL
-        ? `${import.meta.env.VITE_API_BASE_URL}/metrics`
-        : "http://localhost:8000/metrics";
-
-    fetch(url, {
+    const recent = fetch(`${API_BASE}/metrics`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-    })
-      .then(async (res) => {
-        if (!res.ok) throw new Error(`HTTP ${res.status}`);
-        const json = await res.json();
-        setRows(json || []);
-      })
+    }).then(async (res) => {
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const json = await res.json();
+      setRows(json || []);
+    });
+    const summary = fetch(`${API_BASE}/metrics/summary`).then(async (res) => {
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      const json = await res.json();
+      setLatency(json?.latency || []);
+    });
+
+    Promise.all([recent, summary])
       .catch((err: any) => setError(err?.message ?? String(err)))
       .finally(() => setLoading(false));
   }, []);
 
+  const th = { textAlign: "left" as const, borderBottom: "1px solid #ddd" };
+
   return (
     <div style={{ padding: 24 }}>
       <h1>Metrics</h1>
       {loading && <p>Loading...</p>}
       {error && <p style={{ color: "red" }}>Error: {error}</p>}
       {!loading && !error && (
+        <>
+        <h2>Latency by stage (ms, since server start)</h2>
+        <table style={{ width: "100%", borderCollapse: "collapse", marginBottom: 24 }}>
+          <thead>
+            <tr>
+              <th style={th}>Route</th>
+              <th style={th}>Stage</th>
+              <th style={th}>Cache Hit</th>
+              <th style={th}>Count</th>
+              <th style={th}>Mean</th>
+              <th style={th}>p50</th>
+              <th style={th}>p95</th>
+              <th style={th}>p99</th>
+              <th style={th}>Max</th>
+            </tr>
+          </thead>
+          <tbody>
+            {latency.map((r, idx) => (
+              <tr key={idx}>
+                <td style={{ padding: "8px 0" }}>{r.route}</td>
+                <td style={{ padding: "8px 0" }}>{r.stage}</td>
+                <td style={{ padding: "8px 0" }}>{r.cache_hit}</td>
+                <td style={{ padding: "8px 0" }}>{r.count}</td>
+                <td style={{ padding: "8px 0" }}>{formatMs(r.mean)}</td>
+                <td style={{ padding: "8px 0" }}>{formatMs(r.p50)}</td>
+                <td style={{ padding: "8px 0" }}>{formatMs(r.p95)}</td>
+                <td style={{ padding: "8px 0" }}>{formatMs(r.p99)}</td>
+                <td style={{ padding: "8px 0" }}>{formatMs(r.max)}</td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+        <h2>Recent requests</h2>
         <table style={{ width: "100%", borderCollapse: "collapse" }}>
           <thead>
             <tr>
@@ -69,6 +125,7 @@ export default function Metrics() {
             })}
           </tbody>
         </table>
+        </>
       )}
     </div>
   );